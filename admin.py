@@ -1,18 +1,31 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, make_response
+from flask import Flask, render_template, request, redirect, url_for, session, flash, Response, stream_with_context, jsonify
 import bcrypt
-import logging
+import logging_config
 from functools import wraps
 import csv
+import json
+import urllib.request
 from io import StringIO
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, Float, DateTime, ForeignKey
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import and_, or_, exists
+from sqlalchemy.orm import sessionmaker, aliased, Query
+from sqlalchemy.sql import func
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import os
+import threading
+from database import make_engine, pool_stats
+from instrumentation import RequestMetrics, numeric_gauges
+from question_cache import QuestionCache
+from attempt_details import AttemptDetailCache
+from models import AdminUser, Candidate, Score, ScoreCategory, Question, Answer
+import repository
+import regrade
+import item_stats
 
 # Load environment variables from .env file
 load_dotenv()
+logging_config.configure_logging()
 
 app = Flask(__name__)
 app.secret_key = os.getenv('SECRET_KEY', 'supersecretkey')  # Load secret key from .env, with fallback
@@ -20,78 +33,39 @@ app.config['SESSION_COOKIE_SECURE'] = False  # Set to True for HTTPS
 app.config['SESSION_COOKIE_HTTPONLY'] = True
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 
-# Enable logging
-logging.basicConfig(level=logging.DEBUG)
-
-# SQLAlchemy setup
-Base = declarative_base()
-# Construct database URL from environment variables
-db_user = os.getenv('DB_USER')
-db_password = os.getenv('DB_PASSWORD')
-db_host = os.getenv('DB_HOST')
-db_name = os.getenv('DB_NAME')
-db_url = f'mysql+pymysql://{db_user}:{db_password}@{db_host}/{db_name}'
-engine = create_engine(db_url)
+# SQLAlchemy setup (connection URL and pool settings come from the environment)
+engine = make_engine()
 Session = sessionmaker(bind=engine)
 
-# SQLAlchemy Models
-class AdminUser(Base):
-    __tablename__ = 'admin_users'
-    id = Column(Integer, primary_key=True)
-    username = Column(String(50), unique=True, nullable=False)
-    password_hash = Column(String(255), nullable=False)
-
-class Candidate(Base):
-    __tablename__ = 'candidates'
-    id = Column(Integer, primary_key=True)
-    full_name = Column(String(100))
-    email = Column(String(100))
-    phone = Column(String(20))
-    city = Column(String(50))
-    position = Column(String(100))
-    has_experience = Column(Boolean)
-    years_experience = Column(Integer)
-    tech_stack = Column(String(255))
-    submitted_at = Column(DateTime)
-
-class Score(Base):
-    __tablename__ = 'scores'
-    score_id = Column(Integer, primary_key=True)
-    candidate_id = Column(Integer, ForeignKey('candidates.id'))
-    attempt_number = Column(Integer)
-    total_questions = Column(Integer)
-    correct_answers = Column(Integer)
-    score_percent = Column(Float)
-    submitted_at = Column(DateTime)
-
-class Question(Base):
-    __tablename__ = 'questions'
-    question_id = Column(Integer, primary_key=True)
-    set_number = Column(Integer)
-    category = Column(String(50))
-    question_text = Column(String(500))
-    option_a = Column(String(255))
-    option_b = Column(String(255))
-    option_c = Column(String(255))
-    option_d = Column(String(255))
-    correct_option = Column(String(1))
-
-class Answer(Base):
-    __tablename__ = 'answers'
-    answer_id = Column(Integer, primary_key=True)
-    score_id = Column(Integer, ForeignKey('scores.score_id'))
-    question_id = Column(Integer, ForeignKey('questions.question_id'))
-    selected_option = Column(String(1))
-    is_correct = Column(Boolean)
-    answered_at = Column(DateTime)
-
-class TabSwitchEvent(Base):
-    __tablename__ = 'tab_switch_events'
-    event_id = Column(Integer, primary_key=True)
-    candidate_id = Column(Integer, ForeignKey('candidates.id'))
-    attempt_number = Column(Integer)
-    event_type = Column(String(50)) # e.g., 'tab_switch_in', 'tab_switch_out'
-    timestamp = Column(DateTime)
+# Request metrics: a Server-Timing header on every response, Prometheus text at /metrics
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')  # If set, scrapers send "Authorization: Bearer <token>"
+request_metrics = RequestMetrics(app, engine, server_timing=os.getenv('SERVER_TIMING', '1') == '1',
+                                 n_plus_one_threshold=int(os.getenv('N_PLUS_ONE_THRESHOLD', 0)))
+
+# Answer-review caches: question sets (shared text) and per-score attempt details
+QUESTION_CACHE_TTL_SECONDS = int(os.getenv('QUESTION_CACHE_TTL_SECONDS', 300))
+QUESTION_VERSION_CHECK_SECONDS = int(os.getenv('QUESTION_VERSION_CHECK_SECONDS', 5))  # Staleness bound across processes
+ATTEMPT_CACHE_ENTRIES = int(os.getenv('ATTEMPT_CACHE_ENTRIES', 500))
+ATTEMPT_CACHE_BYTES = int(os.getenv('ATTEMPT_CACHE_BYTES', 8 * 1024 * 1024))
+
+def load_question_set(set_number):
+    db_session = Session()
+    try:
+        return repository.load_question_set(db_session, set_number)
+    finally:
+        db_session.close()
+
+def load_question_set_version(set_number):
+    db_session = Session()
+    try:
+        return repository.question_set_version(db_session, set_number)
+    finally:
+        db_session.close()
+
+question_cache = QuestionCache(load_question_set, ttl_seconds=QUESTION_CACHE_TTL_SECONDS,
+                               version_loader=load_question_set_version,
+                               version_check_seconds=QUESTION_VERSION_CHECK_SECONDS)
+attempt_cache = AttemptDetailCache(question_cache, max_entries=ATTEMPT_CACHE_ENTRIES, max_bytes=ATTEMPT_CACHE_BYTES)
 
 # Decorator to enforce login requirement
 def login_required(f):
@@ -125,8 +99,8 @@ def login():
                 else:
                     error = "Invalid credentials. Please try again."
                 db_session.close()
-            except Exception as e:
-                app.logger.error(f"Login error: {str(e)}")
+            except Exception:
+                app.logger.exception("Login error")
                 error = "Database connection error. Please try again later."
     return render_template('login.html', error=error)
 
@@ -135,29 +109,221 @@ def login():
 def dashboard():
     return render_template('dashboard.html')
 
+# Pagination and filtering helpers
+PAGE_SIZE = int(os.getenv('ADMIN_PAGE_SIZE', 50))
+LISTING_FILTERS = ['email', 'position', 'city', 'date_from', 'date_to', 'min_score', 'category', 'min_category_score', 'sort']
+
+def encode_cursor(submitted_at, row_id):
+    """Encode a (submitted_at, id) keyset position as an opaque URL-safe token"""
+    stamp = submitted_at.strftime('%Y%m%d%H%M%S%f') if submitted_at else ''
+    return f"{stamp}.{row_id}"
+
+def decode_cursor(cursor):
+    """Decode a cursor token; returns (submitted_at, id) or None if missing/invalid"""
+    if not cursor:
+        return None
+    try:
+        stamp, row_id = cursor.split('.', 1)
+        submitted_at = datetime.strptime(stamp, '%Y%m%d%H%M%S%f') if stamp else None
+        return submitted_at, int(row_id)
+    except ValueError:
+        return None
+
+def keyset_after(time_column, id_column, cursor):
+    """Filter for rows after the cursor in (time_column DESC, id_column DESC) order.
+
+    NULL timestamps sort last in descending order on both MySQL and SQLite,
+    so they are paged through by id once the dated rows are exhausted.
+    """
+    submitted_at, row_id = cursor
+    if submitted_at is None:
+        return and_(time_column.is_(None), id_column < row_id)
+    return or_(
+        time_column < submitted_at,
+        and_(time_column == submitted_at, id_column < row_id),
+        time_column.is_(None)
+    )
+
+def encode_rank_cursor(value, row_id):
+    """Encode a (percent, id) keyset position for listings sorted by a sub-score"""
+    return f"{value}_{row_id}"
+
+def decode_rank_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        value, row_id = cursor.split('_', 1)
+        return Decimal(value), int(row_id)
+    except (ValueError, InvalidOperation):
+        return None
+
+def parse_listing_filters(args):
+    """Read the listing filters from the query string.
+
+    Returns (raw, parsed): raw holds the non-empty strings for re-rendering the
+    form and building page links, parsed holds typed values for querying.
+    """
+    raw = {key: args.get(key, '').strip() for key in LISTING_FILTERS}
+    raw = {key: value for key, value in raw.items() if value}
+    parsed = {}
+    if 'email' in raw:
+        parsed['email'] = raw['email'].lower()
+    if 'position' in raw:
+        parsed['position'] = raw['position']
+    if 'city' in raw:
+        parsed['city'] = raw['city'].lower()
+    for key in ('date_from', 'date_to'):
+        if key in raw:
+            try:
+                parsed[key] = datetime.strptime(raw[key], '%Y-%m-%d')
+            except ValueError:
+                raw.pop(key)
+    if 'date_to' in parsed:
+        parsed['date_to'] += timedelta(days=1)  # inclusive end date
+    if 'min_score' in raw:
+        try:
+            parsed['min_score'] = float(raw['min_score'])
+        except ValueError:
+            raw.pop('min_score')
+    # Category sub-score filter and sort only apply with a category chosen
+    if 'category' in raw:
+        parsed['category'] = raw['category']
+    if 'min_category_score' in raw:
+        try:
+            parsed['min_category_score'] = float(raw['min_category_score'])
+        except ValueError:
+            pass
+    if raw.get('sort') == 'category':
+        parsed['sort'] = 'category'
+    if 'category' not in parsed:
+        parsed.pop('min_category_score', None)
+        parsed.pop('sort', None)
+    for key in ('min_category_score', 'sort'):
+        if key not in parsed:
+            raw.pop(key, None)
+    return raw, parsed
+
+def escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def apply_candidate_filters(query, filters, candidate=None):
+    """Apply email prefix, position and city filters to a Candidate query"""
+    candidate = candidate or Candidate
+    if 'email' in filters:
+        query = query.filter(candidate.email_normalized.like(escape_like(filters['email']) + '%', escape='\\'))
+    if 'position' in filters:
+        query = query.filter(candidate.position == filters['position'])
+    if 'city' in filters:
+        query = query.filter(func.lower(candidate.city) == filters['city'])
+    return query
+
+def score_filter_clauses(filters):
+    """Date range, minimum score and category sub-score conditions on Score"""
+    clauses = []
+    if 'date_from' in filters:
+        clauses.append(Score.submitted_at >= filters['date_from'])
+    if 'date_to' in filters:
+        clauses.append(Score.submitted_at < filters['date_to'])
+    if 'min_score' in filters:
+        clauses.append(Score.score_percent >= filters['min_score'])
+    if 'min_category_score' in filters:
+        # Reads score_categories through ix_score_categories_category_percent, never answers
+        category = aliased(ScoreCategory)  # The listing may also join score_categories to sort
+        clauses.append(exists().where(category.score_id == Score.score_id,
+                                      category.category == filters['category'],
+                                      category.percent >= filters['min_category_score']))
+    return clauses
+
 @app.route('/view_candidates')
 @login_required
 def view_candidates():
     try:
         db_session = Session()
-        candidates = db_session.query(Candidate).all()
+        filter_args, filters = parse_listing_filters(request.args)
+        query = apply_candidate_filters(db_session.query(Candidate), filters)
+        if 'date_from' in filters:
+            query = query.filter(Candidate.submitted_at >= filters['date_from'])
+        if 'date_to' in filters:
+            query = query.filter(Candidate.submitted_at < filters['date_to'])
+        cursor = decode_cursor(request.args.get('cursor'))
+        if cursor:
+            query = query.filter(keyset_after(Candidate.submitted_at, Candidate.id, cursor))
+        candidates = query.order_by(Candidate.submitted_at.desc(), Candidate.id.desc()).\
+            limit(PAGE_SIZE + 1).all()
+        next_cursor = None
+        if len(candidates) > PAGE_SIZE:
+            candidates = candidates[:PAGE_SIZE]
+            next_cursor = encode_cursor(candidates[-1].submitted_at, candidates[-1].id)
         db_session.close()
-        return render_template('candidates.html', candidates=candidates)
-    except Exception as e:
-        app.logger.error(f"View candidates error: {str(e)}")
+        return render_template('candidates.html', candidates=candidates, filters=filter_args, next_cursor=next_cursor)
+    except Exception:
+        app.logger.exception("View candidates error")
         flash('Error loading candidates. Please try again later.', 'danger')
         return redirect(url_for('dashboard'))
 
+# Streaming export helpers
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 1000))  # Rows per DB fetch and per response chunk
+
+def iter_csv(header, rows):
+    """Yield CSV text in chunks of EXPORT_CHUNK_SIZE rows so memory stays flat"""
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for i, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if i % EXPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue()
+
+def streamed_rows(query, label):
+    """Run query on a server-side cursor and yield rows, closing the session when done"""
+    db_session = Session()
+    try:
+        for row in query.with_session(db_session).yield_per(EXPORT_CHUNK_SIZE):
+            yield row
+    except Exception:
+        app.logger.exception("%s error while streaming", label)
+        raise
+    finally:
+        db_session.close()
+
+def csv_response(chunks, filename):
+    response = Response(stream_with_context(chunks), mimetype='text/csv')
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
+    response.headers['Pragma'] = 'no-cache'
+    response.headers['Expires'] = '0'
+    return response
+
+def format_timestamp(value):
+    return value.strftime('%Y-%m-%d %I:%M:%S %p IST') if value else 'N/A'
+
 @app.route('/download_candidates_csv')
 @login_required
 def download_candidates_csv():
     try:
-        db_session = Session()
-        candidates = db_session.query(Candidate).order_by(Candidate.submitted_at.desc()).all()
-        db_session.close()
-        output = StringIO()
-        writer = csv.writer(output)
-        writer.writerow([
+        _, filters = parse_listing_filters(request.args)
+        query = apply_candidate_filters(Query(Candidate), filters)
+        if 'date_from' in filters:
+            query = query.filter(Candidate.submitted_at >= filters['date_from'])
+        if 'date_to' in filters:
+            query = query.filter(Candidate.submitted_at < filters['date_to'])
+        query = query.order_by(Candidate.submitted_at.desc())
+        rows = ([
+            candidate.id,
+            candidate.full_name,
+            candidate.email,
+            candidate.phone if candidate.phone else 'N/A',
+            candidate.city if candidate.city else 'N/A',
+            candidate.position if candidate.position else 'N/A',
+            'Yes' if candidate.has_experience else 'No',
+            candidate.years_experience if candidate.years_experience else 'N/A',
+            candidate.tech_stack if candidate.tech_stack else 'N/A',
+            format_timestamp(candidate.submitted_at)
+        ] for candidate in streamed_rows(query, 'Download candidates CSV'))
+        header = [
             'Candidate ID',
             'Full Name',
             'Email',
@@ -168,75 +334,105 @@ def download_candidates_csv():
             'Years of Experience',
             'Tech Stack',
             'Submission Date'
-        ])
-        for candidate in candidates:
-            writer.writerow([
-                candidate.id,
-                candidate.full_name,
-                candidate.email,
-                candidate.phone if candidate.phone else 'N/A',
-                candidate.city if candidate.city else 'N/A',
-                candidate.position if candidate.position else 'N/A',
-                'Yes' if candidate.has_experience else 'No',
-                candidate.years_experience if candidate.years_experience else 'N/A',
-                candidate.tech_stack if candidate.tech_stack else 'N/A',
-                candidate.submitted_at.strftime('%Y-%m-%d %I:%M:%S %p IST') if candidate.submitted_at else 'N/A'
-            ])
-        response = make_response(output.getvalue())
-        response.headers['Content-Type'] = 'text/csv'
-        response.headers['Content-Disposition'] = 'attachment; filename=candidates.csv'
-        response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-        response.headers['Pragma'] = 'no-cache'
-        response.headers['Expires'] = '0'
-        return response
-    except Exception as e:
-        app.logger.error(f"Download candidates CSV error: {str(e)}")
+        ]
+        return csv_response(iter_csv(header, rows), 'candidates.csv')
+    except Exception:
+        app.logger.exception("Download candidates CSV error")
         flash('Error downloading candidates data. Please try again later.', 'danger')
         return redirect(url_for('view_candidates'))
 
+@app.route('/download_scores_csv')
+@login_required
+def download_scores_csv():
+    try:
+        # Plain column tuples instead of ORM entities keep per-row overhead low
+        query = Query([
+            Score.score_id, Candidate.id, Candidate.full_name, Candidate.email,
+            Score.attempt_number, Score.correct_answers, Score.total_questions,
+            Score.score_percent, Score.submitted_at, Question.set_number,
+            Question.question_id, Question.category, Answer.selected_option,
+            Question.correct_option, Answer.is_correct, Answer.answered_at
+        ]).select_from(Answer).\
+            join(Score, Answer.score_id == Score.score_id).\
+            join(Candidate, Score.candidate_id == Candidate.id).\
+            join(Question, Answer.question_id == Question.question_id).\
+            order_by(Score.score_id, Question.question_id)
+        rows = ([
+            row.score_id,
+            row.id,
+            row.full_name,
+            row.email,
+            row.attempt_number,
+            row.correct_answers,
+            row.total_questions,
+            row.score_percent,
+            format_timestamp(row.submitted_at),
+            row.set_number,
+            row.question_id,
+            row.category,
+            row.selected_option or 'Not Answered',
+            row.correct_option,
+            'Yes' if row.is_correct else 'No',
+            format_timestamp(row.answered_at)
+        ] for row in streamed_rows(query, 'Download scores CSV'))
+        header = [
+            'Score ID',
+            'Candidate ID',
+            'Full Name',
+            'Email',
+            'Attempt #',
+            'Correct Answers',
+            'Total Questions',
+            'Score (%)',
+            'Submitted At',
+            'Set',
+            'Question ID',
+            'Category',
+            'Selected Option',
+            'Correct Option',
+            'Is Correct',
+            'Answered At'
+        ]
+        return csv_response(iter_csv(header, rows), 'scores_answers.csv')
+    except Exception:
+        app.logger.exception("Download scores CSV error")
+        flash('Error downloading scores data. Please try again later.', 'danger')
+        return redirect(url_for('view_scores'))
+
 @app.route('/view_scores')
 @login_required
 def view_scores():
     try:
         db_session = Session()
-        candidate_count = db_session.query(Candidate).count()
-        candidates = {}
-        all_candidates = db_session.query(Candidate).all()
-        for candidate in all_candidates:
-            email = candidate.email
-            if email not in candidates:
-                candidates[email] = {
-                    'candidate_id': candidate.id,
-                    'full_name': candidate.full_name,
-                    'email': email,
-                    'total_attempts': db_session.query(Candidate).filter_by(email=email).count(),
-                    'attempts': []
-                }
-        scores = db_session.query(Score).join(Candidate).order_by(Candidate.email, Score.submitted_at).all()
-        for score in scores:
-            candidate = db_session.query(Candidate).filter_by(id=score.candidate_id).first()
-            if candidate:
-                # Fetch tab switch events for this attempt
-                events = db_session.query(TabSwitchEvent).filter_by(candidate_id=score.candidate_id, attempt_number=score.attempt_number).all()
-                candidates[candidate.email]['attempts'].append({
-                    'score_id': score.score_id,
-                    'attempt_number': score.attempt_number,
-                    'total_questions': score.total_questions,
-                    'correct_answers': score.correct_answers,
-                    'score_percent': score.score_percent,
-                    'submitted_at': score.submitted_at,
-                    'tab_switch_count': getattr(score, 'tab_switch_count', 0),
-                    'tab_switch_events': events
-                })
-        for email in candidates:
-            attempts = candidates[email]['attempts']
-            attempts.sort(key=lambda x: x['submitted_at'])
-            for i, attempt in enumerate(attempts, start=1):
-                attempt['attempt_number'] = i
+        filter_args, filters = parse_listing_filters(request.args)
+        # Page over the first candidate record of each email so every email
+        # appears exactly once with all of its attempts
+        earlier = aliased(Candidate)
+        query = db_session.query(Candidate.id, Candidate.email_normalized, Candidate.submitted_at).\
+            filter(~exists().where(and_(earlier.email_normalized == Candidate.email_normalized, earlier.id < Candidate.id)))
+        query = apply_candidate_filters(query, filters)
+        clauses = score_filter_clauses(filters)
+        if clauses:
+            attempt = aliased(Candidate)
+            query = query.filter(exists().where(and_(
+                Score.candidate_id == attempt.id, attempt.email_normalized == Candidate.email_normalized, *clauses)))
+        cursor = decode_cursor(request.args.get('cursor'))
+        if cursor:
+            query = query.filter(keyset_after(Candidate.submitted_at, Candidate.id, cursor))
+        first_records = query.order_by(Candidate.submitted_at.desc(), Candidate.id.desc()).\
+            limit(PAGE_SIZE + 1).all()
+        next_cursor = None
+        if len(first_records) > PAGE_SIZE:
+            first_records = first_records[:PAGE_SIZE]
+            next_cursor = encode_cursor(first_records[-1].submitted_at, first_records[-1].id)
+        email_keys = [record.email_normalized for record in first_records]
+        candidates = repository.score_overview(db_session, email_keys)
+        page_order = {key: i for i, key in enumerate(email_keys)}
+        candidates.sort(key=lambda c: page_order.get(repository.normalize_email(c['email']), len(page_order)))
         db_session.close()
-        return render_template('scores.html', candidates=list(candidates.values()))
-    except Exception as e:
-        app.logger.error(f"View scores error: {str(e)}")
+        return render_template('scores.html', candidates=candidates, filters=filter_args, next_cursor=next_cursor)
+    except Exception:
+        app.logger.exception("View scores error")
         flash('Error loading scores. Please try again later.', 'danger')
         return redirect(url_for('dashboard'))
 
@@ -246,20 +442,44 @@ def view_scores_by_set():
     try:
         db_session = Session()
         sets = [q.set_number for q in db_session.query(Question.set_number).distinct().order_by(Question.set_number).all()]
-        selected_set = request.form.get('set_number', sets[0] if sets else None)
+        selected_set = request.values.get('set_number', sets[0] if sets else None)
         if selected_set:
             selected_set = int(selected_set)
+        filter_args, filters = parse_listing_filters(request.values)
         if not sets:
             db_session.close()
-            return render_template('scores_by_set.html', sets=sets, selected_set=None, scores=[])
+            return render_template('scores_by_set.html', sets=sets, selected_set=None, scores=[], filters=filter_args, next_cursor=None, categories=[])
         
-        scores = db_session.query(Score, Candidate, Question.set_number).\
+        # scores.set_number is recorded at submission (and backfilled by migration 0002)
+        query = db_session.query(Score, Candidate).\
             join(Candidate, Score.candidate_id == Candidate.id).\
-            join(Answer, Answer.score_id == Score.score_id).\
-            join(Question, Answer.question_id == Question.question_id).\
-            filter(Question.set_number == selected_set).\
-            group_by(Score.score_id, Candidate.id, Question.set_number).\
-            order_by(Candidate.email, Score.attempt_number).all()
+            filter(Score.set_number == selected_set)
+        query = apply_candidate_filters(query, filters).filter(*score_filter_clauses(filters))
+        if filters.get('sort') == 'category':
+            # Strongest first in the chosen category, from the stored sub-scores
+            query = query.add_columns(ScoreCategory.percent).\
+                join(ScoreCategory, and_(ScoreCategory.score_id == Score.score_id,
+                                         ScoreCategory.category == filters['category']))
+            cursor = decode_rank_cursor(request.values.get('cursor'))
+            if cursor:
+                query = query.filter(or_(ScoreCategory.percent < cursor[0],
+                                         and_(ScoreCategory.percent == cursor[0], Score.score_id < cursor[1])))
+            scores = query.order_by(ScoreCategory.percent.desc(), Score.score_id.desc()).\
+                limit(PAGE_SIZE + 1).all()
+        else:
+            cursor = decode_cursor(request.values.get('cursor'))
+            if cursor:
+                query = query.filter(keyset_after(Score.submitted_at, Score.score_id, cursor))
+            scores = query.order_by(Score.submitted_at.desc(), Score.score_id.desc()).\
+                limit(PAGE_SIZE + 1).all()
+        next_cursor = None
+        if len(scores) > PAGE_SIZE:
+            scores = scores[:PAGE_SIZE]
+            if filters.get('sort') == 'category':
+                next_cursor = encode_rank_cursor(scores[-1].percent, scores[-1].Score.score_id)
+            else:
+                next_cursor = encode_cursor(scores[-1].Score.submitted_at, scores[-1].Score.score_id)
+        categories = repository.score_categories(db_session, [score.Score.score_id for score in scores])
         
         scores = [{
             'candidate_id': score.Candidate.id,
@@ -271,131 +491,188 @@ def view_scores_by_set():
             'correct_answers': score.Score.correct_answers,
             'score_percent': score.Score.score_percent,
             'submitted_at': score.Score.submitted_at,
-            'set_number': score.set_number
+            'set_number': selected_set,
+            'categories': categories.get(score.Score.score_id, [])
         } for score in scores]
+        set_categories = sorted({question.category for question in question_cache.get(selected_set)})
         
         db_session.close()
-        return render_template('scores_by_set.html', sets=sets, selected_set=selected_set, scores=scores)
-    except Exception as e:
-        app.logger.error(f"View scores by set error: {str(e)}")
+        return render_template('scores_by_set.html', sets=sets, selected_set=selected_set, scores=scores,
+                               filters=filter_args, next_cursor=next_cursor, categories=set_categories)
+    except Exception:
+        app.logger.exception("View scores by set error")
         flash('Error loading scores by set. Please try again later.', 'danger')
         return redirect(url_for('dashboard'))
 
-@app.route('/view_answers_by_set/<int:score_id>')
+@app.route('/item_analysis')
 @login_required
-def view_answers_by_set(score_id):
+def view_item_analysis():
+    """Difficulty, discrimination and distractor rates per question of a set, from item_stats"""
+    db_session = None
     try:
         db_session = Session()
-        score = db_session.query(Score, Candidate, Question.set_number).\
-            join(Candidate, Score.candidate_id == Candidate.id).\
-            join(Answer, Answer.score_id == Score.score_id).\
-            join(Question, Answer.question_id == Question.question_id).\
-            filter(Score.score_id == score_id).\
-            group_by(Score.score_id, Candidate.id, Question.set_number).first()
-        
-        if not score:
+        sets = [q.set_number for q in db_session.query(Question.set_number).distinct().order_by(Question.set_number).all()]
+        selected_set = request.args.get('set_number', type=int) or (sets[0] if sets else None)
+        items = []
+        if selected_set is not None:
+            item_stats.fold(engine, [selected_set])
+            items = item_stats.set_report(db_session, selected_set, question_cache.get(selected_set))
+        return render_template('item_analysis.html', sets=sets, selected_set=selected_set, items=items,
+                               min_responses=item_stats.MIN_RESPONSES)
+    except Exception:
+        app.logger.exception("Item analysis error")
+        flash('Error loading item analysis. Please try again later.', 'danger')
+        return redirect(url_for('dashboard'))
+    finally:
+        if db_session:
             db_session.close()
+
+def render_attempt(score_id, template, back_endpoint):
+    """Answer review for one score, shared by view_answers and view_answers_by_set"""
+    db_session = None
+    try:
+        db_session = Session()
+        detail = attempt_cache.get(db_session, score_id)
+        if detail is None:
             flash('Score not found.', 'danger')
-            return redirect(url_for('view_scores_by_set'))
-        
-        score_dict = {
-            'candidate_id': score.Candidate.id,
-            'full_name': score.Candidate.full_name,
-            'email': score.Candidate.email,
-            'score_id': score.Score.score_id,
-            'attempt_number': score.Score.attempt_number,
-            'total_questions': score.Score.total_questions,
-            'correct_answers': score.Score.correct_answers,
-            'score_percent': score.Score.score_percent,
-            'submitted_at': score.Score.submitted_at,
-            'set_number': score.set_number
-        }
-        
-        answers = db_session.query(Answer, Question).\
-            join(Question, Answer.question_id == Question.question_id).\
-            filter(Answer.score_id == score_id).\
-            order_by(Question.category, Question.question_id).all()
-        
-        answers = [{
-            'answer_id': answer.Answer.answer_id,
-            'selected_option': answer.Answer.selected_option,
-            'is_correct': answer.Answer.is_correct,
-            'answered_at': answer.Answer.answered_at,
-            'question_id': answer.Question.question_id,
-            'set_number': answer.Question.set_number,
-            'category': answer.Question.category,
-            'question_text': answer.Question.question_text,
-            'option_a': answer.Question.option_a,
-            'option_b': answer.Question.option_b,
-            'option_c': answer.Question.option_c,
-            'option_d': answer.Question.option_d,
-            'correct_option': answer.Question.correct_option
-        } for answer in answers]
-        
-        db_session.close()
-        return render_template('view_answers_by_set.html', score=score_dict, answers=answers)
-    except Exception as e:
-        app.logger.error(f"View answers by set error: {str(e)}")
+            return redirect(url_for(back_endpoint))
+        score, answers = detail
+        return render_template(template, score=score, answers=answers)
+    except Exception:
+        app.logger.exception("View answers error (score %s)", score_id)
         flash('Error loading answers. Please try again later.', 'danger')
-        return redirect(url_for('view_scores_by_set'))
+        return redirect(url_for(back_endpoint))
+    finally:
+        if db_session:
+            db_session.close()
+
+@app.route('/view_answers_by_set/<int:score_id>')
+@login_required
+def view_answers_by_set(score_id):
+    return render_attempt(score_id, 'view_answers_by_set.html', 'view_scores_by_set')
 
 @app.route('/view_answers/<int:score_id>')
 @login_required
 def view_answers(score_id):
+    return render_attempt(score_id, 'view_answers.html', 'view_scores')
+
+# Question cache invalidation on the candidate app
+CANDIDATE_APP_URL = os.getenv('CANDIDATE_APP_URL', 'http://localhost:8080')
+CACHE_INVALIDATION_TOKEN = os.getenv('CACHE_INVALIDATION_TOKEN')
+
+def notify_question_cache_invalidation(set_number=None):
+    """Ask the candidate app to drop its cached copy of a question set (or all sets).
+
+    Call this after editing questions so candidates never see stale text
+    or get graded against an outdated answer key.
+    """
+    if not CACHE_INVALIDATION_TOKEN:
+        app.logger.warning("CACHE_INVALIDATION_TOKEN not set; candidate app picks up the new question set version on its next check")
+        return False
+    payload = json.dumps({'set_number': set_number}).encode('utf-8')
+    req = urllib.request.Request(
+        f"{CANDIDATE_APP_URL}/internal/question-cache/invalidate",
+        data=payload,
+        headers={'Content-Type': 'application/json', 'X-Cache-Token': CACHE_INVALIDATION_TOKEN},
+        method='POST'
+    )
     try:
-        db_session = Session()
-        score = db_session.query(Score, Candidate, Question.set_number).\
-            join(Candidate, Score.candidate_id == Candidate.id).\
-            join(Answer, Answer.score_id == Score.score_id).\
-            join(Question, Answer.question_id == Question.question_id).\
-            filter(Score.score_id == score_id).\
-            group_by(Score.score_id, Candidate.id, Question.set_number).first()
-        
-        if not score:
-            db_session.close()
-            flash('Score not found.', 'danger')
-            return redirect(url_for('view_scores'))
-        
-        score_dict = {
-            'candidate_id': score.Candidate.id,
-            'full_name': score.Candidate.full_name,
-            'email': score.Candidate.email,
-            'score_id': score.Score.score_id,
-            'attempt_number': score.Score.attempt_number,
-            'total_questions': score.Score.total_questions,
-            'correct_answers': score.Score.correct_answers,
-            'score_percent': score.Score.score_percent,
-            'submitted_at': score.Score.submitted_at,
-            'set_number': score.set_number
-        }
-        
-        answers = db_session.query(Answer, Question).\
-            join(Question, Answer.question_id == Question.question_id).\
-            filter(Answer.score_id == score_id).\
-            order_by(Question.category, Question.question_id).all()
-        
-        answers = [{
-            'answer_id': answer.Answer.answer_id,
-            'selected_option': answer.Answer.selected_option,
-            'is_correct': answer.Answer.is_correct,
-            'answered_at': answer.Answer.answered_at,
-            'question_id': answer.Question.question_id,
-            'set_number': answer.Question.set_number,
-            'category': answer.Question.category,
-            'question_text': answer.Question.question_text,
-            'option_a': answer.Question.option_a,
-            'option_b': answer.Question.option_b,
-            'option_c': answer.Question.option_c,
-            'option_d': answer.Question.option_d,
-            'correct_option': answer.Question.correct_option
-        } for answer in answers]
-        
-        db_session.close()
-        return render_template('view_answers.html', score=score_dict, answers=answers)
+        with urllib.request.urlopen(req, timeout=5) as response:
+            return response.status == 200
     except Exception as e:
-        app.logger.error(f"View answers error: {str(e)}")
-        flash('Error loading answers. Please try again later.', 'danger')
-        return redirect(url_for('view_scores'))
+        app.logger.error("Question cache invalidation error: %s", e)
+        return False
+
+@app.route('/invalidate_question_cache', methods=['POST'])
+@login_required
+def invalidate_question_cache():
+    set_number = request.form.get('set_number')
+    set_number = int(set_number) if set_number else None
+    try:
+        # Every candidate-app worker sees the new version within QUESTION_VERSION_CHECK_SECONDS
+        with engine.begin() as connection:
+            repository.bump_question_set_versions(connection, [set_number] if set_number is not None else None)
+    except Exception:
+        app.logger.exception("Question set version bump failed")
+        flash('Could not refresh the question cache. It will expire automatically.', 'danger')
+        return redirect(url_for('dashboard'))
+    question_cache.invalidate(set_number)
+    # Immediate refresh for the worker that receives it; the others follow the version
+    notify_question_cache_invalidation(set_number)
+    flash('Question cache refreshed.', 'success')
+    return redirect(url_for('dashboard'))
+
+# Re-grades run in a background thread; one at a time per admin process
+regrade_lock = threading.Lock()
+regrade_status = {'running': False, 'request': None, 'report': None, 'error': None}
+
+def run_regrade(options):
+    try:
+        report = regrade.regrade(engine, **options)
+        regrade_status.update(report=report, error=None)
+        app.logger.info(regrade.format_report(report))
+    except Exception as e:
+        app.logger.exception("Re-grade failed")
+        regrade_status.update(report=None, error=str(e))
+    finally:
+        # Cached attempts would be revalidated anyway; drop them all to free the memory at once
+        attempt_cache.invalidate()
+        # regrade bumped the set version already; this only saves the wait for the next version check
+        if options.get('correct_option') and not options.get('dry_run'):
+            question_cache.invalidate()
+            notify_question_cache_invalidation(None)
+        regrade_status['running'] = False
+        regrade_lock.release()
+
+@app.route('/regrade', methods=['POST'])
+@login_required
+def start_regrade():
+    set_number = request.form.get('set_number')
+    question_id = request.form.get('question_id')
+    options = {
+        'set_number': int(set_number) if set_number else None,
+        'question_id': int(question_id) if question_id else None,
+        'correct_option': request.form.get('correct_option') or None,
+        'dry_run': request.form.get('dry_run') == 'on'
+    }
+    if (options['set_number'] is None) == (options['question_id'] is None):
+        flash('Choose either a question set or a single question to re-grade.', 'danger')
+        return redirect(url_for('dashboard'))
+    if options['correct_option'] is not None:
+        try:
+            options['correct_option'] = regrade.normalize_option(options['correct_option'])
+        except ValueError as e:
+            flash(str(e), 'danger')
+            return redirect(url_for('dashboard'))
+    if not regrade_lock.acquire(blocking=False):
+        flash('A re-grade is already running.', 'danger')
+        return redirect(url_for('dashboard'))
+    regrade_status.update(running=True, request=options, report=None, error=None)
+    threading.Thread(target=run_regrade, args=(options,), name='regrade', daemon=True).start()
+    flash('Re-grade started. Progress and results are at /regrade_status.', 'success')
+    return redirect(url_for('dashboard'))
+
+@app.route('/regrade_status')
+@login_required
+def view_regrade_status():
+    return jsonify(regrade_status)
+
+@app.route('/metrics')
+def prometheus_metrics():
+    if METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+        return Response('Forbidden\n', status=403, mimetype='text/plain')
+    body = request_metrics.render(numeric_gauges('db_pool', pool_stats(engine)))
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+@app.route('/pool_stats')
+@login_required
+def view_pool_stats():
+    return jsonify(pool_stats(engine))
+
+@app.route('/cache_stats')
+@login_required
+def view_cache_stats():
+    return jsonify({'questions': question_cache.stats(), 'attempts': attempt_cache.stats()})
 
 @app.route('/logout')
 def logout():
@@ -408,5 +685,5 @@ def test():
     return "Admin app is working!"
 
 if __name__ == '__main__':
-    print("Starting Flask Admin Application on port 5001...")
+    app.logger.info("Starting Flask Admin Application on port 5001...")
     app.run(debug=True, host='0.0.0.0', port=5001)
\ No newline at end of file
@@ -1,18 +1,30 @@
-from flask import Flask, render_template, request, redirect, session, url_for, flash, jsonify
+from flask import Flask, render_template, request, redirect, session, url_for, flash, jsonify, Response
 import re
 from datetime import datetime
-import traceback
 import boto3
-from botocore.exceptions import ClientError
 import os
+import tempfile
+import logging_config
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, Float, DateTime, ForeignKey, Text, DECIMAL
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.orm import sessionmaker
 from sqlalchemy.sql import func
-from sqlalchemy import Table
+from sqlalchemy import inspect
+from sqlalchemy.exc import OperationalError
+from question_cache import QuestionCache
+from attempt_sessions import AttemptSessionCache
+from proctoring import EVENT_TYPES, EventBuffer, RateLimiter, parse_client_timestamp
+from video_uploads import ChunkedVideoUploads, ChunkOutOfOrder, UploadError, UploadQueue, MIN_PART_SIZE
+from database import make_engine, pool_stats
+from instrumentation import RequestMetrics, numeric_gauges
+from models import Base, Candidate, TestHistory, Answer, Score, VideoUpload
+import grading
+import item_stats
+import repository
+from repository import AttemptLimitReached
 
 # Load environment variables from .env file
 load_dotenv()
+logging_config.configure_logging()
 
 app = Flask(__name__)
 app.secret_key = "supersecretkey"  # required for session management
@@ -22,6 +34,15 @@ app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 
 # Test configuration
 TEST_DURATION_MINUTES = 15  # Set test duration to 30 minutes
+TEST_GRACE_SECONDS = int(os.getenv('TEST_GRACE_SECONDS', 120))  # Late submissions still graded within this window
+ATTEMPT_SESSION_ENTRIES = int(os.getenv('ATTEMPT_SESSION_ENTRIES', 10000))
+MAX_ATTEMPTS = 5  # One attempt per question set
+REGISTRATION_RETRIES = 3  # Retries when parallel signups for one email deadlock
+
+# Question cache configuration
+QUESTION_CACHE_TTL_SECONDS = int(os.getenv('QUESTION_CACHE_TTL_SECONDS', 300))
+QUESTION_VERSION_CHECK_SECONDS = int(os.getenv('QUESTION_VERSION_CHECK_SECONDS', 5))  # Staleness bound across processes
+CACHE_INVALIDATION_TOKEN = os.getenv('CACHE_INVALIDATION_TOKEN')  # Shared with the admin app
 
 # AWS S3 configuration
 S3_BUCKET = os.getenv('S3_BUCKET')  # Must be set in environment
@@ -33,77 +54,75 @@ s3_client = boto3.client(
     region_name=S3_REGION
 )
 
-# SQLAlchemy setup
-Base = declarative_base()
-db_user = os.getenv('DB_USER')
-db_password = os.getenv('DB_PASSWORD')
-db_host = os.getenv('DB_HOST')
-db_name = os.getenv('DB_NAME')
-db_url = f'mysql+pymysql://{db_user}:{db_password}@{db_host}/{db_name}'
-engine = create_engine(db_url)
-Session = sessionmaker(bind=engine)
-
-# SQLAlchemy Models
-class Candidate(Base):
-    __tablename__ = 'candidates'
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    full_name = Column(String(100), nullable=False)
-    email = Column(String(100), nullable=False)
-    phone = Column(String(15), nullable=False)
-    area = Column(String(100))
-    city = Column(String(100))
-    pincode = Column(String(10))
-    position = Column(String(100), nullable=False)
-    has_experience = Column(Boolean, default=False)
-    previous_company = Column(String(100))
-    role = Column(String(100))
-    domain = Column(String(100))
-    years_experience = Column(Float)
-    tech_stack = Column(Text)
-    submitted_at = Column(DateTime)
-
-class Question(Base):
-    __tablename__ = 'questions'
-    question_id = Column(Integer, primary_key=True, autoincrement=True)
-    set_number = Column(Integer, nullable=False)
-    category = Column(String(50), nullable=False)
-    question_text = Column(Text, nullable=False)
-    option_a = Column(Text, nullable=False)
-    option_b = Column(Text, nullable=False)
-    option_c = Column(Text, nullable=False)
-    option_d = Column(Text, nullable=False)
-    correct_option = Column(String(1), nullable=False)
-
-class TestHistory(Base):
-    __tablename__ = 'test_history'
-    history_id = Column(Integer, primary_key=True, autoincrement=True)
-    candidate_id = Column(Integer, ForeignKey('candidates.id'))
-    question_id = Column(Integer, ForeignKey('questions.question_id'))
-    attempt_number = Column(Integer)
-    assigned_at = Column(DateTime)
-
-class Answer(Base):
-    __tablename__ = 'answers'
-    answer_id = Column(Integer, primary_key=True, autoincrement=True)
-    candidate_id = Column(Integer, ForeignKey('candidates.id'))
-    question_id = Column(Integer, ForeignKey('questions.question_id'))
-    selected_option = Column(String(1))
-    is_correct = Column(Boolean)
-    answered_at = Column(DateTime)
-    score_id = Column(Integer, ForeignKey('scores.score_id'))
-
-class Score(Base):
-    __tablename__ = 'scores'
-    score_id = Column(Integer, primary_key=True, autoincrement=True)
-    candidate_id = Column(Integer, ForeignKey('candidates.id'))
-    attempt_number = Column(Integer)
-    total_questions = Column(Integer)
-    correct_answers = Column(Integer)
-    score_percent = Column(DECIMAL(5,2))
-    submitted_at = Column(DateTime)
-    # tab_switch_count removed
+# Chunked video uploads: slices are spooled here and sent to S3 as multipart parts
+VIDEO_SPOOL_DIR = os.getenv('VIDEO_SPOOL_DIR', os.path.join(tempfile.gettempdir(), 'video_spool'))
+VIDEO_PART_SIZE = int(os.getenv('VIDEO_PART_SIZE', MIN_PART_SIZE))  # S3 minimum is 5 MiB
+video_uploads = ChunkedVideoUploads(s3_client, S3_BUCKET, VIDEO_SPOOL_DIR, VIDEO_PART_SIZE)
 
+# SQLAlchemy setup (pool settings come from the DB_POOL_* environment variables)
+engine = make_engine()
+Session = sessionmaker(bind=engine)
 
+# Request metrics: a Server-Timing header on every response, Prometheus text at /metrics
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')  # If set, scrapers send "Authorization: Bearer <token>"
+request_metrics = RequestMetrics(app, engine, server_timing=os.getenv('SERVER_TIMING', '1') == '1',
+                                 n_plus_one_threshold=int(os.getenv('N_PLUS_ONE_THRESHOLD', 0)))
+
+# Background S3 uploads: a fixed number of threads, each retrying with exponential backoff
+VIDEO_UPLOAD_WORKERS = int(os.getenv('VIDEO_UPLOAD_WORKERS', 4))
+VIDEO_UPLOAD_RETRIES = int(os.getenv('VIDEO_UPLOAD_RETRIES', 5))
+upload_queue = UploadQueue(video_uploads, Session, workers=VIDEO_UPLOAD_WORKERS, max_retries=VIDEO_UPLOAD_RETRIES)
+
+# Proctoring events: buffered per process, flushed every N events or T milliseconds
+PROCTORING_FLUSH_SIZE = int(os.getenv('PROCTORING_FLUSH_SIZE', 200))
+PROCTORING_FLUSH_INTERVAL_MS = int(os.getenv('PROCTORING_FLUSH_INTERVAL_MS', 1000))
+PROCTORING_RATE_PER_SECOND = float(os.getenv('PROCTORING_RATE_PER_SECOND', 2))  # Sustained events per candidate
+PROCTORING_BURST = int(os.getenv('PROCTORING_BURST', 60))
+MAX_EVENTS_PER_REQUEST = 100
+event_buffer = EventBuffer(Session, flush_size=PROCTORING_FLUSH_SIZE, flush_interval_ms=PROCTORING_FLUSH_INTERVAL_MS)
+event_rate_limiter = RateLimiter(rate_per_second=PROCTORING_RATE_PER_SECOND, burst=PROCTORING_BURST)
+
+# ---------- SCHEMA CHECK ----------
+def _comparable_type(column_type):
+    """Python type used to compare model and database column types (None if unknown)"""
+    try:
+        python_type = column_type.python_type
+    except NotImplementedError:
+        return None
+    # MySQL reflects BOOLEAN as TINYINT(1)
+    return int if python_type is bool else python_type
+
+def check_schema(bind=None):
+    """Validate the ORM models against the live database schema.
+
+    Runs once at startup instead of reflecting tables on every request.
+    Raises RuntimeError listing every missing table, missing column or
+    column whose type no longer matches the model.
+    """
+    inspector = inspect(bind or engine)
+    existing_tables = set(inspector.get_table_names())
+    problems = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            problems.append(f"missing table '{table.name}'")
+            continue
+        live_columns = {column['name']: column for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            live = live_columns.get(column.name)
+            if live is None:
+                problems.append(f"missing column '{table.name}.{column.name}'")
+                continue
+            expected, actual = _comparable_type(column.type), _comparable_type(live['type'])
+            if expected and actual and expected is not actual:
+                problems.append(f"column '{table.name}.{column.name}' is {live['type']}, model expects {column.type}")
+    if problems:
+        raise RuntimeError("Database schema does not match the models: " + "; ".join(problems))
+    app.logger.info("Schema check passed for %d tables", len(Base.metadata.sorted_tables))
+
+@app.cli.command('check-schema')
+def check_schema_command():
+    """Validate the models against the configured database."""
+    check_schema()
 
 # ---------- UTILITY FUNCTIONS ----------
 def validate_email(email): 
@@ -121,14 +140,11 @@ def get_candidate_id_by_email(email):
     db_session = None
     try:
         db_session = Session()
-        candidate = db_session.query(Candidate.id).filter(func.lower(Candidate.email) == func.lower(email.strip())).\
-            order_by(Candidate.submitted_at.desc()).first()
-        candidate_id = candidate.id if candidate else None
-        print(f"Email {email} -> Most recent Candidate ID: {candidate_id}")
+        candidate_id = repository.most_recent_candidate_id(db_session, email)
+        app.logger.debug("Most recent candidate ID for email: %s", candidate_id)
         return candidate_id
-    except Exception as e:
-        print(f"Error fetching candidate by email: {e}")
-        traceback.print_exc()
+    except Exception:
+        app.logger.exception("Error fetching candidate by email")
         return None
     finally:
         if db_session:
@@ -139,117 +155,80 @@ def get_all_candidate_ids_by_email(email):
     db_session = None
     try:
         db_session = Session()
-        candidates = db_session.query(Candidate.id).filter(func.lower(Candidate.email) == func.lower(email.strip())).\
-            order_by(Candidate.submitted_at.asc()).all()
-        candidate_ids = [candidate.id for candidate in candidates]
-        print(f"Email {email} -> All Candidate IDs: {candidate_ids}")
+        candidate_ids = repository.candidate_ids_for_email(db_session, email)
+        app.logger.debug("Email has %d candidate records", len(candidate_ids))
         return candidate_ids
-    except Exception as e:
-        print(f"Error fetching all candidate IDs by email: {e}")
-        traceback.print_exc()
+    except Exception:
+        app.logger.exception("Error fetching all candidate IDs by email")
         return []
     finally:
         if db_session:
             db_session.close()
 
-def get_attempt_number_for_email(email):
-    """Get the total number of attempts (candidate records) for this email"""
-    all_candidate_ids = get_all_candidate_ids_by_email(email)
-    attempt_number = len(all_candidate_ids)
-    print(f"Email {email} has {attempt_number} total attempts")
-    return attempt_number
+def register_candidate(data):
+    """Insert a new candidate record if the email is under the attempt cap.
 
-def insert_candidate(data):
-    """Insert new candidate into database - ALWAYS creates a new record"""
-    db_session = None
-    try:
+    The cap check and the INSERT run in one transaction (see
+    repository.register_candidate). Returns (candidate_id, attempt_number),
+    or (None, None) on a database error; raises AttemptLimitReached when the
+    email has no attempts left.
+    """
+    for retry in range(REGISTRATION_RETRIES):
         db_session = Session()
-        # Debug: Print available columns
-        table = Table('candidates', Base.metadata, autoload_with=engine)
-        columns = [column.name for column in table.columns]
-        print(f"Available columns in candidates table: {columns}")
-        
-        candidate = Candidate(
-            full_name=data["full_name"],
-            email=data["email"],
-            phone=data["phone"],
-            area=data["address"]["area"],
-            city=data["address"]["city"],
-            pincode=data["address"]["pincode"],
-            position=data["position"],
-            has_experience=data["experience"]["has_experience"],
-            previous_company=data["experience"]["previous_company"],
-            role=data["experience"]["role"],
-            domain=data["experience"]["domain"],
-            years_experience=data["experience"]["years_experience"],
-            tech_stack=",".join(data["tech_stack"]),
-            submitted_at=datetime.now()
-        )
-        db_session.add(candidate)
-        db_session.commit()
-        candidate_id = candidate.id
-        print(f"New candidate record inserted with ID: {candidate_id}")
-        return candidate_id
-    except Exception as e:
-        print(f"Database error during candidate insertion: {e}")
-        traceback.print_exc()
-        if db_session:
+        try:
+            candidate = Candidate(
+                full_name=data["full_name"],
+                email=data["email"],
+                email_normalized=repository.normalize_email(data["email"]),
+                phone=data["phone"],
+                area=data["address"]["area"],
+                city=data["address"]["city"],
+                pincode=data["address"]["pincode"],
+                position=data["position"],
+                has_experience=data["experience"]["has_experience"],
+                previous_company=data["experience"]["previous_company"],
+                role=data["experience"]["role"],
+                domain=data["experience"]["domain"],
+                years_experience=data["experience"]["years_experience"],
+                tech_stack=",".join(data["tech_stack"]),
+                submitted_at=datetime.now()
+            )
+            attempt_number = repository.register_candidate(db_session, candidate, MAX_ATTEMPTS)
+            db_session.commit()
+            app.logger.info("Registered candidate %s (attempt #%s)", candidate.id, attempt_number)
+            return candidate.id, attempt_number
+        except AttemptLimitReached:
             db_session.rollback()
-        return False
-    finally:
-        if db_session:
+            raise
+        except OperationalError as e:
+            # Parallel first signups for one email can deadlock on the index gap lock
+            db_session.rollback()
+            if retry == REGISTRATION_RETRIES - 1:
+                app.logger.exception("Candidate insertion failed after %d attempts", REGISTRATION_RETRIES)
+            else:
+                app.logger.warning("Retrying candidate insertion after database error: %s", e)
+        except Exception:
+            app.logger.exception("Database error during candidate insertion")
+            db_session.rollback()
+            break
+        finally:
             db_session.close()
+    return None, None
 
 def get_taken_sets_for_email(email):
     """Get all sets taken by all candidate records for this email"""
-    print(f"Getting taken sets for email: {email}")
     all_candidate_ids = get_all_candidate_ids_by_email(email)
     if not all_candidate_ids:
-        print(f"No candidates found for email: {email}")
         return []
     
     db_session = None
     try:
         db_session = Session()
-        taken_sets = db_session.query(Question.set_number).distinct().\
-            join(TestHistory, TestHistory.question_id == Question.question_id).\
-            filter(TestHistory.candidate_id.in_(all_candidate_ids)).\
-            union(
-                db_session.query(Question.set_number).distinct().\
-                join(Answer, Answer.question_id == Question.question_id).\
-                filter(Answer.candidate_id.in_(all_candidate_ids))
-            ).order_by(Question.set_number).all()
-        taken_sets = [row[0] for row in taken_sets]
-        print(f"Email {email} (all candidate IDs: {all_candidate_ids}) has taken sets: {taken_sets}")
-        return taken_sets
-    except Exception as e:
-        print(f"Error fetching taken sets for email: {e}")
-        traceback.print_exc()
-        return []
-    finally:
-        if db_session:
-            db_session.close()
-
-def get_taken_sets(candidate_id):
-    """Get sets already taken by a specific candidate"""
-    print(f"Getting taken sets for candidate: {candidate_id}")
-    db_session = None
-    try:
-        db_session = Session()
-        taken_sets = db_session.query(Question.set_number).distinct().\
-            join(TestHistory, TestHistory.question_id == Question.question_id).\
-            filter(TestHistory.candidate_id == candidate_id).\
-            union(
-                db_session.query(Question.set_number).distinct().\
-                join(Answer, Answer.question_id == Question.question_id).\
-                filter(Answer.candidate_id == candidate_id)
-            ).order_by(Question.set_number).all()
-        taken_sets = [row[0] for row in taken_sets]
-        print(f"Candidate {candidate_id} has taken sets: {taken_sets}")
+        taken_sets = repository.taken_sets(db_session, all_candidate_ids)
+        app.logger.debug("Candidates %s have taken sets %s", all_candidate_ids, taken_sets)
         return taken_sets
-    except Exception as e:
-        print(f"Error fetching taken sets: {e}")
-        traceback.print_exc()
+    except Exception:
+        app.logger.exception("Error fetching taken sets for email")
         return []
     finally:
         if db_session:
@@ -257,128 +236,145 @@ def get_taken_sets(candidate_id):
 
 def get_next_ordered_set(taken_sets):
     """Get next available set number"""
-    for set_num in range(1, 6):
+    for set_num in range(1, MAX_ATTEMPTS + 1):
         if set_num not in taken_sets:
             return set_num
     return None
 
+def load_question_set(set_number):
+    """Read one question set from the database as immutable cache records"""
+    db_session = Session()
+    try:
+        return repository.load_question_set(db_session, set_number)
+    finally:
+        db_session.close()
+
+def load_question_set_version(set_number):
+    db_session = Session()
+    try:
+        return repository.question_set_version(db_session, set_number)
+    finally:
+        db_session.close()
+
+question_cache = QuestionCache(load_question_set, ttl_seconds=QUESTION_CACHE_TTL_SECONDS,
+                               version_loader=load_question_set_version,
+                               version_check_seconds=QUESTION_VERSION_CHECK_SECONDS)
+
+# Attempt start times and deadlines, so /test reloads and submissions skip the database
+attempt_sessions = AttemptSessionCache(TEST_DURATION_MINUTES * 60, grace_seconds=TEST_GRACE_SECONDS,
+                                       max_entries=ATTEMPT_SESSION_ENTRIES)
+
 def get_questions(set_number):
-    """Get questions for a specific set"""
-    db_session = 'None'
+    """Get questions for a specific set (served from the in-process question cache)"""
     try:
-        db_session = Session()
-        questions = db_session.query(Question).filter(Question.set_number == set_number).\
-            order_by(Question.question_id).all()
+        questions = question_cache.get(set_number)
         if not questions:
-            print(f"No questions found for set {set_number}")
+            app.logger.warning("No questions found for set %s", set_number)
             return []
-        
-        result = [{
-            'question_id': q.question_id,
-            'question_text': q.question_text,
-            'option_a': q.option_a,
-            'option_b': q.option_b,
-            'option_c': q.option_c,
-            'option_d': q.option_d,
-            'correct_option': q.correct_option
-        } for q in questions]
-        print(f"Fetched {len(result)} questions for set {set_number}")
-        return result
-    except Exception as e:
-        print(f"Error fetching questions for set {set_number}: {e}")
-        traceback.print_exc()
+        return questions
+    except Exception:
+        app.logger.exception("Error fetching questions for set %s", set_number)
         return []
+
+def get_attempt_session(candidate_id, set_number, questions):
+    """The candidate's attempt at a set, from the attempt cache or rebuilt from the database.
+
+    Returns None if the set has not been assigned to the candidate yet; a
+    failed lookup raises, so it is never mistaken for a missing start.
+    """
+    attempt = attempt_sessions.get(candidate_id)
+    if attempt is not None and attempt.set_number == set_number:
+        return attempt
+    db_session = Session()
+    try:
+        started_at, submitted = repository.attempt_state(
+            db_session, candidate_id, set_number, [question.question_id for question in questions])
     finally:
-        if db_session:
-            db_session.close()
+        db_session.close()
+    if started_at is None:
+        return None
+    return attempt_sessions.start(candidate_id, set_number, started_at, submitted)
 
 def assign_questions_to_history(candidate_id, set_number, questions):
-    db_session = 'None'
+    """Record the assigned questions with one multi-row INSERT.
+
+    The assigned_at of these rows is the start of the attempt. Returns it
+    (the earlier one if the set was already assigned), or None on error.
+    """
+    db_session = None
     try:
         db_session = Session()
         # Check if questions are already assigned
-        existing_count = db_session.query(TestHistory).\
-            join(Question, TestHistory.question_id == Question.question_id).\
-            filter(TestHistory.candidate_id == candidate_id, Question.set_number == set_number).count()
-        if existing_count > 0:
-            print(f"Set {set_number} already assigned to candidate {candidate_id} ({existing_count} questions)")
-            return True
+        question_ids = [question.question_id for question in questions]
+        started_at = repository.attempt_started_at(db_session, candidate_id, question_ids)
+        if started_at is not None:
+            app.logger.debug("Set %s already assigned to candidate %s at %s", set_number, candidate_id, started_at)
+            return started_at
 
         # Get next attempt number
-        attempt_number = db_session.query(func.coalesce(func.max(TestHistory.attempt_number), 0) + 1).\
-            filter(TestHistory.candidate_id == candidate_id).scalar() or 1
+        attempt_number = repository.next_history_attempt(db_session, candidate_id)
 
         current_time = datetime.now()
-        for question in questions:
-            test_history = TestHistory(
-                candidate_id=candidate_id,
-                question_id=question['question_id'],
-                attempt_number=attempt_number,
-                assigned_at=current_time
-            )
-            db_session.add(test_history)
-
+        repository.insert_test_history(db_session, [{
+            'candidate_id': candidate_id,
+            'question_id': question.question_id,
+            'attempt_number': attempt_number,
+            'assigned_at': current_time
+        } for question in questions])
         db_session.commit()
-        print(f"Assigned {len(questions)} questions to history for candidate {candidate_id}, set {set_number}, attempt {attempt_number}")
-        return True
-    except Exception as e:
-        print(f"Error assigning questions to history: {e}")
-        traceback.print_exc()
+        app.logger.debug("Assigned %d questions to candidate %s, set %s, attempt %s",
+                         len(questions), candidate_id, set_number, attempt_number)
+        return current_time
+    except Exception:
+        app.logger.exception("Error assigning questions to history")
         if db_session:
             db_session.rollback()
-        return False
+        return None
     finally:
         if db_session:
             db_session.close()
 
 def save_test_results(candidate_id, set_number, questions, answers):
-    db_session = 'None'
+    """Grade and store a submission in one transaction.
+
+    Answers are written with a single multi-row INSERT linked to the new
+    score row; a resubmission for the same set replaces the previous one.
+    The attempt's item statistic deltas are appended in the same transaction;
+    the shared item_stats rows are only written by item_stats.fold.
+    """
+    db_session = None
     try:
         db_session = Session()
-        # Remove existing answers for this candidate and set
-        existing_answers = db_session.query(Answer).\
-            join(Question, Answer.question_id == Question.question_id).\
-            filter(Answer.candidate_id == candidate_id, Question.set_number == set_number).count()
-        if existing_answers > 0:
-            print(f"Answers already exist for candidate {candidate_id}, set {set_number}. Updating...")
-            db_session.query(Answer).\
-                join(Question, Answer.question_id == Question.question_id).\
-                filter(Answer.candidate_id == candidate_id, Question.set_number == set_number).delete(synchronize_session=False)
-            db_session.query(Score).\
-                filter(Score.candidate_id == candidate_id, Score.total_questions == db_session.query(func.count()).\
-                       select_from(Question).filter(Question.set_number == set_number).scalar()).delete(synchronize_session=False)
-            db_session.commit()
-
-        correct_answers = 0
         total_questions = len(questions)
+        # Remove existing answers (and their score) for this candidate and set
+        question_ids = [question.question_id for question in questions]
+        item_stats.remove_previous_attempts(db_session, candidate_id, question_ids)
+        replaced = repository.delete_set_answers(db_session, candidate_id, question_ids)
+        if replaced > 0:
+            repository.delete_set_scores(db_session, candidate_id, set_number, total_questions)
+
         answered_questions = len([a for a in answers.values() if a and a.strip()])
-        print(f"Processing {total_questions} questions for candidate {candidate_id}, set {set_number}")
-        print(f"Candidate answered {answered_questions} questions")
+
+        key = grading.AnswerKey(questions)
+        selected = [answers.get(question.question_id, "").strip() for question in questions]
+        result = grading.grade(key, key.selections([dict(zip(key.question_ids, selected))]))
+        correct_answers = int(result.correct_counts[0])
+        score_percentage = float(result.score_percent[0])
 
         current_time = datetime.now()
-        for question in questions:
-            question_id = question["question_id"]
-            user_answer = answers.get(question_id, "").strip()
-            is_correct = 0
-            if user_answer and user_answer == question["correct_option"]:
-                is_correct = 1
-                correct_answers += 1
-            answer = Answer(
-                candidate_id=candidate_id,
-                question_id=question_id,
-                selected_option=user_answer or None,
-                is_correct=is_correct,
-                answered_at=current_time
-            )
-            db_session.add(answer)
+        answer_rows = [{
+            'candidate_id': candidate_id,
+            'question_id': question.question_id,
+            'selected_option': user_answer or None,
+            'is_correct': int(is_correct),
+            'answered_at': current_time
+        } for question, user_answer, is_correct in zip(questions, selected, result.is_correct[0])]
 
-        score_percentage = (correct_answers / total_questions * 100) if total_questions > 0 else 0
-        print(f"Results: {correct_answers} correct out of {answered_questions} answered, {total_questions} total")
-        print(f"Score percentage: {score_percentage:.1f}%")
+        categories = grading.category_scores(key, result)
+        app.logger.debug("Category scores for candidate %s, set %s: %s", candidate_id, set_number, categories)
 
         # Get next attempt number for scores
-        attempt_number = db_session.query(func.coalesce(func.max(Score.attempt_number), 0) + 1).\
-            filter(Score.candidate_id == candidate_id).scalar() or 1
+        attempt_number = repository.next_score_attempt(db_session, candidate_id)
 
         score = Score(
             candidate_id=candidate_id,
@@ -386,15 +382,31 @@ def save_test_results(candidate_id, set_number, questions, answers):
             total_questions=total_questions,
             correct_answers=correct_answers,
             score_percent=score_percentage,
-            submitted_at=current_time
+            submitted_at=current_time,
+            set_number=set_number,
+            attempt_fingerprint=repository.attempt_fingerprint(
+                set_number, [(row['question_id'], row['selected_option']) for row in answer_rows]
+            )
         )
         db_session.add(score)
+        db_session.flush()
+        for row in answer_rows:
+            row['score_id'] = score.score_id
+        repository.insert_answers(db_session, answer_rows)
+        repository.insert_score_categories(db_session, score.score_id, categories)
+        item_stats.record_attempt(db_session, set_number, [
+            (row['question_id'], row['selected_option'], row['is_correct']) for row in answer_rows
+        ], correct_answers)
         db_session.commit()
-        print(f"Successfully saved results for candidate {candidate_id}, set {set_number}")
+        # The one INFO line of a submission
+        app.logger.info("Saved results for candidate %s, set %s: %d/%d correct (%d answered)%s",
+                        candidate_id, set_number, correct_answers, total_questions, answered_questions,
+                        ", replacing an earlier submission" if replaced > 0 else "",
+                        extra={'candidate_id': candidate_id, 'set_number': set_number,
+                               'score_percent': round(score_percentage, 2)})
         return True
-    except Exception as e:
-        print(f"Error saving test results: {e}")
-        traceback.print_exc()
+    except Exception:
+        app.logger.exception("Error saving test results for candidate %s, set %s", candidate_id, set_number)
         if db_session:
             db_session.rollback()
         return False
@@ -411,8 +423,7 @@ def register():
             tech_stack = request.form.getlist('tech_stack')
             has_exp = form.get('has_experience') == 'Yes'
 
-            print(f"Registration form data: {dict(form)}")
-            print(f"Tech stack: {tech_stack}")
+            app.logger.debug("Registration submitted with fields %s", sorted(form.keys()))
 
             required_fields = ['full_name', 'email', 'phone', 'area', 'city', 'pincode', 'position']
             missing = [k for k in required_fields if not form.get(k, '').strip()]
@@ -454,13 +465,6 @@ def register():
                 flash("Pincode must be exactly 6 digits.", "danger")
                 return render_template('register.html', form=form)
 
-            current_attempt_count = get_attempt_number_for_email(email)
-            next_attempt_number = current_attempt_count + 1
-            
-            if current_attempt_count >= 5:
-                flash("You have already completed all available test sets (maximum 5 attempts).", "info")
-                return render_template('register.html', form=form)
-
             candidate_data = {
                 "full_name": form['full_name'].strip(),
                 "email": email,
@@ -481,8 +485,11 @@ def register():
                 }
             }
 
-            print(f"Creating NEW candidate record (attempt #{next_attempt_number}): {candidate_data}")
-            candidate_id = insert_candidate(candidate_data)
+            try:
+                candidate_id, next_attempt_number = register_candidate(candidate_data)
+            except AttemptLimitReached:
+                flash(f"You have already completed all available test sets (maximum {MAX_ATTEMPTS} attempts).", "info")
+                return render_template('register.html', form=form)
             
             if candidate_id:
                 session.clear()
@@ -500,9 +507,8 @@ def register():
                 flash("Error during registration. Please try again.", "danger")
                 return render_template('register.html', form=form)
 
-        except Exception as e:
-            print(f"Error in registration: {e}")
-            traceback.print_exc()
+        except Exception:
+            app.logger.exception("Error in registration")
             flash("An unexpected error occurred. Please try again.", "danger")
             return render_template('register.html', form=request.form)
 
@@ -515,9 +521,7 @@ def test():
         return redirect(url_for("register"))
     
     candidate_id = session['candidate_id']
-    candidate_email = session.get('candidate_email', '')
     attempt_number = session.get('attempt_number', 1)
-    print(f"Test page accessed by candidate ID: {candidate_id}, Email: {candidate_email}, Attempt: {attempt_number}")
 
     if request.method == 'POST':
         try:
@@ -526,8 +530,6 @@ def test():
                 flash("Invalid test submission.", "danger")
                 return redirect(url_for("test"))
             
-            print(f"Processing test submission for candidate {candidate_id}, set {current_set}")
-            
             answers = {}
             for key, value in request.form.items():
                 if key.startswith('q_') and value and value.strip():
@@ -535,72 +537,127 @@ def test():
                         question_id = int(key[2:])
                         answers[question_id] = value.strip()
                     except ValueError:
-                        print(f"Invalid question ID in form: {key}")
+                        app.logger.debug("Invalid question ID in form: %s", key)
                         continue
             
-            print(f"Candidate {candidate_id} submitted answers for set {current_set}: {len(answers)} questions answered")
-            
             questions = get_questions(current_set)
             if not questions:
                 flash("Error retrieving questions. Please try again.", "danger")
                 return redirect(url_for("test"))
-            
+
+            # The browser waits only briefly for the video; whatever has arrived is uploaded
+            seal_open_upload()
+
+            # The browser timer is advisory; the deadline is enforced here
+            attempt = get_attempt_session(candidate_id, current_set, questions)
+            if attempt is None:
+                # Every served test records its start, so this set was never opened by this candidate
+                app.logger.warning("Rejected submission from candidate %s, set %s: no recorded start",
+                                   candidate_id, current_set,
+                                   extra={'candidate_id': candidate_id, 'set_number': current_set})
+                flash("This assessment was not started, so the submission was not accepted.", "danger")
+                return redirect(url_for("test"))
+            if not attempt_sessions.accepts(attempt):
+                late_seconds = (datetime.now() - attempt.deadline).total_seconds()
+                app.logger.warning("Rejected submission from candidate %s, set %s: %.0fs past the deadline",
+                                   candidate_id, current_set, late_seconds,
+                                   extra={'candidate_id': candidate_id, 'set_number': current_set,
+                                          'late_seconds': round(late_seconds)})
+                flash("The time limit for this assessment has passed, so the submission was not accepted.", "danger")
+                session['last_completed_set'] = current_set
+                session['test_completed'] = True
+                return redirect(url_for("completed"))
+
             if save_test_results(candidate_id, current_set, questions, answers):
+                attempt_sessions.mark_submitted(candidate_id)
                 flash("Assessment submitted successfully!", "success")
                 session['last_completed_set'] = current_set
                 session['test_completed'] = True  # Mark test as completed
-                print(f"Test results saved for candidate {candidate_id}, set {current_set}")
             else:
                 flash("Failed to save assessment results. Please contact support.", "danger")
             
             return redirect(url_for("completed"))
             
-        except Exception as e:
-            print(f"Error processing test submission: {e}")
-            traceback.print_exc()
+        except Exception:
+            app.logger.exception("Error processing test submission for candidate %s", candidate_id)
             flash("An error occurred while submitting your test. Please try again.", "danger")
             return redirect(url_for("test"))
 
     try:
         assigned_set = attempt_number
         
-        if assigned_set > 5:
-            flash("No more assessments available. Maximum 5 attempts allowed.", "info")
+        if assigned_set > MAX_ATTEMPTS:
+            flash(f"No more assessments available. Maximum {MAX_ATTEMPTS} attempts allowed.", "info")
             return redirect(url_for("completed"))
         
-        taken_sets_for_candidate = get_taken_sets(candidate_id)
-        if assigned_set in taken_sets_for_candidate:
+        questions = get_questions(assigned_set)
+        if not questions:
+            flash(f"No questions available for set {assigned_set}. Please contact support.", "danger")
+            return redirect(url_for("register"))
+
+        # Reloads are served from the attempt cache; only the first load writes the assignment
+        attempt = get_attempt_session(candidate_id, assigned_set, questions)
+        if attempt is None:
+            started_at = assign_questions_to_history(candidate_id, assigned_set, questions)
+            if started_at is None:
+                # Without a recorded start the submission would be rejected
+                flash("The assessment could not be started. Please try again.", "danger")
+                return redirect(url_for("register"))
+            attempt = attempt_sessions.start(candidate_id, assigned_set, started_at)
+
+        if attempt.submitted:
             flash(f"You have already completed set {assigned_set} in this session.", "info")
             session['last_completed_set'] = assigned_set
             session['test_completed'] = True
             return redirect(url_for("completed"))
 
-        print(f"Assigning set {assigned_set} to candidate {candidate_id} (attempt #{attempt_number})")
+        time_left = attempt_sessions.remaining_seconds(attempt)
+        if time_left == 0:
+            flash("The time limit for this assessment has passed.", "info")
+            session['last_completed_set'] = assigned_set
+            session['test_completed'] = True
+            return redirect(url_for("completed"))
 
-        questions = get_questions(assigned_set)
-        if not questions:
-            flash(f"No questions available for set {assigned_set}. Please contact support.", "danger")
-            return redirect(url_for("register"))
-        
-        if not assign_questions_to_history(candidate_id, assigned_set, questions):
-            print("Failed to assign questions to history, but continuing...")
-        
-        print(f"Displaying {len(questions)} questions for set {assigned_set} (attempt #{attempt_number})")
+        app.logger.info("Serving set %s to candidate %s (attempt #%s)", assigned_set, candidate_id, attempt_number)
         return render_template('test.html', 
                              questions=questions, 
                              current_set=assigned_set, 
                              attempt_number=attempt_number,
                              test_duration=TEST_DURATION_MINUTES,
+                             time_left=time_left,
                              candidate_id=candidate_id)  # Pass candidate_id to template
         
-    except Exception as e:
-        print(f"Error displaying test: {e}")
-        traceback.print_exc()
+    except Exception:
+        app.logger.exception("Error displaying test for candidate %s", candidate_id)
         flash("An error occurred while loading the test. Please try again.", "danger")
         return redirect(url_for("register"))
 
+def video_key(candidate_id, attempt_number):
+    timestamp = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+    filename = f"candidate{candidate_id}attempt{attempt_number}{timestamp}.webm"
+    return f"Interview-questions/interview-videos/{filename}"  # Store under Interview-questions/interview-videos/
+
+def queue_finished_upload(token):
+    """Seal a recording on local disk and hand it to the background uploader"""
+    video_uploads.seal(token)
+    upload_queue.finish(token)
+
+def seal_open_upload():
+    """Queue the session's open recording, if the browser submitted before /upload-video/complete"""
+    token = session.pop('video_upload_token', None)
+    if token:
+        try:
+            queue_finished_upload(token)
+        except UploadError:
+            app.logger.warning("Open video upload %s could not be sealed on submission", token)
+
 @app.route('/upload-video', methods=['POST'])
 def upload_video():
+    """Whole-recording upload (used when the chunked endpoints are unavailable).
+
+    The file is spooled to local disk and uploaded in the background; the
+    response is 202 as soon as it is safely stored.
+    """
     if 'candidate_id' not in session:
         return jsonify({'message': 'Unauthorized access'}), 401
     
@@ -608,35 +665,152 @@ def upload_video():
     attempt_number = session.get('attempt_number', 1)
     
     if 'video' not in request.files:
-        print(f"No video file received for candidate {candidate_id}")
+        app.logger.warning("No video file received for candidate %s", candidate_id)
         return jsonify({'message': 'No video file'}), 400
     
     video = request.files['video']
     if video:
         try:
-            timestamp = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
-            filename = f"candidate{candidate_id}attempt{attempt_number}{timestamp}.webm"
-            s3_key = f"Interview-questions/interview-videos/{filename}"  # Store under Interview-questions/interview-videos/
-            
-            # Upload to S3
-            s3_client.upload_fileobj(
-                video,
-                S3_BUCKET,
-                s3_key,
-                ExtraArgs={'ContentType': 'video/webm'}  # Set content type for video
-            )
-            print(f"Video uploaded to S3 for candidate {candidate_id}: {s3_key}")
-            return jsonify({'message': 'Video uploaded to S3'}), 200
-        except ClientError as e:
-            print(f"Error uploading video to S3 for candidate {candidate_id}: {e}")
-            return jsonify({'message': f'Error uploading video: {str(e)}'}), 500
+            s3_key = video_key(candidate_id, attempt_number)
+            token = video_uploads.save_file(s3_key, video.stream)
+            upload_queue.track(token, candidate_id, attempt_number, s3_key, 'pending')
+            upload_queue.finish(token)
+            app.logger.info("Video queued for upload for candidate %s: %s", candidate_id, s3_key)
+            return jsonify({'message': 'Video received', 'upload_token': token}), 202
         except Exception as e:
-            print(f"Unexpected error uploading video for candidate {candidate_id}: {e}")
+            app.logger.exception("Unexpected error saving video for candidate %s", candidate_id)
             return jsonify({'message': f'Error uploading video: {str(e)}'}), 500
     
     return jsonify({'message': 'Error uploading video'}), 400
 
+@app.route('/upload-video/start', methods=['POST'])
+def start_video_upload():
+    """Open a chunked upload for this attempt.
+
+    A recording left open by an earlier page load is queued as it is, so what
+    was already received is kept as its own object instead of being mixed
+    with a new MediaRecorder stream.
+    """
+    if 'candidate_id' not in session:
+        return jsonify({'message': 'Unauthorized access'}), 401
+
+    candidate_id = session['candidate_id']
+    attempt_number = session.get('attempt_number', 1)
+    try:
+        previous_token = session.pop('video_upload_token', None)
+        if previous_token:
+            try:
+                queue_finished_upload(previous_token)
+            except UploadError:
+                pass
+        s3_key = video_key(candidate_id, attempt_number)
+        token = video_uploads.start(s3_key)
+        upload_queue.track(token, candidate_id, attempt_number, s3_key, 'recording')
+    except Exception as e:
+        app.logger.exception("Error starting video upload for candidate %s", candidate_id)
+        return jsonify({'message': f'Error starting video upload: {str(e)}'}), 500
+    session['video_upload_token'] = token
+    return jsonify({'upload_token': token, 'next_sequence': 0}), 200
+
+@app.route('/upload-video/chunk', methods=['POST'])
+def upload_video_chunk():
+    """Append one MediaRecorder slice; the raw request body is streamed to the spool file"""
+    if 'candidate_id' not in session:
+        return jsonify({'message': 'Unauthorized access'}), 401
+
+    token = session.get('video_upload_token')
+    sequence = request.args.get('sequence', type=int)
+    if not token or token != request.args.get('token') or sequence is None:
+        return jsonify({'message': 'Invalid upload token or sequence'}), 400
+
+    try:
+        state = video_uploads.append(token, sequence, request.stream)
+    except ChunkOutOfOrder as e:
+        return jsonify({'message': str(e), 'next_sequence': e.expected}), 409
+    except UploadError as e:
+        return jsonify({'message': str(e)}), 404
+    if state['part_ready']:
+        upload_queue.sync(token)
+    return jsonify({'next_sequence': state['next_sequence'], 'duplicate': state['duplicate']}), 200
+
+@app.route('/upload-video/complete', methods=['POST'])
+def complete_video_upload():
+    """Seal the recording and return 202; S3 is finished by the upload queue"""
+    if 'candidate_id' not in session:
+        return jsonify({'message': 'Unauthorized access'}), 401
+
+    candidate_id = session['candidate_id']
+    token = session.pop('video_upload_token', None)
+    if not token:
+        return jsonify({'message': 'No video upload in progress'}), 400
+
+    try:
+        queue_finished_upload(token)
+    except UploadError as e:
+        return jsonify({'message': str(e)}), 404
+    app.logger.info("Video queued for upload for candidate %s", candidate_id)
+    return jsonify({'message': 'Video received', 'upload_token': token}), 202
+
+@app.route('/upload-video/status')
+def video_upload_status():
+    """Upload status of the current candidate's recordings"""
+    if 'candidate_id' not in session:
+        return jsonify({'message': 'Unauthorized access'}), 401
+
+    db_session = None
+    try:
+        db_session = Session()
+        uploads = db_session.query(VideoUpload).filter(VideoUpload.candidate_id == session['candidate_id']).\
+            order_by(VideoUpload.created_at).all()
+        return jsonify({'uploads': [{
+            'upload_token': upload.token,
+            'attempt_number': upload.attempt_number,
+            'status': upload.status,
+            'attempts': upload.attempts,
+            'updated_at': upload.updated_at.isoformat() if upload.updated_at else None
+        } for upload in uploads]}), 200
+    finally:
+        if db_session:
+            db_session.close()
+
 
+@app.route('/tab-switch', methods=['POST'])
+def tab_switch():
+    """Accept a batch of proctoring events: {"events": [{"event_type", "timestamp"}, ...]}.
+
+    A body without "events" is treated as one tab_switch_out event, which is
+    what older pages send. Events are buffered and written in batches, so
+    the response is 202; 429 means some were refused by the rate limit.
+    """
+    if 'candidate_id' not in session:
+        return jsonify({'message': 'Unauthorized access'}), 401
+
+    candidate_id = session['candidate_id']
+    attempt_number = session.get('attempt_number', 1)
+    data = request.get_json(silent=True) or {}
+    events = data.get('events')
+    if events is None:
+        events = [{'event_type': 'tab_switch_out', 'timestamp': data.get('timestamp')}]
+    if not isinstance(events, list):
+        return jsonify({'message': 'events must be a list'}), 400
+
+    rows = []
+    for event in events[:MAX_EVENTS_PER_REQUEST]:
+        if not isinstance(event, dict) or event.get('event_type') not in EVENT_TYPES:
+            continue
+        rows.append({
+            'candidate_id': candidate_id,
+            'attempt_number': attempt_number,
+            'event_type': event['event_type'],
+            'timestamp': parse_client_timestamp(event.get('timestamp'))
+        })
+
+    granted = event_rate_limiter.take(candidate_id, len(rows))
+    accepted = event_buffer.add(rows[:granted])
+    if granted < len(rows):
+        app.logger.warning("Rate limited tab switch events for candidate %s: %d dropped", candidate_id, len(rows) - granted)
+        return jsonify({'message': 'Too many events', 'accepted': accepted}), 429
+    return jsonify({'accepted': accepted}), 202
 
 @app.route('/completed')
 def completed():
@@ -655,17 +829,12 @@ def completed():
     db_session = None
     try:
         db_session = Session()
-        total_answered = db_session.query(func.count()).\
-            select_from(Answer).\
-            join(Question, Answer.question_id == Question.question_id).\
-            filter(Answer.candidate_id == candidate_id, Question.set_number == current_set, 
-                   Answer.selected_option != None, Answer.selected_option != '').scalar() or 0
-        total_questions = db_session.query(func.count()).\
-            select_from(Question).filter(Question.set_number == current_set).scalar() or 30
-        print(f"Candidate {candidate_id} (attempt #{attempt_number}) answered {total_answered} out of {total_questions} questions in set {current_set}")
-    except Exception as e:
-        print(f"Error getting completion stats: {e}")
-        traceback.print_exc()
+        total_answered = repository.answered_count(db_session, candidate_id, current_set)
+        total_questions = repository.set_question_count(db_session, current_set) or 30
+        app.logger.debug("Candidate %s (attempt #%s) answered %d of %d questions in set %s",
+                         candidate_id, attempt_number, total_answered, total_questions, current_set)
+    except Exception:
+        app.logger.exception("Error getting completion stats for candidate %s", candidate_id)
     finally:
         if db_session:
             db_session.close()
@@ -679,6 +848,34 @@ def completed():
                          attempt_number=attempt_number,
                          success=True)
 
+def cache_token_valid():
+    token = request.headers.get('X-Cache-Token')
+    return bool(CACHE_INVALIDATION_TOKEN) and token == CACHE_INVALIDATION_TOKEN
+
+@app.route('/internal/question-cache', methods=['GET'])
+def question_cache_stats():
+    if not cache_token_valid():
+        return jsonify({'message': 'Forbidden'}), 403
+    return jsonify(question_cache.stats()), 200
+
+@app.route('/internal/question-cache/invalidate', methods=['POST'])
+def invalidate_question_cache():
+    if not cache_token_valid():
+        return jsonify({'message': 'Forbidden'}), 403
+    data = request.get_json(silent=True) or {}
+    set_number = data.get('set_number')
+    question_cache.invalidate(int(set_number) if set_number is not None else None)
+    app.logger.info("Question cache invalidated (set: %s)", set_number if set_number is not None else 'all')
+    return jsonify({'message': 'Question cache invalidated', 'stats': question_cache.stats()}), 200
+
+@app.route('/metrics')
+def prometheus_metrics():
+    if METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+        return Response('Forbidden\n', status=403, mimetype='text/plain')
+    body = request_metrics.render({**numeric_gauges('db_pool', pool_stats(engine)),
+                                   **numeric_gauges('attempt_sessions', attempt_sessions.stats())})
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
 @app.route('/debug/db')
 def debug_db():
     db_session = None
@@ -692,6 +889,30 @@ def debug_db():
         if db_session:
             db_session.close()
 
+@app.route('/debug/pool')
+def debug_pool():
+    return jsonify(pool_stats(engine)), 200
+
+@app.route('/debug/uploads')
+def debug_uploads():
+    db_session = None
+    try:
+        db_session = Session()
+        counts = dict(db_session.query(VideoUpload.status, func.count(VideoUpload.upload_id)).\
+            group_by(VideoUpload.status).all())
+        return jsonify({'queue': upload_queue.stats(), 'status_counts': counts}), 200
+    finally:
+        if db_session:
+            db_session.close()
+
+@app.route('/debug/proctoring')
+def debug_proctoring():
+    return jsonify(event_buffer.stats()), 200
+
+@app.route('/debug/attempt-sessions')
+def debug_attempt_sessions():
+    return jsonify(attempt_sessions.stats()), 200
+
 @app.route('/debug/tables')
 def debug_tables():
     db_session = None
@@ -699,10 +920,10 @@ def debug_tables():
         db_session = Session()
         tables_info = {}
         
+        inspector = inspect(engine)
         for table in ['candidates', 'questions', 'test_history', 'answers', 'scores']:
             try:
-                table_obj = Table(table, Base.metadata, autoload_with=engine)
-                tables_info[table] = [(column.name, str(column.type)) for column in table_obj.columns]
+                tables_info[table] = [(column['name'], str(column['type'])) for column in inspector.get_columns(table)]
             except Exception as e:
                 tables_info[table] = f"Error: {e}"
         
@@ -722,7 +943,7 @@ def debug_candidate_history(email):
     db_session = None
     try:
         db_session = Session()
-        candidates = db_session.query(Candidate).filter(func.lower(Candidate.email) == func.lower(email)).\
+        candidates = db_session.query(Candidate).filter(Candidate.email_normalized == repository.normalize_email(email)).\
             order_by(Candidate.submitted_at).all()
         
         result = f"<h2>All Records for Email: {email}</h2>"
@@ -750,6 +971,14 @@ def debug_candidate_history(email):
         if db_session:
             db_session.close()
 
+# Fail fast on schema drift, also under a WSGI server; tests and tooling opt out with SCHEMA_CHECK_ON_STARTUP=0
+if os.getenv('SCHEMA_CHECK_ON_STARTUP', '1') == '1':
+    check_schema()
+
+# Re-queue uploads interrupted by a restart (enable in one process only)
+if os.getenv('VIDEO_UPLOAD_RESUME_ON_STARTUP', '0') == '1':
+    app.logger.info("Resumed %d pending video uploads", upload_queue.resume_pending())
+
 if __name__ == '__main__':
-    print("Starting Flask Assessment Application...")
+    app.logger.info("Starting Flask Assessment Application...")
     app.run(debug=True, host='0.0.0.0', port=8080)
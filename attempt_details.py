@@ -0,0 +1,158 @@
+"""Cached attempt details for the admin answer-review pages.
+
+A submitted attempt does not change, and reviewers flip between
+view_answers and view_answers_by_set for the same score, so the answer rows
+of each attempt are kept in an LRU cache keyed by score_id and bounded both
+by entry count and by approximate memory use.
+
+Every page view still reads the score header (one primary-key lookup,
+joined to the set's question_set_versions row); cached answers are used
+only while the score's attempt_fingerprint and grade_version and the set's
+version match the ones stored with the entry. A resubmission replaces the score and its fingerprint, a re-grade
+bumps grade_version on every score whose answers flipped (even when the
+total stays the same), and a key or text change bumps the set version,
+which also covers attempts whose answers did not flip but whose correct
+option is shown. A miss asks the question cache for the set at the header's
+version, so answers are never rebuilt from question text cached under an
+older one. This holds when the change happens in another process, e.g.
+`manage.py regrade`.
+
+Question text is not copied into the cache: each AnswerDetail points at the
+shared CachedQuestion record from the question cache.
+"""
+import sys
+import threading
+from collections import OrderedDict, namedtuple
+
+from models import Answer, Candidate, Question, QuestionSetVersion, Score
+from question_cache import CachedQuestion
+
+
+class AnswerDetail(namedtuple('AnswerDetail', [
+    'answer_id',
+    'selected_option',
+    'is_correct',
+    'answered_at',
+    'question'
+])):
+    """One answer plus its question; question fields read through (answer.question_text)"""
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        return getattr(self.question, name)
+
+
+def _answer_size(answer):
+    # The question is shared with the question cache, so it is not counted here
+    return sys.getsizeof(answer) + sum(sys.getsizeof(value) for value in answer[:-1])
+
+
+class AttemptDetailCache:
+    """Thread-safe LRU of attempt answers keyed by score_id"""
+
+    def __init__(self, question_cache, max_entries=500, max_bytes=8 * 1024 * 1024):
+        self.question_cache = question_cache
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # score_id -> (version, answers, size)
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, db_session, score_id):
+        """(score dict, tuple of AnswerDetail) for a score, or None if it does not exist"""
+        header = db_session.query(Score, Candidate, QuestionSetVersion.version).\
+            join(Candidate, Score.candidate_id == Candidate.id).\
+            outerjoin(QuestionSetVersion, QuestionSetVersion.set_number == Score.set_number).\
+            filter(Score.score_id == score_id).first()
+        if header is None:
+            self.invalidate(score_id)
+            return None
+        score, candidate, set_version = header
+        set_version = set_version or 0  # No question_set_versions row yet
+        version = (score.attempt_fingerprint, score.correct_answers, score.grade_version, set_version)
+
+        with self._lock:
+            entry = self._entries.get(score_id)
+            if entry and entry[0] == version:
+                self._entries.move_to_end(score_id)
+                self.hits += 1
+                answers = entry[1]
+            else:
+                self.misses += 1
+                answers = None
+        if answers is None:
+            answers = self._load_answers(db_session, score, set_version)
+            self._put(score_id, version, answers)
+
+        return {
+            'candidate_id': candidate.id,
+            'full_name': candidate.full_name,
+            'email': candidate.email,
+            'score_id': score.score_id,
+            'attempt_number': score.attempt_number,
+            'total_questions': score.total_questions,
+            'correct_answers': score.correct_answers,
+            'score_percent': score.score_percent,
+            'submitted_at': score.submitted_at,
+            'set_number': score.set_number
+        }, answers
+
+    def _load_answers(self, db_session, score, set_version):
+        rows = db_session.query(Answer.answer_id, Answer.question_id, Answer.selected_option,
+                                Answer.is_correct, Answer.answered_at).\
+            filter(Answer.score_id == score.score_id).all()
+        questions = {}
+        if score.set_number is not None:
+            questions = {question.question_id: question
+                         for question in self.question_cache.get(score.set_number, version=set_version)}
+        # Answers outside the cached set (edited or legacy data) are read directly
+        missing = [row.question_id for row in rows if row.question_id not in questions]
+        if missing:
+            for row in db_session.query(
+                    Question.question_id, Question.category, Question.question_text, Question.option_a,
+                    Question.option_b, Question.option_c, Question.option_d, Question.correct_option).\
+                    filter(Question.question_id.in_(missing)):
+                questions[row.question_id] = CachedQuestion(*row)
+        answers = [AnswerDetail(row.answer_id, row.selected_option, row.is_correct, row.answered_at,
+                                questions[row.question_id])
+                   for row in rows if row.question_id in questions]
+        answers.sort(key=lambda answer: (answer.question.category, answer.question.question_id))
+        return tuple(answers)
+
+    def _put(self, score_id, version, answers):
+        size = sys.getsizeof(answers) + sum(_answer_size(answer) for answer in answers)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(score_id, None)
+            if previous:
+                self._bytes -= previous[2]
+            self._entries[score_id] = (version, answers, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def invalidate(self, score_id=None):
+        """Drop one attempt, or everything when score_id is None"""
+        with self._lock:
+            if score_id is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            entry = self._entries.pop(score_id, None)
+            if entry:
+                self._bytes -= entry[2]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes
+            }
@@ -0,0 +1,95 @@
+"""Server-side attempt sessions for the candidate app.
+
+The start of an attempt is recorded once: it is the assigned_at of the
+attempt's test_history rows, written when /test first serves the set. From
+then on the candidate app keeps one AttemptSession per candidate id in
+memory, so reloads of /test and the deadline check on submission are
+answered without a database round trip. A miss (another worker process, a
+restart, an evicted entry) is rebuilt from test_history and scores by the
+caller, so every process enforces the same deadline.
+
+A submission is accepted until deadline + grace_seconds; the grace window
+covers the browser's own auto-submit at zero (it first stops the recording)
+and network latency.
+"""
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timedelta
+
+AttemptSession = namedtuple('AttemptSession', [
+    'candidate_id',
+    'set_number',
+    'started_at',
+    'deadline',
+    'submitted'
+])
+
+RETAIN_AFTER_CLOSE = timedelta(minutes=10)  # Keep closed attempts briefly so late reloads stay cheap
+
+
+class AttemptSessionCache:
+    """Thread-safe LRU of AttemptSession keyed by candidate id"""
+
+    def __init__(self, duration_seconds, grace_seconds=0, max_entries=10000):
+        self.duration = timedelta(seconds=duration_seconds)
+        self.grace = timedelta(seconds=grace_seconds)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # candidate_id -> AttemptSession
+        self.hits = 0
+        self.misses = 0
+        self.late_submissions = 0
+
+    def get(self, candidate_id, now=None):
+        """The cached session, or None if the caller has to load it from the database"""
+        now = now or datetime.now()
+        with self._lock:
+            attempt = self._entries.get(candidate_id)
+            if attempt is None or now > attempt.deadline + self.grace + RETAIN_AFTER_CLOSE:
+                self._entries.pop(candidate_id, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(candidate_id)
+            self.hits += 1
+            return attempt
+
+    def start(self, candidate_id, set_number, started_at, submitted=False):
+        """Cache the session of an attempt that started at started_at (from test_history)"""
+        attempt = AttemptSession(candidate_id, set_number, started_at, started_at + self.duration, submitted)
+        with self._lock:
+            self._entries[candidate_id] = attempt
+            self._entries.move_to_end(candidate_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return attempt
+
+    def mark_submitted(self, candidate_id):
+        with self._lock:
+            attempt = self._entries.get(candidate_id)
+            if attempt is not None:
+                self._entries[candidate_id] = attempt._replace(submitted=True)
+
+    def remaining_seconds(self, attempt, now=None):
+        """Whole seconds left before the deadline (0 once it has passed)"""
+        return max(0, int((attempt.deadline - (now or datetime.now())).total_seconds()))
+
+    def accepts(self, attempt, submitted_at=None):
+        """True if a submission at submitted_at is inside the deadline plus the grace window"""
+        submitted_at = submitted_at or datetime.now()
+        if submitted_at <= attempt.deadline + self.grace:
+            return True
+        with self._lock:
+            self.late_submissions += 1
+        return False
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'late_submissions': self.late_submissions,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'duration_seconds': int(self.duration.total_seconds()),
+                'grace_seconds': int(self.grace.total_seconds())
+            }
@@ -0,0 +1,252 @@
+"""Time the admin listing, review and export pages against synthetic data.
+
+Usage:
+    python benchmarks/admin_pages.py [--db-url URL] [--answers 10000 100000 1000000]
+                                     [--repeat 5] [--output FILE] [--compare BASELINE.json]
+
+For each scale the database is refilled by benchmarks/synthetic_data.py and
+every page below is requested --repeat times through the admin app's test
+client, logged in. Per page the report gives the median wall time including
+reading the whole body (CSV exports stream), the share of it spent rendering
+the Jinja template, the SQL statements run (counted with an engine event, so
+streamed exports are included), the response size, and the peak RSS of the process while the page was being
+served (sampled from /proc, or the lifetime high-water mark elsewhere).
+
+The answer-review cache is cleared before every request so view_answers is
+measured cold; the question-set cache stays warm, as it is in production.
+Results are written as JSON; --compare prints the change against an earlier run.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import quote_plus
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+PAGE_SIZE_BYTES = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+RSS_SAMPLE_SECONDS = 0.002
+
+
+def pages(category, set_number, score_id):
+    """(name, url) of every measured page"""
+    return [
+        ('view_scores', '/view_scores'),
+        ('view_scores_filtered', '/view_scores?city=Pune&min_score=50'),
+        ('view_scores_by_set', f'/view_scores_by_set?set_number={set_number}'),
+        ('view_scores_by_set_category', f'/view_scores_by_set?set_number={set_number}&category={quote_plus(category)}&sort=category'),
+        ('view_answers', f'/view_answers/{score_id}'),
+        ('download_candidates_csv', '/download_candidates_csv'),
+        ('download_scores_csv', '/download_scores_csv'),
+    ]
+
+
+def current_rss():
+    """Resident set size in bytes, or None where /proc is not available"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE_BYTES
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def max_rss():
+    """Lifetime peak RSS in bytes (ru_maxrss is KiB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class RssSampler:
+    """Peak RSS while the with-block runs, sampled from a background thread"""
+
+    def __enter__(self):
+        self.start = current_rss()
+        self.peak = self.start or 0
+        self._stop = threading.Event()
+        if self.start is not None:
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(RSS_SAMPLE_SECONDS):
+            self.peak = max(self.peak, current_rss() or 0)
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self.start is None:
+            self.peak = max_rss()
+        else:
+            self._thread.join()
+            self.peak = max(self.peak, current_rss() or 0)
+        return False
+
+
+class RenderTimer:
+    """Seconds spent in render_template, from Flask's template signals"""
+
+    def __init__(self, app):
+        from flask import before_render_template, template_rendered
+
+        self.seconds = 0.0
+        self._started = None
+        before_render_template.connect(self._before, app)
+        template_rendered.connect(self._after, app)
+
+    def _before(self, sender, **extra):
+        self._started = time.perf_counter()
+
+    def _after(self, sender, **extra):
+        if self._started is not None:
+            self.seconds += time.perf_counter() - self._started
+            self._started = None
+
+
+class StatementCounter:
+    """SQL statements executed on an engine; the harness is single-threaded"""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.count = 0
+        event.listen(engine, 'after_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def measure(client, admin, render_timer, statement_counter, url):
+    admin.attempt_cache.invalidate()
+    render_timer.seconds = 0.0
+    statement_counter.count = 0
+    with RssSampler() as rss:
+        start = time.perf_counter()
+        response = client.get(url)
+        body = response.get_data()
+        elapsed = time.perf_counter() - start
+    return {
+        'status': response.status_code,
+        'seconds': elapsed,
+        'render_seconds': render_timer.seconds,
+        'statements': statement_counter.count,
+        'bytes': len(body),
+        'peak_rss': rss.peak,
+        'rss_growth': rss.peak - rss.start if rss.start is not None else None
+    }
+
+
+def summarize(samples):
+    seconds = [sample['seconds'] for sample in samples]
+    median = statistics.median(seconds)
+    render = statistics.median(sample['render_seconds'] for sample in samples)
+    growth = [sample['rss_growth'] for sample in samples if sample['rss_growth'] is not None]
+    return {
+        'status': samples[-1]['status'],
+        'median_ms': round(median * 1000, 2),
+        'min_ms': round(min(seconds) * 1000, 2),
+        'max_ms': round(max(seconds) * 1000, 2),
+        'render_ms': round(render * 1000, 2),
+        'statements': samples[-1]['statements'],
+        'bytes': samples[-1]['bytes'],
+        'peak_rss_mb': round(max(sample['peak_rss'] for sample in samples) / 2 ** 20, 1),
+        'rss_growth_mb': round(max(growth) / 2 ** 20, 1) if growth else None
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_scale(scale, result, baseline=None):
+    counts = result['rows']
+    print(f"\n{scale:,} answers ({counts['candidates']:,} candidates, {counts['scores']:,} scores), "
+          f"generated in {result['generate_seconds']:.1f}s")
+    print(f"{'page':30s} {'median ms':>10s} {'render ms':>10s} {'stmts':>6s} {'KiB':>9s} "
+          f"{'peak RSS MB':>12s} {'growth MB':>10s}")
+    previous = (baseline or {}).get('scales', {}).get(str(scale), {}).get('pages', {})
+    for name, stats in result['pages'].items():
+        line = (f"{name:30s} {stats['median_ms']:10.1f} {stats['render_ms']:10.1f} {stats['statements']:6d} "
+                f"{stats['bytes'] / 1024:9.1f} {stats['peak_rss_mb']:12.1f} {stats['rss_growth_mb'] or 0:10.1f}")
+        if stats['status'] != 200:
+            line += f"   HTTP {stats['status']}"
+        if name in previous:
+            line += f"   {stats['median_ms'] - previous[name]['median_ms']:+.1f} ms vs baseline"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db-url', default='sqlite:///benchmarks/admin_pages_bench.db')
+    parser.add_argument('--answers', type=int, nargs='+', default=[10000, 100000, 1000000],
+                        help='scales to run, as answers rows')
+    parser.add_argument('--repeat', type=int, default=5, help='requests per page and scale')
+    parser.add_argument('--sets', type=int, default=5)
+    parser.add_argument('--questions', type=int, default=30, help='questions per set')
+    parser.add_argument('--output', help='JSON result file (default benchmarks/results/admin_pages-<time>.json)')
+    parser.add_argument('--compare', help='earlier JSON result to diff against')
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = args.db_url
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    import admin
+    import synthetic_data
+
+    admin.app.config['TESTING'] = True
+    render_timer = RenderTimer(admin.app)
+    statement_counter = StatementCounter(admin.engine)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    result = {
+        'benchmark': 'admin_pages',
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'database': admin.engine.dialect.name,
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'scales': {}
+    }
+    for scale in args.answers:
+        start = time.perf_counter()
+        rows = synthetic_data.generate(admin.engine, scale, args.sets, args.questions)
+        generate_seconds = time.perf_counter() - start
+        admin.question_cache.invalidate()
+
+        client = admin.app.test_client()
+        with client.session_transaction() as session:
+            session['admin_logged_in'] = True
+        middle_score = max(1, rows['scores'] // 2)
+        measured = {}
+        for name, url in pages(synthetic_data.CATEGORIES[0], 1, middle_score):
+            client.get(url).get_data()  # warm-up: imports, template compilation, question cache
+            measured[name] = summarize([measure(client, admin, render_timer, statement_counter, url)
+                                        for _ in range(args.repeat)])
+        result['scales'][str(scale)] = {'rows': rows, 'generate_seconds': round(generate_seconds, 2),
+                                        'pages': measured}
+        print_scale(scale, result['scales'][str(scale)], baseline)
+
+    output = args.output or os.path.join(ROOT, 'benchmarks', 'results',
+                                         f"admin_pages-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == '__main__':
+    main()
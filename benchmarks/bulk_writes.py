@@ -0,0 +1,107 @@
+"""Benchmark per-row ORM writes against the bulk write path for test submissions.
+
+Usage:
+    python benchmarks/bulk_writes.py [--db-url URL] [--submissions 100 1000] [--workers N]
+
+Each submission assigns a 30-question set to a fresh candidate and then saves
+graded answers, run concurrently from a thread pool. The per-row variant is the
+pre-change implementation (one db_session.add() per question).
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('SCHEMA_CHECK_ON_STARTUP', '0')  # The benchmark creates its own tables after import
+
+from sqlalchemy import create_engine
+from sqlalchemy.sql import func
+
+import app as candidate_app
+from models import Base, Answer, Candidate, Question, Score, TestHistory
+
+QUESTIONS_PER_SET = 30
+
+
+def per_row_submission(candidate_id, questions, answers):
+    """The pre-change write path: one ORM add per TestHistory and Answer row"""
+    db_session = candidate_app.Session()
+    try:
+        current_time = datetime.now()
+        for question in questions:
+            db_session.add(TestHistory(candidate_id=candidate_id, question_id=question.question_id,
+                                       attempt_number=1, assigned_at=current_time))
+        db_session.commit()
+        correct_answers = 0
+        for question in questions:
+            user_answer = answers.get(question.question_id, "")
+            is_correct = 1 if user_answer and user_answer == question.correct_option else 0
+            correct_answers += is_correct
+            db_session.add(Answer(candidate_id=candidate_id, question_id=question.question_id,
+                                  selected_option=user_answer or None, is_correct=is_correct,
+                                  answered_at=current_time))
+        attempt_number = db_session.query(func.coalesce(func.max(Score.attempt_number), 0) + 1).\
+            filter(Score.candidate_id == candidate_id).scalar() or 1
+        db_session.add(Score(candidate_id=candidate_id, attempt_number=attempt_number,
+                             total_questions=len(questions), correct_answers=correct_answers,
+                             score_percent=correct_answers / len(questions) * 100, submitted_at=current_time))
+        db_session.commit()
+    finally:
+        db_session.close()
+
+
+def bulk_submission(candidate_id, questions, answers):
+    candidate_app.assign_questions_to_history(candidate_id, 1, questions)
+    candidate_app.save_test_results(candidate_id, 1, questions, answers)
+
+
+def seed(engine, submissions):
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    db_session = candidate_app.Session()
+    for i in range(QUESTIONS_PER_SET):
+        db_session.add(Question(set_number=1, category='Logical Reasoning', question_text=f'Question {i}',
+                                option_a='A', option_b='B', option_c='C', option_d='D',
+                                correct_option='ABCD'[i % 4]))
+    for i in range(submissions):
+        db_session.add(Candidate(full_name=f'Bench {i}', email=f'bench{i}@example.com', phone='9999999999',
+                                 position='Engineer', submitted_at=datetime.now()))
+    db_session.commit()
+    candidate_ids = [row.id for row in db_session.query(Candidate.id).order_by(Candidate.id)]
+    db_session.close()
+    return candidate_ids
+
+
+def run(label, write, engine, submissions, workers):
+    candidate_ids = seed(engine, submissions)
+    candidate_app.question_cache.invalidate()
+    questions = candidate_app.get_questions(1)
+    answers = {question.question_id: 'A' for question in questions}
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(lambda candidate_id: write(candidate_id, questions, answers), candidate_ids))
+    elapsed = time.perf_counter() - start
+    print(f"{label:8s} {submissions:5d} submissions  {elapsed:7.2f} s  {submissions / elapsed:8.1f} submissions/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db-url', default='sqlite:///benchmarks/bulk_writes_bench.db')
+    parser.add_argument('--submissions', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--workers', type=int, default=16)
+    args = parser.parse_args()
+
+    connect_args = {'timeout': 60} if args.db_url.startswith('sqlite') else {}
+    engine = create_engine(args.db_url, connect_args=connect_args, pool_size=args.workers, max_overflow=0)
+    candidate_app.Session.configure(bind=engine)
+
+    for submissions in args.submissions:
+        run('per-row', per_row_submission, engine, submissions, args.workers)
+        run('bulk', bulk_submission, engine, submissions, args.workers)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,286 @@
+"""Load test of the candidate exam flow over HTTP.
+
+Usage:
+    python benchmarks/exam_flow.py [--db-url URL] [--users 200] [--concurrency 20]
+                                   [--no-video] [--output FILE] [--compare BASELINE.json]
+
+Each virtual user runs the whole flow against the candidate app served by a
+threaded Werkzeug server in this process: register, load /test, record a
+short video through the chunked upload endpoints, report tab switches,
+submit answers and load /completed. S3 is faked with moto, so the upload
+queue really completes multipart uploads, and the database defaults to a
+throwaway SQLite file (point --db-url at a local MySQL for real numbers).
+
+Per step the report gives p50/p95/p99 latency measured by the client and the
+mean number of SQL statements, read from the Server-Timing header the app
+adds to every response. Results are written as JSON; --compare prints the
+change against an earlier run.
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+STEPS = ['register_form', 'register', 'test_page', 'video_start', 'video_chunk', 'video_complete',
+         'tab_switch', 'submit', 'completed']
+_STATEMENTS = re.compile(r'desc="(\d+) statements"')
+_APP_DURATION = re.compile(r'app;dur=([\d.]+)')
+_QUESTION_FIELD = re.compile(r'name="q_(\d+)"')
+_CURRENT_SET = re.compile(r'name="current_set" value="(\d+)"')
+
+
+def configure_environment(db_url):
+    """Point the app at the benchmark database and a fake S3 before it is imported"""
+    os.environ['DATABASE_URL'] = db_url
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'benchmark')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'benchmark')
+    os.environ['S3_BUCKET'] = 'exam-flow-benchmark'
+    os.environ['S3_REGION'] = 'us-east-1'
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ.setdefault('LOG_LEVELS', 'werkzeug=WARNING')
+    os.environ['SERVER_TIMING'] = '1'
+    os.environ.setdefault('SCHEMA_CHECK_ON_STARTUP', '0')  # Tables are created after the app is imported
+
+
+def prepare_database(candidate_app, sets, questions_per_set):
+    from sqlalchemy import event
+
+    from models import Base, Question
+
+    engine = candidate_app.engine
+    if engine.dialect.name == 'sqlite':
+        @event.listens_for(engine, 'connect')
+        def sqlite_pragmas(dbapi_connection, connection_record):
+            # Concurrent writers wait instead of failing with "database is locked"
+            dbapi_connection.execute('PRAGMA journal_mode=WAL')
+            dbapi_connection.execute('PRAGMA busy_timeout=60000')
+        engine.dispose()
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    db_session = candidate_app.Session()
+    categories = ['Logical Reasoning', 'Analytical Thinking', 'English Proficiency']
+    db_session.add_all(Question(set_number=set_number, category=categories[i % len(categories)],
+                                question_text=f'Question {set_number}.{i}', option_a='A', option_b='B',
+                                option_c='C', option_d='D', correct_option='ABCD'[i % 4])
+                       for set_number in range(1, sets + 1) for i in range(questions_per_set))
+    db_session.commit()
+    db_session.close()
+    candidate_app.question_cache.invalidate()
+
+
+class Recorder:
+    """Thread-safe per-step samples: (client seconds, server seconds, statements, ok)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+
+    def add(self, step, elapsed, response, ok):
+        timing = response.headers.get('Server-Timing', '') if response is not None else ''
+        statements = _STATEMENTS.search(timing)
+        server = _APP_DURATION.search(timing)
+        with self._lock:
+            self.samples[step].append((elapsed, float(server.group(1)) / 1000 if server else None,
+                                       int(statements.group(1)) if statements else None, ok))
+
+
+def timed(recorder, step, send, expected):
+    start = time.perf_counter()
+    try:
+        response = send()
+    except Exception:
+        recorder.add(step, time.perf_counter() - start, None, False)
+        raise
+    recorder.add(step, time.perf_counter() - start, response, response.status_code in expected)
+    return response
+
+
+def candidate_flow(base_url, recorder, user, video_chunks, chunk_bytes):
+    import requests
+
+    http = requests.Session()
+    form = {'full_name': f'Load User {user}', 'email': f'load{user}-{uuid.uuid4().hex[:8]}@example.com',
+            'phone': '9999999999', 'area': 'Area', 'city': 'City', 'pincode': '560001',
+            'position': 'Engineer', 'tech_stack': 'Python', 'has_experience': 'No'}
+    timed(recorder, 'register_form', lambda: http.get(f'{base_url}/'), {200})
+    timed(recorder, 'register', lambda: http.post(f'{base_url}/', data=form, allow_redirects=False), {302})
+    page = timed(recorder, 'test_page', lambda: http.get(f'{base_url}/test', allow_redirects=False), {200})
+    question_ids = _QUESTION_FIELD.findall(page.text)
+    current_set = _CURRENT_SET.search(page.text)
+
+    if video_chunks:
+        started = timed(recorder, 'video_start', lambda: http.post(f'{base_url}/upload-video/start'), {200})
+        token = started.json().get('upload_token')
+        for sequence in range(video_chunks):
+            timed(recorder, 'video_chunk', lambda: http.post(
+                f'{base_url}/upload-video/chunk', params={'token': token, 'sequence': sequence},
+                data=os.urandom(chunk_bytes), headers={'Content-Type': 'application/octet-stream'}), {200})
+        timed(recorder, 'video_complete', lambda: http.post(f'{base_url}/upload-video/complete'), {202})
+
+    now = datetime.now(timezone.utc).isoformat()
+    events = [{'event_type': 'tab_switch_out', 'timestamp': now}, {'event_type': 'tab_switch_in', 'timestamp': now}]
+    timed(recorder, 'tab_switch', lambda: http.post(f'{base_url}/tab-switch', json={'events': events}), {202})
+
+    answers = {f'q_{question_id}': 'ABCD'[(user + i) % 4] for i, question_id in enumerate(question_ids)}
+    answers['current_set'] = current_set.group(1) if current_set else '1'
+    timed(recorder, 'submit', lambda: http.post(f'{base_url}/test', data=answers, allow_redirects=False), {302})
+    timed(recorder, 'completed', lambda: http.get(f'{base_url}/completed'), {200})
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[round(fraction * 100) - 1]
+
+
+def summarize(samples):
+    latencies = sorted(sample[0] for sample in samples)
+    server = [sample[1] for sample in samples if sample[1] is not None]
+    statements = [sample[2] for sample in samples if sample[2] is not None]
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for sample in samples if not sample[3]),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'max_ms': round(latencies[-1] * 1000, 2),
+        'server_mean_ms': round(statistics.fmean(server) * 1000, 2) if server else None,
+        'statements_per_request': round(statistics.fmean(statements), 2) if statements else None
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def wait_for_uploads(candidate_app, timeout):
+    deadline = time.monotonic() + timeout
+    while candidate_app.upload_queue.stats()['queued'] and time.monotonic() < deadline:
+        time.sleep(0.1)
+    from sqlalchemy.sql import func
+    from models import VideoUpload
+    db_session = candidate_app.Session()
+    try:
+        return dict(db_session.query(VideoUpload.status, func.count(VideoUpload.upload_id)).
+                    group_by(VideoUpload.status).all())
+    finally:
+        db_session.close()
+
+
+def print_report(result, baseline=None):
+    print(f"{result['overall']['flows']} flows in {result['overall']['seconds']:.1f}s "
+          f"({result['overall']['flows_per_second']:.1f} flows/s, "
+          f"{result['overall']['requests_per_second']:.1f} requests/s), concurrency {result['config']['concurrency']}")
+    print(f"{'step':16s} {'requests':>8s} {'errors':>6s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} {'stmts':>6s}")
+    for step, stats in result['steps'].items():
+        line = (f"{step:16s} {stats['requests']:8d} {stats['errors']:6d} {stats['p50_ms']:8.1f} "
+                f"{stats['p95_ms']:8.1f} {stats['p99_ms']:8.1f} {stats['statements_per_request'] or 0:6.1f}")
+        previous = (baseline or {}).get('steps', {}).get(step)
+        if previous:
+            line += f"   p95 {stats['p95_ms'] - previous['p95_ms']:+.1f} ms vs baseline"
+        print(line)
+    print(f"video uploads: {result['video_uploads']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db-url', default='sqlite:///benchmarks/exam_flow_bench.db')
+    parser.add_argument('--users', type=int, default=200, help='virtual candidates, each running the flow once')
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--sets', type=int, default=5)
+    parser.add_argument('--questions', type=int, default=30, help='questions per set')
+    parser.add_argument('--video-chunks', type=int, default=3, help='chunks posted per recording')
+    parser.add_argument('--chunk-bytes', type=int, default=64 * 1024)
+    parser.add_argument('--no-video', action='store_true')
+    parser.add_argument('--output', help='JSON result file (default benchmarks/results/exam_flow-<time>.json)')
+    parser.add_argument('--compare', help='earlier JSON result to diff against')
+    args = parser.parse_args()
+
+    configure_environment(args.db_url)
+    from moto import mock_aws
+    with mock_aws():
+        import boto3
+        from werkzeug.serving import make_server
+
+        import app as candidate_app
+
+        boto3.client('s3', region_name='us-east-1').create_bucket(Bucket=os.environ['S3_BUCKET'])
+        prepare_database(candidate_app, args.sets, args.questions)
+        server = make_server('127.0.0.1', 0, candidate_app.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{server.server_port}'
+
+        recorder = Recorder()
+        video_chunks = 0 if args.no_video else args.video_chunks
+        start = time.perf_counter()
+        failed_flows = 0
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            futures = [pool.submit(candidate_flow, base_url, recorder, user, video_chunks, args.chunk_bytes)
+                       for user in range(args.users)]
+            for future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    failed_flows += 1
+                    print(f"flow failed: {e}", file=sys.stderr)
+        elapsed = time.perf_counter() - start
+        candidate_app.event_buffer.flush()
+        uploads = wait_for_uploads(candidate_app, timeout=60)
+        server.shutdown()
+
+    total_requests = sum(len(samples) for samples in recorder.samples.values())
+    result = {
+        'benchmark': 'exam_flow',
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'database': candidate_app.engine.dialect.name,
+        'overall': {
+            'flows': args.users,
+            'failed_flows': failed_flows,
+            'seconds': round(elapsed, 3),
+            'flows_per_second': round(args.users / elapsed, 2),
+            'requests_per_second': round(total_requests / elapsed, 2),
+            **summarize([sample for samples in recorder.samples.values() for sample in samples])
+        },
+        'steps': {step: summarize(recorder.samples[step]) for step in STEPS if recorder.samples.get(step)},
+        'video_uploads': uploads
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+
+    output = args.output or os.path.join(ROOT, 'benchmarks', 'results',
+                                         f"exam_flow-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"Results written to {output}")
+    return 1 if failed_flows else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
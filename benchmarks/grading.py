@@ -0,0 +1,69 @@
+"""Benchmark the per-question grading loop against the vectorized grading engine.
+
+Usage:
+    python benchmarks/grading.py [--attempts 1000 10000 100000] [--questions 30]
+
+Both variants grade the same random submissions; the script checks that the
+correct counts and percentages are identical before reporting timings.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import grading
+from question_cache import CachedQuestion
+
+CATEGORIES = ['Logical Reasoning', 'Analytical Thinking', 'English Proficiency']
+
+
+def loop_grade(questions, submissions):
+    """The pre-change rule, one question at a time"""
+    results = []
+    for answers in submissions:
+        correct_answers = 0
+        for question in questions:
+            user_answer = answers.get(question.question_id, "").strip()
+            if user_answer and user_answer == question.correct_option:
+                correct_answers += 1
+        total = len(questions)
+        results.append((correct_answers, (correct_answers / total * 100) if total > 0 else 0))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--attempts', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--questions', type=int, default=30)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    questions = [CachedQuestion(i, CATEGORIES[i % len(CATEGORIES)], f'q{i}', 'a', 'b', 'c', 'd', rng.choice('ABCD'))
+                 for i in range(1, args.questions + 1)]
+    for count in args.attempts:
+        submissions = [{question.question_id: rng.choice(['A', 'B', 'C', 'D', '']) for question in questions}
+                       for _ in range(count)]
+
+        start = time.perf_counter()
+        expected = loop_grade(questions, submissions)
+        loop_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        key = grading.AnswerKey(questions)
+        selections = key.selections(submissions)
+        encode_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        result = grading.grade(key, selections)
+        grade_seconds = time.perf_counter() - start
+
+        actual = list(zip(result.correct_counts.tolist(), result.score_percent.tolist()))
+        assert actual == expected, "vectorized results differ from the loop"
+        print(f"{count:>7} attempts: loop {loop_seconds:.3f}s, "
+              f"vectorized {encode_seconds + grade_seconds:.3f}s (encode {encode_seconds:.3f}s, grade {grade_seconds:.4f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Benchmark the registration write path against the original implementation.
+
+Usage:
+    python benchmarks/registration_insert.py [--db-url URL] [--iterations N]
+
+The original path fetched every candidate id for the email in one session,
+then reflected the candidates table and inserted in a second one. The current
+path is a single transaction with a COUNT ... FOR UPDATE and one INSERT.
+
+Defaults to a throwaway SQLite file. Point --db-url at a MySQL instance to see
+the round trips that the original path paid.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('SCHEMA_CHECK_ON_STARTUP', '0')  # The benchmark creates its own tables after import
+
+from sqlalchemy import MetaData, Table, create_engine
+
+import app as candidate_app
+import repository
+from models import Base, Candidate
+
+
+def sample_candidate(i):
+    return {
+        "full_name": f"Bench Candidate {i}",
+        "email": f"bench{i}@example.com",
+        "phone": "9999999999",
+        "address": {"area": "Area", "city": "City", "pincode": "560001"},
+        "position": "Engineer",
+        "tech_stack": ["Python"],
+        "experience": {
+            "has_experience": False,
+            "previous_company": "",
+            "role": "",
+            "domain": "",
+            "years_experience": 0.0
+        }
+    }
+
+
+def original_registration(engine, data):
+    """The pre-change path: list the email's candidate ids, reflect the table, then insert"""
+    db_session = candidate_app.Session()
+    try:
+        len(repository.candidate_ids_for_email(db_session, data["email"]))
+    finally:
+        db_session.close()
+    table = Table('candidates', MetaData(), autoload_with=engine)
+    [column.name for column in table.columns]
+    db_session = candidate_app.Session()
+    try:
+        candidate = Candidate(
+            full_name=data["full_name"], email=data["email"],
+            email_normalized=repository.normalize_email(data["email"]), phone=data["phone"],
+            area=data["address"]["area"], city=data["address"]["city"], pincode=data["address"]["pincode"],
+            position=data["position"], has_experience=data["experience"]["has_experience"],
+            tech_stack=",".join(data["tech_stack"]), submitted_at=datetime.now()
+        )
+        db_session.add(candidate)
+        db_session.commit()
+        return candidate.id
+    finally:
+        db_session.close()
+
+
+def time_calls(fn, iterations):
+    timings = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn(i)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'mean_ms': statistics.mean(timings),
+        'p50_ms': timings[len(timings) // 2],
+        'p95_ms': timings[int(len(timings) * 0.95) - 1]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db-url', default='sqlite:///benchmarks/registration_bench.db')
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    engine = create_engine(args.db_url)
+    Base.metadata.create_all(engine)
+    candidate_app.Session.configure(bind=engine)
+
+    results = {
+        'original': time_calls(lambda i: original_registration(engine, sample_candidate(i)), args.iterations),
+        'single_transaction': time_calls(lambda i: candidate_app.register_candidate(sample_candidate(i)), args.iterations)
+    }
+    for name, stats in results.items():
+        print(f"{name:20s} mean {stats['mean_ms']:.2f} ms  p50 {stats['p50_ms']:.2f} ms  p95 {stats['p95_ms']:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+"""Fill a database with synthetic candidates and graded attempts at a chosen scale.
+
+Usage:
+    python benchmarks/synthetic_data.py [--db-url URL] [--answers 100000] [--sets 5]
+                                        [--questions 30] [--seed 0]
+
+The scale is the number of answers rows; everything else follows from it.
+Each candidate row (one registration) gets one assigned and graded set:
+test_history and answers rows for every question, a score with its category
+sub-scores, a few tab-switch events and their proctoring summary. Emails
+repeat across up to MAX_ATTEMPTS registrations, as they do in production.
+Rows are written with executemany in chunks, into freshly created tables.
+
+Also used as a module by benchmarks/admin_pages.py: generate(engine, answers).
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert
+
+import item_stats
+from models import (Base, Answer, Candidate, ProctoringSummary, Question, Score, ScoreCategory,
+                    TabSwitchEvent, TestHistory)
+from repository import attempt_fingerprint, category_percent, normalize_email
+
+CATEGORIES = ('Logical Reasoning', 'Analytical Thinking', 'English Proficiency', 'Quantitative Aptitude')
+CITIES = ('Bengaluru', 'Chennai', 'Hyderabad', 'Mumbai', 'Pune', 'Delhi', 'Kolkata', 'Kochi')
+POSITIONS = ('Software Engineer', 'Data Analyst', 'QA Engineer', 'DevOps Engineer', 'Product Analyst')
+TECH_STACKS = ('Python', 'Java', 'JavaScript', 'SQL', 'React', 'AWS', 'Go', 'C++')
+MAX_ATTEMPTS = 5
+CANDIDATE_CHUNK = 1000  # candidates (and their ~30x answers) written per transaction
+SPAN_DAYS = 180
+
+
+def seed_questions(connection, sets, questions_per_set):
+    """{set_number: [(question_id, category, correct_option), ...]}"""
+    rows = []
+    question_id = 0
+    for set_number in range(1, sets + 1):
+        for i in range(questions_per_set):
+            question_id += 1
+            rows.append({'question_id': question_id, 'set_number': set_number,
+                         'category': CATEGORIES[i % len(CATEGORIES)],
+                         'question_text': f'Synthetic question {i + 1} of set {set_number}',
+                         'option_a': 'Option A', 'option_b': 'Option B', 'option_c': 'Option C',
+                         'option_d': 'Option D', 'correct_option': 'ABCD'[(question_id * 7) % 4]})
+    connection.execute(insert(Question), rows)
+    question_sets = {}
+    for row in rows:
+        question_sets.setdefault(row['set_number'], []).append(
+            (row['question_id'], row['category'], row['correct_option']))
+    return question_sets
+
+
+def candidate_rows(rng, people, first_id, count, question_sets, events_per_attempt, start_time):
+    """Rows for every table for candidates first_id .. first_id + count - 1
+
+    people carries the current email across chunks: {'person', 'attempt', 'remaining'}.
+    """
+    rows = {table: [] for table in ('candidates', 'test_history', 'answers', 'scores',
+                                    'score_categories', 'tab_switch_events', 'proctoring_summaries')}
+    set_numbers = sorted(question_sets)
+    for candidate_id in range(first_id, first_id + count):
+        # Consecutive ids share an email, so people register 1..MAX_ATTEMPTS times
+        if not people['remaining']:
+            people.update(person=people['person'] + 1, attempt=0, remaining=rng.randint(1, MAX_ATTEMPTS))
+        people['attempt'] += 1
+        people['remaining'] -= 1
+        person, attempt_number = people['person'], people['attempt']
+        email = f'candidate{person}@example.com'
+        submitted_at = start_time + timedelta(seconds=candidate_id * 37 % (SPAN_DAYS * 86400))
+        has_experience = rng.random() < 0.4
+        rows['candidates'].append({
+            'id': candidate_id, 'full_name': f'Candidate {person}', 'email': email,
+            'email_normalized': normalize_email(email), 'phone': f'9{rng.randrange(10 ** 9):09d}',
+            'area': f'Area {rng.randrange(50)}', 'city': rng.choice(CITIES), 'pincode': f'{rng.randrange(10 ** 6):06d}',
+            'position': rng.choice(POSITIONS), 'has_experience': has_experience,
+            'previous_company': 'Acme' if has_experience else None, 'role': 'Developer' if has_experience else None,
+            'domain': 'IT' if has_experience else None,
+            'years_experience': round(rng.uniform(1, 10), 1) if has_experience else None,
+            'tech_stack': ', '.join(rng.sample(TECH_STACKS, 3)), 'submitted_at': submitted_at
+        })
+
+        set_number = set_numbers[(person + attempt_number) % len(set_numbers)]
+        assigned_at = submitted_at - timedelta(minutes=30)
+        ability = rng.random()
+        correct_answers = 0
+        categories = {}
+        selections = []
+        for question_id, category, correct_option in question_sets[set_number]:
+            rows['test_history'].append({'candidate_id': candidate_id, 'question_id': question_id,
+                                         'attempt_number': attempt_number, 'assigned_at': assigned_at})
+            if rng.random() < 0.05:
+                selected = ''
+            else:
+                selected = correct_option if rng.random() < ability else rng.choice('ABCD')
+            is_correct = selected == correct_option
+            correct_answers += is_correct
+            counts = categories.setdefault(category, [0, 0])
+            counts[0] += is_correct
+            counts[1] += 1
+            selections.append((question_id, selected))
+            rows['answers'].append({'candidate_id': candidate_id, 'question_id': question_id,
+                                    'selected_option': selected, 'is_correct': is_correct,
+                                    'answered_at': submitted_at, 'score_id': candidate_id})
+        total_questions = len(question_sets[set_number])
+        rows['scores'].append({
+            'score_id': candidate_id, 'candidate_id': candidate_id, 'attempt_number': attempt_number,
+            'total_questions': total_questions, 'correct_answers': correct_answers,
+            'score_percent': round(correct_answers / total_questions * 100, 2), 'submitted_at': submitted_at,
+            'set_number': set_number, 'attempt_fingerprint': attempt_fingerprint(set_number, selections)
+        })
+        rows['score_categories'].extend(
+            {'score_id': candidate_id, 'category': category, 'correct': correct, 'total': total,
+             'percent': category_percent(correct, total)}
+            for category, (correct, total) in categories.items())
+
+        switches = rng.randrange(events_per_attempt + 1) // 2
+        away = []
+        moment = assigned_at
+        for _ in range(switches):
+            moment += timedelta(seconds=rng.randrange(30, 300))
+            seconds = rng.uniform(1, 60)
+            rows['tab_switch_events'].append({'candidate_id': candidate_id, 'attempt_number': attempt_number,
+                                              'event_type': 'tab_switch_out', 'timestamp': moment})
+            rows['tab_switch_events'].append({'candidate_id': candidate_id, 'attempt_number': attempt_number,
+                                              'event_type': 'tab_switch_in',
+                                              'timestamp': moment + timedelta(seconds=seconds)})
+            away.append(seconds)
+        if away:
+            # Summaries exist only for attempts with events, as the app writes them
+            rows['proctoring_summaries'].append({
+                'candidate_id': candidate_id, 'attempt_number': attempt_number, 'switch_count': switches,
+                'total_away_seconds': round(sum(away), 3), 'longest_absence_seconds': round(max(away), 3),
+                'last_out_at': None, 'updated_at': submitted_at
+            })
+    return rows
+
+
+def generate(engine, answers, sets=5, questions_per_set=30, events_per_attempt=4, seed=0, progress=None):
+    """Drop and recreate all tables, then fill them up to about `answers` answers rows.
+
+    Returns {table: rows written}.
+    """
+    rng = random.Random(seed)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    tables = {
+        'candidates': Candidate.__table__, 'scores': Score.__table__, 'score_categories': ScoreCategory.__table__,
+        'test_history': TestHistory.__table__, 'answers': Answer.__table__,
+        'tab_switch_events': TabSwitchEvent.__table__, 'proctoring_summaries': ProctoringSummary.__table__
+    }
+    counts = dict.fromkeys(tables, 0)
+    with engine.begin() as connection:
+        question_sets = seed_questions(connection, sets, questions_per_set)
+    counts['questions'] = sets * questions_per_set
+
+    total_candidates = max(1, -(-answers // questions_per_set))
+    start_time = datetime.now() - timedelta(days=SPAN_DAYS)
+    people = {'person': 0, 'attempt': 0, 'remaining': 0}
+    for first_id in range(1, total_candidates + 1, CANDIDATE_CHUNK):
+        count = min(CANDIDATE_CHUNK, total_candidates - first_id + 1)
+        rows = candidate_rows(rng, people, first_id, count, question_sets, events_per_attempt, start_time)
+        with engine.begin() as connection:
+            # Parents first, so the foreign keys hold on engines that check them
+            for table_name, table in tables.items():
+                if rows[table_name]:
+                    connection.execute(insert(table), rows[table_name])
+                    counts[table_name] += len(rows[table_name])
+        if progress:
+            progress(first_id + count - 1, total_candidates)
+
+    with engine.begin() as connection:
+        item_stats.rebuild(connection, sorted(question_sets))
+    counts['item_stats'] = counts['questions']
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db-url', default='sqlite:///benchmarks/synthetic.db')
+    parser.add_argument('--answers', type=int, default=100000, help='answers rows to generate (the scale)')
+    parser.add_argument('--sets', type=int, default=5)
+    parser.add_argument('--questions', type=int, default=30, help='questions per set')
+    parser.add_argument('--events', type=int, default=4, help='most tab-switch events per attempt')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    engine = create_engine(args.db_url)
+    start = time.perf_counter()
+    counts = generate(engine, args.answers, args.sets, args.questions, args.events, args.seed,
+                      progress=lambda done, total: print(f"\r{done}/{total} candidates", end='', flush=True))
+    print(f"\nGenerated in {time.perf_counter() - start:.1f}s:")
+    for table, rows in counts.items():
+        print(f"  {table:22s} {rows:>10,}")
+
+
+if __name__ == '__main__':
+    main()
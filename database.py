@@ -0,0 +1,136 @@
+"""Shared SQLAlchemy engine setup for the candidate and admin apps.
+
+Pool behaviour is configured from the environment:
+
+    DATABASE_URL        full SQLAlchemy URL (overrides the DB_* variables)
+    DB_POOL_SIZE        persistent connections per process (default 10)
+    DB_MAX_OVERFLOW     extra connections allowed under burst (default 20)
+    DB_POOL_TIMEOUT     seconds to wait for a free connection (default 30)
+    DB_POOL_RECYCLE     seconds before a connection is replaced (default 1800,
+                        well under MySQL's default wait_timeout)
+    DB_POOL_PRE_PING    "1" to test connections on checkout (default "1")
+    DB_CONNECT_TIMEOUT  seconds to wait when opening a connection (default 10)
+
+pool_stats(engine) reports checkout counts, wait times and timeouts so worker
+counts can be sized against real load.
+"""
+import os
+import threading
+import time
+import weakref
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+_pool_metrics = weakref.WeakKeyDictionary()
+
+
+def database_url():
+    url = os.getenv('DATABASE_URL')
+    if url:
+        return url
+    db_user = os.getenv('DB_USER')
+    db_password = os.getenv('DB_PASSWORD')
+    db_host = os.getenv('DB_HOST')
+    db_name = os.getenv('DB_NAME')
+    return f'mysql+pymysql://{db_user}:{db_password}@{db_host}/{db_name}'
+
+
+class PoolMetrics:
+    """Counters for one engine's connection pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.max_wait_seconds = 0.0
+
+    def increment(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            self.wait_seconds_total += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'connects': self.connects,
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'invalidations': self.invalidations,
+                'timeouts': self.timeouts,
+                'wait_seconds_total': round(self.wait_seconds_total, 6),
+                'max_wait_seconds': round(self.max_wait_seconds, 6),
+                'avg_wait_seconds': round(self.wait_seconds_total / self.checkouts, 6) if self.checkouts else 0.0
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection"""
+    metrics = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.record_wait(time.perf_counter() - start)
+        return connection
+
+
+def make_engine(url=None, **overrides):
+    """Create an engine with the env-configured pool and attach pool metrics"""
+    url = url or database_url()
+    metrics = PoolMetrics()
+    options = {}
+    if not url.startswith('sqlite'):
+        # Bind the metrics through a per-engine subclass so pool.recreate() keeps them
+        pool_class = type('InstrumentedQueuePool', (InstrumentedQueuePool,), {'metrics': metrics})
+        options.update(
+            poolclass=pool_class,
+            pool_size=int(os.getenv('DB_POOL_SIZE', 10)),
+            max_overflow=int(os.getenv('DB_MAX_OVERFLOW', 20)),
+            pool_timeout=float(os.getenv('DB_POOL_TIMEOUT', 30)),
+            pool_recycle=int(os.getenv('DB_POOL_RECYCLE', 1800)),
+            pool_pre_ping=os.getenv('DB_POOL_PRE_PING', '1') == '1',
+            connect_args={'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', 10))}
+        )
+    options.update(overrides)
+    engine = create_engine(url, **options)
+
+    event.listen(engine, 'connect', lambda *args: metrics.increment('connects'))
+    event.listen(engine, 'checkout', lambda *args: metrics.increment('checkouts'))
+    event.listen(engine, 'checkin', lambda *args: metrics.increment('checkins'))
+    event.listen(engine, 'invalidate', lambda *args: metrics.increment('invalidations'))
+    _pool_metrics[engine] = metrics
+    return engine
+
+
+def pool_stats(engine):
+    """Current pool occupancy plus the cumulative checkout metrics"""
+    pool = engine.pool
+    stats = {'pool_class': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+            timeout=pool.timeout()
+        )
+    metrics = _pool_metrics.get(engine)
+    if metrics:
+        stats.update(metrics.snapshot())
+    return stats
@@ -0,0 +1,121 @@
+"""Vectorized grading of test submissions.
+
+An answer key and a batch of submissions are held as uint8 option codes
+(0 = not answered, A-D = 1-4, any other stored value gets its own code), so
+one array comparison grades every answer of every attempt in the batch.
+The rule is the one save_test_results has always used: an answer is
+correct when it is not blank and equals the question's correct_option.
+
+Used online for a single submission and in bulk by re-grades, which pass
+thousands of attempts per call.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+BLANK = 0
+BASE_CODES = {'A': 1, 'B': 2, 'C': 3, 'D': 4}
+
+GradeResult = namedtuple('GradeResult', [
+    'is_correct',        # bool[attempts, questions]
+    'correct_counts',    # int[attempts]
+    'score_percent',     # float[attempts]
+    'category_correct',  # int[attempts, categories]
+    'category_totals'    # int[categories], questions per category
+])
+
+
+class OptionCodes:
+    """Maps option strings to uint8 codes; values other than A-D get codes from 5 up"""
+
+    def __init__(self):
+        self._codes = dict(BASE_CODES)
+
+    def encode(self, value):
+        if not value:
+            return BLANK
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self._codes) + 1
+            if code > 255:
+                raise ValueError("Too many distinct option values to encode as uint8")
+            self._codes[value] = code
+        return code
+
+
+class AnswerKey:
+    """Correct options and categories of an ordered list of questions.
+
+    questions are objects with question_id, category and correct_option
+    (CachedQuestion rows or Question models).
+    """
+
+    def __init__(self, questions, codes=None):
+        self.codes = codes or OptionCodes()
+        self.question_ids = [question.question_id for question in questions]
+        self.positions = {question_id: i for i, question_id in enumerate(self.question_ids)}
+        self.correct = np.array([self.codes.encode(question.correct_option) for question in questions], dtype=np.uint8)
+        self.categories = sorted({question.category for question in questions})
+        category_index = {category: i for i, category in enumerate(self.categories)}
+        self.category_of = np.array([category_index[question.category] for question in questions], dtype=np.intp)
+
+    def __len__(self):
+        return len(self.question_ids)
+
+    def selections(self, attempts):
+        """uint8[attempts, questions] from a list of {question_id: selected_option} dicts.
+
+        Questions missing from a dict are unanswered; ids outside the key are ignored.
+        """
+        matrix = np.zeros((len(attempts), len(self)), dtype=np.uint8)
+        for row, selected in enumerate(attempts):
+            for question_id, option in selected.items():
+                position = self.positions.get(question_id)
+                if position is not None:
+                    matrix[row, position] = self.codes.encode(option)
+        return matrix
+
+    def selections_from_columns(self, attempt_count, attempt_rows, question_ids, options):
+        """uint8[attempts, questions] from parallel columns of answer rows (as streamed from the database).
+
+        attempt_rows[i] is the matrix row of answer i; answers to questions
+        outside the key are ignored.
+        """
+        positions = np.fromiter((self.positions.get(question_id, -1) for question_id in question_ids),
+                                dtype=np.intp, count=len(question_ids))
+        codes = np.fromiter((self.codes.encode(option) for option in options), dtype=np.uint8, count=len(options))
+        attempt_rows = np.asarray(attempt_rows, dtype=np.intp)
+        known = positions >= 0
+        matrix = np.zeros((attempt_count, len(self)), dtype=np.uint8)
+        matrix[attempt_rows[known], positions[known]] = codes[known]
+        return matrix
+
+
+def grade(key, selections):
+    """Grade a uint8[attempts, questions] matrix of option codes against key"""
+    selections = np.asarray(selections, dtype=np.uint8)
+    is_correct = (selections != BLANK) & (selections == key.correct)
+    correct_counts = is_correct.sum(axis=1)
+    total = len(key)
+    if total:
+        score_percent = correct_counts / total * 100
+    else:
+        score_percent = np.zeros(len(selections))
+    # One-hot question -> category matrix turns per-category sums into one matmul
+    membership = np.eye(len(key.categories), dtype=np.int64)[key.category_of]
+    category_correct = is_correct.astype(np.int64) @ membership
+    return GradeResult(is_correct, correct_counts, score_percent, category_correct, membership.sum(axis=0))
+
+
+def category_scores(key, result, row=0):
+    """{category: (correct, total)} for one attempt of a GradeResult"""
+    return {category: (int(result.category_correct[row, i]), int(result.category_totals[i]))
+            for i, category in enumerate(key.categories)}
+
+
+def grade_answers(key, question_ids, options):
+    """bool[answers] for individual answer rows (question_id, selected_option) against key"""
+    positions = np.fromiter((key.positions[question_id] for question_id in question_ids),
+                            dtype=np.intp, count=len(question_ids))
+    codes = np.fromiter((key.codes.encode(option) for option in options), dtype=np.uint8, count=len(options))
+    return (codes != BLANK) & (codes == key.correct[positions])
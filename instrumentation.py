@@ -0,0 +1,225 @@
+"""Per-request timing and SQL statement metrics for the Flask apps.
+
+RequestMetrics hooks a Flask app and a SQLAlchemy engine:
+    metrics = RequestMetrics(app, engine)
+
+For every request it measures wall time, the number of SQL statements, the
+time spent in the database (before_cursor_execute/after_cursor_execute) and
+the response body size, then
+  * adds a Server-Timing header (app and db durations, statement count), so
+    browser dev tools and load tests can read them per response, and
+  * folds them into per-endpoint totals and a latency histogram, rendered in
+    the Prometheus text format by metrics.render().
+
+Statements run outside a request (background workers) are not counted.
+
+The optional N+1 detector (n_plus_one_threshold > 0) logs a warning when one
+request runs the same statement, with IN (...) lists collapsed, more than
+threshold times.
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter
+
+from flask import request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_IN_LIST = re.compile(r'\((?:\s*(?:\?|%s|:\w+)\s*,)+\s*(?:\?|%s|:\w+)\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def numeric_gauges(prefix, stats):
+    """{prefix_key: value} for the numeric entries of a stats dict (e.g. database.pool_stats)"""
+    return {f'{prefix}_{key}': value for key, value in stats.items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool)}
+
+
+def statement_shape(statement):
+    """Statement text with IN lists collapsed, so batches of different sizes compare equal"""
+    return _WHITESPACE.sub(' ', _IN_LIST.sub('(?)', statement)).strip()
+
+
+class _RequestState:
+    __slots__ = ('started', 'statements', 'db_seconds', 'cursor_started', 'shapes')
+
+    def __init__(self, track_shapes):
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.cursor_started = None
+        self.shapes = Counter() if track_shapes else None
+
+
+class _EndpointTotals:
+    __slots__ = ('requests', 'errors', 'seconds', 'statements', 'db_seconds', 'bytes', 'buckets')
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.bytes = 0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+
+
+class RequestMetrics:
+    """Request and database metrics for one Flask app and its engine"""
+
+    def __init__(self, app, engine, server_timing=True, n_plus_one_threshold=0, prefix='assessment'):
+        self.server_timing = server_timing
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.prefix = prefix
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._endpoints = {}  # endpoint -> _EndpointTotals
+        self.n_plus_one_warnings = 0
+
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.teardown_request(self._teardown_request)
+
+    # ---------- DATABASE EVENTS ----------
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        state = getattr(self._local, 'state', None)
+        if state is not None:
+            state.cursor_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        state = getattr(self._local, 'state', None)
+        if state is None or state.cursor_started is None:
+            return
+        state.db_seconds += time.perf_counter() - state.cursor_started
+        state.cursor_started = None
+        state.statements += 1
+        if state.shapes is not None:
+            state.shapes[statement_shape(statement)] += 1
+
+    # ---------- REQUEST HOOKS ----------
+    def _start_request(self):
+        self._local.state = _RequestState(self.n_plus_one_threshold > 0)
+
+    def _finish_request(self, response):
+        state = getattr(self._local, 'state', None)
+        if state is None:
+            return response
+        endpoint = request.endpoint or 'unmatched'
+        elapsed = time.perf_counter() - state.started
+        if self.server_timing:
+            response.headers['Server-Timing'] = (
+                f'app;dur={elapsed * 1000:.1f}, '
+                f'db;dur={state.db_seconds * 1000:.1f};desc="{state.statements} statements"'
+            )
+        if state.shapes:
+            self._check_n_plus_one(endpoint, state.shapes)
+
+        if response.is_streamed:
+            # The body is produced after this hook; count it as it is sent
+            sent = [0]
+
+            def counting(chunks):
+                for chunk in chunks:
+                    sent[0] += len(chunk)
+                    yield chunk
+            response.response = counting(response.response)
+            response.call_on_close(lambda: self._add_bytes(endpoint, sent[0]))
+            size = 0
+        else:
+            size = response.calculate_content_length() or 0
+        self._record(endpoint, elapsed, state, size, response.status_code >= 500)
+        self._local.state = None
+        return response
+
+    def _teardown_request(self, exc):
+        # after_request is skipped when a view raises; count the request as an error
+        state = getattr(self._local, 'state', None)
+        if state is not None:
+            self._record(request.endpoint or 'unmatched', time.perf_counter() - state.started, state, 0, True)
+            self._local.state = None
+
+    def _check_n_plus_one(self, endpoint, shapes):
+        shape, count = shapes.most_common(1)[0]
+        if count > self.n_plus_one_threshold:
+            self.n_plus_one_warnings += 1
+            logger.warning("Possible N+1 in %s: %d near-identical statements: %.200s",
+                           endpoint, count, shape, extra={'endpoint': endpoint, 'statement_count': count})
+
+    # ---------- TOTALS ----------
+    def _record(self, endpoint, elapsed, state, size, error):
+        with self._lock:
+            totals = self._endpoints.get(endpoint)
+            if totals is None:
+                totals = self._endpoints[endpoint] = _EndpointTotals()
+            totals.requests += 1
+            totals.errors += int(error)
+            totals.seconds += elapsed
+            totals.statements += state.statements
+            totals.db_seconds += state.db_seconds
+            totals.bytes += size
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if elapsed <= bound:
+                    totals.buckets[i] += 1
+
+    def _add_bytes(self, endpoint, size):
+        with self._lock:
+            totals = self._endpoints.get(endpoint)
+            if totals is not None:
+                totals.bytes += size
+
+    def snapshot(self):
+        """{endpoint: totals dict}, for JSON debug views and benchmarks"""
+        with self._lock:
+            return {endpoint: {
+                'requests': totals.requests,
+                'errors': totals.errors,
+                'seconds': totals.seconds,
+                'statements': totals.statements,
+                'db_seconds': totals.db_seconds,
+                'bytes': totals.bytes
+            } for endpoint, totals in self._endpoints.items()}
+
+    def render(self, extra_gauges=None):
+        """Prometheus text exposition of the per-endpoint totals (plus optional {name: value} gauges)"""
+        p = self.prefix
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+            lines = [
+                f'# HELP {p}_requests_total Requests handled, by endpoint.',
+                f'# TYPE {p}_requests_total counter',
+                *(f'{p}_requests_total{{endpoint="{e}"}} {t.requests}' for e, t in endpoints),
+                f'# HELP {p}_request_errors_total Requests that ended in a 5xx or an exception.',
+                f'# TYPE {p}_request_errors_total counter',
+                *(f'{p}_request_errors_total{{endpoint="{e}"}} {t.errors}' for e, t in endpoints),
+                f'# HELP {p}_request_duration_seconds Wall time per request.',
+                f'# TYPE {p}_request_duration_seconds histogram',
+            ]
+            for e, t in endpoints:
+                for bound, count in zip(LATENCY_BUCKETS, t.buckets):
+                    lines.append(f'{p}_request_duration_seconds_bucket{{endpoint="{e}",le="{bound}"}} {count}')
+                lines.append(f'{p}_request_duration_seconds_bucket{{endpoint="{e}",le="+Inf"}} {t.requests}')
+                lines.append(f'{p}_request_duration_seconds_sum{{endpoint="{e}"}} {t.seconds:.6f}')
+                lines.append(f'{p}_request_duration_seconds_count{{endpoint="{e}"}} {t.requests}')
+            lines += [
+                f'# HELP {p}_db_statements_total SQL statements run while handling requests.',
+                f'# TYPE {p}_db_statements_total counter',
+                *(f'{p}_db_statements_total{{endpoint="{e}"}} {t.statements}' for e, t in endpoints),
+                f'# HELP {p}_db_seconds_total Time spent executing SQL while handling requests.',
+                f'# TYPE {p}_db_seconds_total counter',
+                *(f'{p}_db_seconds_total{{endpoint="{e}"}} {t.db_seconds:.6f}' for e, t in endpoints),
+                f'# HELP {p}_response_bytes_total Response body bytes sent.',
+                f'# TYPE {p}_response_bytes_total counter',
+                *(f'{p}_response_bytes_total{{endpoint="{e}"}} {t.bytes}' for e, t in endpoints),
+                f'# HELP {p}_n_plus_one_warnings_total Requests flagged by the N+1 detector.',
+                f'# TYPE {p}_n_plus_one_warnings_total counter',
+                f'{p}_n_plus_one_warnings_total {self.n_plus_one_warnings}',
+            ]
+        for name, value in (extra_gauges or {}).items():
+            lines += [f'# TYPE {p}_{name} gauge', f'{p}_{name} {value}']
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,248 @@
+"""Item analysis for question sets: difficulty, discrimination and distractors.
+
+item_stats keeps running sums per question instead of scanning answers:
+how many graded attempts included the question, how many got it right, how
+often each option (or nothing) was chosen, and the sums of the attempts'
+total scores needed for the point-biserial correlation. The admin page
+reads one row per question whatever the number of answers.
+
+Submissions never touch those shared rows. save_test_results appends the
+attempt's changes (and the negated changes of the attempt it replaces) to
+the insert-only item_stat_deltas table in its own transaction, so
+concurrent submissions for a set do not wait on each other. fold() applies
+pending deltas to item_stats in short batches of atomic `col = col + n`
+UPDATEs; the admin page folds the set it shows, and
+`python manage.py fold-item-stats` folds everything (run it from cron). A
+re-grade rebuilds the affected sets from answers with one grouped query per
+set and discards their pending deltas.
+"""
+import math
+from datetime import datetime
+
+from sqlalchemy import bindparam, case, delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql import func
+
+from models import Answer, ItemStat, ItemStatDelta, Question, Score
+
+OPTION_COLUMNS = {'A': 'option_a_count', 'B': 'option_b_count', 'C': 'option_c_count', 'D': 'option_d_count'}
+SUM_COLUMNS = ('responses', 'correct', 'total_sum', 'total_sq_sum', 'correct_total_sum',
+               *OPTION_COLUMNS.values(), 'blank_count')
+FOLD_BATCH_SIZE = 5000  # Deltas applied per transaction
+
+# Review thresholds shown on the admin page
+HARD_P_VALUE = 0.2
+EASY_P_VALUE = 0.9
+LOW_DISCRIMINATION = 0.2
+MIN_RESPONSES = 30  # Below this the statistics are shown but not flagged
+
+_INCREMENT = update(ItemStat.__table__).\
+    where(ItemStat.question_id == bindparam('b_question_id')).\
+    values(updated_at=bindparam('b_updated_at'),
+           **{column: getattr(ItemStat, column) + bindparam(f'b_{column}') for column in SUM_COLUMNS})
+
+
+# ---------- RUNNING SUMS ----------
+def _deltas(set_number, answers, total_correct, sign):
+    """One item_stat_deltas row per answer (question_id, selected_option, is_correct) of an attempt"""
+    now = datetime.now()
+    rows = []
+    for question_id, selected, is_correct in answers:
+        row = {column: 0 for column in SUM_COLUMNS}
+        row.update({
+            'question_id': question_id,
+            'set_number': set_number,
+            'created_at': now,
+            'responses': sign,
+            'correct': sign * int(bool(is_correct)),
+            'total_sum': sign * total_correct,
+            'total_sq_sum': sign * total_correct * total_correct,
+            'correct_total_sum': sign * total_correct * int(bool(is_correct))
+        })
+        column = OPTION_COLUMNS.get(selected) if selected else 'blank_count'
+        if column:
+            row[column] = sign
+        rows.append(row)
+    return rows
+
+
+def record_attempt(db_session, set_number, answers, total_correct):
+    """Append one graded attempt's deltas, in the caller's transaction (one INSERT, no shared rows)"""
+    rows = _deltas(set_number, list(answers), total_correct, 1)
+    if rows:
+        db_session.execute(insert(ItemStatDelta), rows)
+
+
+def remove_previous_attempts(db_session, candidate_id, question_ids):
+    """Append negated deltas for the candidate's stored attempts at these questions before they are replaced.
+
+    Returns the number of attempts removed. Only answers linked to a score
+    were ever counted, so unlinked legacy answers are skipped.
+    """
+    attempts = {}
+    for score_id, set_number, question_id, selected, is_correct, total_correct in db_session.execute(
+            select(Answer.score_id, Question.set_number, Answer.question_id, Answer.selected_option,
+                   Answer.is_correct, Score.correct_answers).
+            join(Score, Score.score_id == Answer.score_id).
+            join(Question, Question.question_id == Answer.question_id).
+            where(Answer.candidate_id == candidate_id, Answer.question_id.in_(list(question_ids)))):
+        attempts.setdefault((score_id, set_number, total_correct or 0), []).append((question_id, selected, is_correct))
+    rows = []
+    for (_, set_number, total_correct), answers in attempts.items():
+        rows.extend(_deltas(set_number, answers, total_correct, -1))
+    if rows:
+        db_session.execute(insert(ItemStatDelta), rows)
+    return len(attempts)
+
+
+def _ensure_rows(connection, sums):
+    existing = set(connection.execute(select(ItemStat.question_id).
+                                      where(ItemStat.question_id.in_(list(sums)))).scalars())
+    missing = sorted(set(sums) - existing)
+    if not missing:
+        return
+    try:
+        with connection.begin_nested():
+            connection.execute(insert(ItemStat), [
+                {'question_id': question_id, 'set_number': sums[question_id]['set_number'],
+                 **{column: 0 for column in SUM_COLUMNS}}
+                for question_id in missing
+            ])
+    except IntegrityError:
+        pass  # A concurrent fold or rebuild created them first
+
+
+def fold(engine, set_numbers=None, batch_size=FOLD_BATCH_SIZE):
+    """Apply pending item_stat_deltas (of these sets, or all) to item_stats; returns the deltas folded.
+
+    Each batch is locked, summed per question, applied in question_id order
+    and deleted in one short transaction, so concurrent folds never apply a
+    delta twice.
+    """
+    criteria = [ItemStatDelta.set_number.in_(list(set_numbers))] if set_numbers is not None else []
+    folded = 0
+    while True:
+        with engine.begin() as connection:
+            deltas = connection.execute(
+                select(ItemStatDelta.delta_id, ItemStatDelta.question_id, ItemStatDelta.set_number,
+                       *[getattr(ItemStatDelta, column) for column in SUM_COLUMNS]).
+                where(*criteria).order_by(ItemStatDelta.delta_id).limit(batch_size).with_for_update()
+            ).all()
+            if not deltas:
+                return folded
+            sums = {}
+            for delta in deltas:
+                row = sums.setdefault(delta.question_id, {'set_number': delta.set_number,
+                                                          **dict.fromkeys(SUM_COLUMNS, 0)})
+                for column in SUM_COLUMNS:
+                    row[column] += getattr(delta, column)
+            _ensure_rows(connection, sums)
+            now = datetime.now()
+            connection.execute(_INCREMENT, [
+                {'b_question_id': question_id, 'b_updated_at': now,
+                 **{f'b_{column}': row[column] for column in SUM_COLUMNS}}
+                for question_id, row in sorted(sums.items())
+            ])
+            connection.execute(delete(ItemStatDelta.__table__).
+                               where(ItemStatDelta.delta_id.in_(bindparam('delta_ids', expanding=True))),
+                               {'delta_ids': [delta.delta_id for delta in deltas]})
+        folded += len(deltas)
+        if len(deltas) < batch_size:
+            return folded
+
+
+def rebuild(connection, set_numbers):
+    """Recompute the sums of whole sets from answers (after a re-grade or for a backfill)"""
+    rebuilt = 0
+    for set_number in set_numbers:
+        # Deltas written before the answers are read are already part of them
+        last_delta = connection.execute(select(func.max(ItemStatDelta.delta_id)).
+                                        where(ItemStatDelta.set_number == set_number)).scalar()
+        correct = case((Answer.is_correct == True, 1), else_=0)
+        option_counts = [func.sum(case((Answer.selected_option == option, 1), else_=0))
+                         for option in OPTION_COLUMNS]
+        blank = func.sum(case((Answer.selected_option.is_(None), 1), (Answer.selected_option == '', 1), else_=0))
+        rows = connection.execute(
+            select(Answer.question_id, func.count(Answer.answer_id), func.sum(correct),
+                   func.sum(Score.correct_answers), func.sum(Score.correct_answers * Score.correct_answers),
+                   func.sum(correct * Score.correct_answers), *option_counts, blank).
+            join(Score, Score.score_id == Answer.score_id).
+            join(Question, Question.question_id == Answer.question_id).
+            where(Question.set_number == set_number).
+            group_by(Answer.question_id)
+        ).all()
+        now = datetime.now()
+        connection.execute(delete(ItemStat.__table__).where(ItemStat.set_number == set_number))
+        if last_delta is not None:
+            connection.execute(delete(ItemStatDelta.__table__).
+                               where(ItemStatDelta.set_number == set_number, ItemStatDelta.delta_id <= last_delta))
+        if rows:
+            connection.execute(insert(ItemStat), [
+                {'question_id': row[0], 'set_number': set_number, 'updated_at': now,
+                 **{column: int(value or 0) for column, value in zip(SUM_COLUMNS, row[1:])}}
+                for row in rows
+            ])
+        rebuilt += len(rows)
+    return rebuilt
+
+
+# ---------- METRICS ----------
+def point_biserial(stat):
+    """Corrected item-total correlation: 0/1 on this question against the score on the others.
+
+    Leaving the question out of the total matters for 30-question sets,
+    where the item's own point would otherwise inflate the correlation.
+    None when everyone (or no one) got it right or the rest scores do not vary.
+    """
+    n, n1 = stat.responses, stat.correct
+    if n <= 0 or n1 <= 0 or n1 >= n:
+        return None
+    # rest = total - x with x in {0, 1}: x*x == x and sum(total * x) == correct_total_sum
+    rest_sum = stat.total_sum - n1
+    rest_sq_sum = stat.total_sq_sum - 2 * stat.correct_total_sum + n1
+    rest_correct_sum = stat.correct_total_sum - n1
+    variance = rest_sq_sum / n - (rest_sum / n) ** 2
+    if variance <= 0:
+        return None
+    mean_correct = rest_correct_sum / n1
+    mean_incorrect = (rest_sum - rest_correct_sum) / (n - n1)
+    p = n1 / n
+    return (mean_correct - mean_incorrect) / math.sqrt(variance) * math.sqrt(p * (1 - p))
+
+
+def item_metrics(stat):
+    """p-value, discrimination, option selection rates and review flags for one ItemStat row"""
+    n = stat.responses
+    p_value = stat.correct / n if n > 0 else None
+    discrimination = point_biserial(stat)
+    flags = []
+    if n >= MIN_RESPONSES:
+        if p_value < HARD_P_VALUE:
+            flags.append('hard')
+        elif p_value > EASY_P_VALUE:
+            flags.append('easy')
+        if discrimination is not None and discrimination < LOW_DISCRIMINATION:
+            flags.append('negative discrimination' if discrimination < 0 else 'low discrimination')
+    return {
+        'responses': n,
+        'p_value': p_value,
+        'discrimination': discrimination,
+        'option_rates': {option: (getattr(stat, column) / n if n > 0 else None)
+                         for option, column in OPTION_COLUMNS.items()},
+        'blank_rate': stat.blank_count / n if n > 0 else None,
+        'flags': flags
+    }
+
+
+def set_report(db_session, set_number, questions):
+    """Metrics for every question of a set, in the order of questions (CachedQuestion rows)"""
+    stats = {stat.question_id: stat for stat in
+             db_session.query(ItemStat).filter(ItemStat.set_number == set_number)}
+    report = []
+    for question in questions:
+        stat = stats.get(question.question_id)
+        if stat is None:
+            stat = ItemStat(question_id=question.question_id, set_number=set_number,
+                            **{column: 0 for column in SUM_COLUMNS})
+        report.append({'question': question, **item_metrics(stat)})
+    return report
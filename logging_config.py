@@ -0,0 +1,113 @@
+"""Logging setup shared by the candidate app and the admin app.
+
+Request threads never write to stdout themselves: the root logger has a
+single QueueHandler that puts records on an in-memory queue, and a
+QueueListener thread formats and writes them. Records below a logger's
+level are discarded before their message is formatted, so hot paths log
+with %-style arguments (logger.debug("set %s", n)), never f-strings.
+
+Environment:
+    LOG_LEVEL       root level (default INFO; DEBUG restores the old tracing)
+    LOG_LEVELS      per-logger overrides, e.g. "proctoring=DEBUG,sqlalchemy.engine=INFO"
+    LOG_FORMAT      json (default, one object per line) or text
+    LOG_QUEUE_SIZE  records waiting to be written before new ones are dropped
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+# Third-party loggers that are chatty at DEBUG/INFO; LOG_LEVELS can still raise them
+QUIET_LOGGERS = {
+    'sqlalchemy': 'WARNING',
+    'urllib3': 'WARNING',
+    'botocore': 'WARNING',
+    'boto3': 'WARNING',
+    's3transfer': 'WARNING',
+}
+
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; fields passed with extra= are kept as keys"""
+
+    def format(self, record):
+        entry = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES)
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the writer falls behind"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Format the message and traceback here, while the frames still exist; extra fields stay on the record
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_levels(value):
+    """{'proctoring': 'DEBUG', ...} from "proctoring=DEBUG,sqlalchemy.engine=INFO" (bad entries ignored)"""
+    levels = {}
+    for item in (value or '').split(','):
+        name, _, level = item.partition('=')
+        if name.strip() and isinstance(logging.getLevelName(level.strip().upper()), int):
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging():
+    """Install the queue-based handlers on the root logger once per process"""
+    global _listener
+    if _listener is not None:
+        return
+    stream = logging.StreamHandler(sys.stdout)
+    if os.getenv('LOG_FORMAT', 'json').lower() == 'text':
+        stream.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    else:
+        stream.setFormatter(JsonFormatter())
+
+    handler = DroppingQueueHandler(queue.Queue(maxsize=int(os.getenv('LOG_QUEUE_SIZE', 10000))))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+    for name, level in {**QUIET_LOGGERS, **parse_levels(os.getenv('LOG_LEVELS'))}.items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(handler.queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def dropped_records():
+    """Records dropped because the queue was full (0 before configure_logging)"""
+    handlers = [handler for handler in logging.getLogger().handlers if isinstance(handler, DroppingQueueHandler)]
+    return sum(handler.dropped for handler in handlers)
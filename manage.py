@@ -0,0 +1,134 @@
+"""Maintenance commands for the assessment database.
+
+Usage:
+    python manage.py migrate        apply pending schema migrations
+    python manage.py status         list migrations and whether they are applied
+    python manage.py check-plans    EXPLAIN the hot queries; exit 1 on any full table scan
+    python manage.py backfill-proctoring
+                                    rebuild proctoring_summaries from tab_switch_events
+    python manage.py backfill-scores
+                                    fill scores.set_number/attempt_fingerprint where missing
+    python manage.py backfill-score-categories
+                                    compute score_categories for scores that have none
+    python manage.py backfill-item-stats
+                                    rebuild item_stats (item analysis) from graded answers
+    python manage.py fold-item-stats
+                                    apply pending item_stat_deltas to item_stats (run from cron)
+    python manage.py regrade (--set N | --question Q [--correct-option X]) [--dry-run]
+                                    re-grade stored answers after an answer-key correction
+
+The database is configured by the same environment variables as the apps
+(DATABASE_URL or DB_USER/DB_PASSWORD/DB_HOST/DB_NAME).
+"""
+import argparse
+import sys
+
+from dotenv import load_dotenv
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import item_stats
+import migrations
+import proctoring
+import regrade
+from database import make_engine
+from models import TabSwitchEvent
+from repository import EVENT_BATCH_SIZE
+
+
+def migrate(engine, args):
+    applied = migrations.upgrade(engine)
+    print(f"Applied {len(applied)} migration(s): {', '.join(applied) or 'none pending'}")
+    return 0
+
+
+def status(engine, args):
+    for version, applied in migrations.status(engine):
+        print(f"{'[x]' if applied else '[ ]'} {version}")
+    return 0
+
+
+def check_plans(engine, args):
+    problems = migrations.check_query_plans(engine)
+    for name, tables in problems.items():
+        print(f"FULL SCAN in {name}: {', '.join(tables)}")
+    if problems:
+        return 1
+    print("All hot queries use an index")
+    return 0
+
+
+def backfill_proctoring(engine, args):
+    with engine.connect() as connection:
+        candidate_ids = connection.execute(select(TabSwitchEvent.candidate_id).distinct().
+                                           order_by(TabSwitchEvent.candidate_id)).scalars().all()
+    rebuilt = 0
+    for start in range(0, len(candidate_ids), EVENT_BATCH_SIZE):
+        with Session(engine) as db_session, db_session.begin():
+            rebuilt += proctoring.rebuild_summaries(db_session, candidate_ids[start:start + EVENT_BATCH_SIZE])
+    print(f"Rebuilt {rebuilt} proctoring summaries for {len(candidate_ids)} candidates")
+    return 0
+
+
+def backfill_scores(engine, args):
+    migrations.backfill_scores(engine)
+    return 0
+
+
+def backfill_score_categories(engine, args):
+    migrations.backfill_score_categories(engine)
+    return 0
+
+
+def backfill_item_stats(engine, args):
+    migrations.backfill_item_stats(engine)
+    return 0
+
+
+def fold_item_stats(engine, args):
+    print(f"Folded {item_stats.fold(engine)} item statistic deltas")
+    return 0
+
+
+def regrade_answers(engine, args):
+    if (args.set is None) == (args.question is None):
+        print("regrade needs exactly one of --set or --question")
+        return 2
+    try:
+        report = regrade.regrade(engine, set_number=args.set, question_id=args.question,
+                                 correct_option=args.correct_option, dry_run=args.dry_run)
+    except ValueError as e:
+        print(e)
+        return 2
+    print(regrade.format_report(report))
+    return 0
+
+
+COMMANDS = {
+    'migrate': migrate,
+    'status': status,
+    'check-plans': check_plans,
+    'backfill-proctoring': backfill_proctoring,
+    'backfill-scores': backfill_scores,
+    'backfill-score-categories': backfill_score_categories,
+    'backfill-item-stats': backfill_item_stats,
+    'fold-item-stats': fold_item_stats,
+    'regrade': regrade_answers,
+}
+
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Assessment database maintenance")
+    parser.add_argument('command', choices=sorted(COMMANDS))
+    parser.add_argument('--set', type=int, help="regrade: question set to re-grade")
+    parser.add_argument('--question', type=int, help="regrade: single question to re-grade")
+    parser.add_argument('--correct-option', help="regrade: new correct option (A-D) for --question")
+    parser.add_argument('--dry-run', action='store_true', help="regrade: report changes without writing")
+    args = parser.parse_args(argv)
+    engine = make_engine()
+    return COMMANDS[args.command](engine, args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,277 @@
+"""Built-in schema migrations.
+
+Migrations run in order and are recorded in the schema_migrations table, so
+each one is applied once per database. Every step is also idempotent (it
+checks the live schema first), which keeps a fresh database created from the
+models and an upgraded production database in the same state.
+
+Run them with `python manage.py migrate`.
+"""
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, bindparam, inspect, select, text, update
+from sqlalchemy.sql import func
+
+import item_stats
+import repository
+from models import Answer, Base, Candidate, ItemStatDelta, Question, QuestionSetVersion, Score, ScoreCategory
+
+BACKFILL_CHUNK_SIZE = 5000  # Rows per UPDATE when backfilling, to keep row locks short
+
+migrations_metadata = MetaData()
+schema_migrations = Table(
+    'schema_migrations', migrations_metadata,
+    Column('version', String(100), primary_key=True),
+    Column('applied_at', DateTime)
+)
+
+MIGRATIONS = []
+
+
+def migration(version):
+    """Register a migration function under a sortable version string"""
+    def decorator(fn):
+        MIGRATIONS.append((version, fn))
+        return fn
+    return decorator
+
+
+# ---------- HELPERS ----------
+def add_column_if_missing(engine, column):
+    table_name = column.table.name
+    existing = {c['name'] for c in inspect(engine).get_columns(table_name)}
+    if column.name in existing:
+        return False
+    column_type = column.type.compile(dialect=engine.dialect)
+    with engine.begin() as connection:
+        connection.execute(text(f'ALTER TABLE {table_name} ADD COLUMN {column.name} {column_type}'))
+    return True
+
+
+def create_missing_indexes(engine, table_name):
+    """Create model indexes missing from the table, skipping any whose columns a later migration adds"""
+    inspector = inspect(engine)
+    existing = {index['name'] for index in inspector.get_indexes(table_name)}
+    live_columns = {column['name'] for column in inspector.get_columns(table_name)}
+    created = []
+    for index in Base.metadata.tables[table_name].indexes:
+        if index.name not in existing and all(column.name in live_columns for column in index.columns):
+            index.create(engine)
+            created.append(index.name)
+    return created
+
+
+def backfill_in_chunks(engine, id_column, statement):
+    """Run an UPDATE over consecutive primary-key ranges, committing each range"""
+    with engine.connect() as connection:
+        max_id = connection.execute(select(func.max(id_column))).scalar() or 0
+    updated = 0
+    for start in range(0, max_id + 1, BACKFILL_CHUNK_SIZE):
+        with engine.begin() as connection:
+            result = connection.execute(statement.where(id_column.between(start, start + BACKFILL_CHUNK_SIZE - 1)))
+            updated += result.rowcount
+    return updated
+
+
+# ---------- MIGRATIONS ----------
+@migration('0001_hot_path_indexes')
+def hot_path_indexes(engine):
+    """Normalized email column plus indexes for every hot query predicate"""
+    add_column_if_missing(engine, Candidate.__table__.c.email_normalized)
+    backfill_in_chunks(engine, Candidate.id, update(Candidate.__table__).
+                       where(Candidate.email_normalized.is_(None)).
+                       values(email_normalized=func.lower(func.trim(Candidate.email))))
+    for table_name in ('candidates', 'questions', 'test_history', 'answers', 'scores', 'tab_switch_events'):
+        create_missing_indexes(engine, table_name)
+
+
+@migration('0002_score_set_number')
+def score_set_number(engine):
+    """Record the question set and an attempt fingerprint on every score"""
+    add_column_if_missing(engine, Score.__table__.c.set_number)
+    add_column_if_missing(engine, Score.__table__.c.attempt_fingerprint)
+    create_missing_indexes(engine, 'scores')
+    backfill_scores(engine)
+
+
+@migration('0003_answers_by_question')
+def answers_by_question(engine):
+    """Index answers by question so re-grades and item statistics read one question at a time"""
+    create_missing_indexes(engine, 'answers')
+
+
+@migration('0004_item_stats')
+def item_stats_backfill(engine):
+    """Fill item_stats from the answers already graded"""
+    create_missing_indexes(engine, 'item_stats')
+    backfill_item_stats(engine)
+
+
+@migration('0005_score_categories')
+def score_categories_backfill(engine):
+    """Per-category sub-scores for attempts graded before they were stored"""
+    create_missing_indexes(engine, 'score_categories')
+    backfill_score_categories(engine)
+
+
+@migration('0006_question_set_versions')
+def question_set_versions(engine):
+    """Per-set version numbers that let every process's question cache notice edits"""
+    QuestionSetVersion.__table__.create(engine, checkfirst=True)
+
+
+@migration('0007_score_grade_version')
+def score_grade_version(engine):
+    """Re-grade counter on scores, so cached answer reviews notice flipped answers"""
+    add_column_if_missing(engine, Score.__table__.c.grade_version)
+
+
+@migration('0008_item_stat_deltas')
+def item_stat_deltas(engine):
+    """Insert-only item_stats changes, so submissions stop updating the shared rows"""
+    ItemStatDelta.__table__.create(engine, checkfirst=True)
+
+
+def backfill_score_categories(engine):
+    """Compute score_categories for scores that have none, one range of score ids per transaction"""
+    with engine.connect() as connection:
+        max_id = connection.execute(select(func.max(Score.score_id))).scalar() or 0
+    filled = 0
+    for start in range(0, max_id + 1, repository.SCORE_BATCH_SIZE):
+        with engine.begin() as connection:
+            score_ids = connection.execute(
+                select(Score.score_id).where(
+                    Score.score_id.between(start, start + repository.SCORE_BATCH_SIZE - 1),
+                    ~select(ScoreCategory.score_id).where(ScoreCategory.score_id == Score.score_id).exists()
+                )
+            ).scalars().all()
+            repository.rebuild_score_categories(connection, score_ids)
+            filled += len(score_ids)
+    print(f"Computed category sub-scores for {filled} scores")
+    return filled
+
+
+def backfill_item_stats(engine):
+    """Rebuild item_stats for every question set, one set per transaction"""
+    with engine.connect() as connection:
+        set_numbers = connection.execute(select(Question.set_number).distinct().
+                                         order_by(Question.set_number)).scalars().all()
+    rebuilt = 0
+    for set_number in set_numbers:
+        with engine.begin() as connection:
+            rebuilt += item_stats.rebuild(connection, [set_number])
+    print(f"Rebuilt item statistics for {rebuilt} questions in {len(set_numbers)} sets")
+    return rebuilt
+
+
+def backfill_scores(engine):
+    """Fill scores.set_number and attempt_fingerprint where missing; safe to re-run.
+
+    Answers written before they carried score_id are linked first: the old
+    save path stamped answered_at and submitted_at with the same time, so
+    (candidate_id, answered_at) identifies the score they belong to.
+    """
+    linked = backfill_in_chunks(engine, Answer.answer_id, update(Answer.__table__).
+                                where(Answer.score_id.is_(None)).
+                                values(score_id=select(func.min(Score.score_id)).
+                                       where(Score.candidate_id == Answer.candidate_id,
+                                             Score.submitted_at == Answer.answered_at).
+                                       scalar_subquery()))
+    with_sets = backfill_in_chunks(engine, Score.score_id, update(Score.__table__).
+                                   where(Score.set_number.is_(None)).
+                                   values(set_number=select(func.min(Question.set_number)).
+                                          join(Answer, Answer.question_id == Question.question_id).
+                                          where(Answer.score_id == Score.score_id).
+                                          scalar_subquery()))
+    fingerprinted = backfill_fingerprints(engine)
+    print(f"Linked {linked} answers, set set_number on {with_sets} scores, fingerprinted {fingerprinted} scores")
+    return linked, with_sets, fingerprinted
+
+
+def backfill_fingerprints(engine):
+    """Compute attempt_fingerprint in Python, one range of score ids per transaction"""
+    set_fingerprint = update(Score.__table__).\
+        where(Score.score_id == bindparam('b_score_id')).\
+        values(attempt_fingerprint=bindparam('b_fingerprint'))
+    with engine.connect() as connection:
+        max_id = connection.execute(select(func.max(Score.score_id))).scalar() or 0
+    updated = 0
+    for start in range(0, max_id + 1, BACKFILL_CHUNK_SIZE):
+        with engine.begin() as connection:
+            scores = dict(connection.execute(
+                select(Score.score_id, Score.set_number).where(
+                    Score.score_id.between(start, start + BACKFILL_CHUNK_SIZE - 1),
+                    Score.attempt_fingerprint.is_(None),
+                    Score.set_number.isnot(None)
+                )
+            ).all())
+            if not scores:
+                continue
+            selections = {}
+            for score_id, question_id, selected in connection.execute(
+                    select(Answer.score_id, Answer.question_id, Answer.selected_option).
+                    where(Answer.score_id.in_(list(scores)))):
+                selections.setdefault(score_id, []).append((question_id, selected))
+            connection.execute(set_fingerprint, [
+                {'b_score_id': score_id,
+                 'b_fingerprint': repository.attempt_fingerprint(set_number, selections.get(score_id, []))}
+                for score_id, set_number in scores.items()
+            ])
+            updated += len(scores)
+    return updated
+
+
+# ---------- RUNNER ----------
+def applied_versions(engine):
+    migrations_metadata.create_all(engine)
+    with engine.connect() as connection:
+        return set(connection.execute(select(schema_migrations.c.version)).scalars())
+
+
+def upgrade(engine):
+    """Create missing tables, then apply pending migrations in order; returns the versions applied"""
+    Base.metadata.create_all(engine)
+    done = applied_versions(engine)
+    applied = []
+    for version, fn in sorted(MIGRATIONS):
+        if version in done:
+            continue
+        print(f"Applying migration {version}...")
+        fn(engine)
+        with engine.begin() as connection:
+            connection.execute(schema_migrations.insert().values(version=version, applied_at=datetime.now()))
+        applied.append(version)
+    return applied
+
+
+def status(engine):
+    done = applied_versions(engine)
+    return [(version, version in done) for version, _ in sorted(MIGRATIONS)]
+
+
+# ---------- QUERY PLAN CHECK ----------
+def full_scans(connection, statement, params):
+    """Tables the database would read with a full scan for this statement"""
+    sql = statement.params(**params).compile(dialect=connection.dialect, compile_kwargs={'literal_binds': True})
+    dialect = connection.dialect.name
+    if dialect == 'mysql':
+        rows = connection.execute(text(f'EXPLAIN {sql}')).mappings().all()
+        return [row['table'] for row in rows if row['type'] == 'ALL']
+    if dialect == 'sqlite':
+        rows = connection.execute(text(f'EXPLAIN QUERY PLAN {sql}')).all()
+        # "SCAN answers" is a full scan; "SCAN ... USING (COVERING) INDEX" and a FROM-less "SCAN CONSTANT ROW" are not
+        return [row[-1].split()[1] for row in rows
+                if row[-1].startswith('SCAN ') and 'INDEX' not in row[-1] and 'SUBQUERY' not in row[-1]
+                and row[-1] != 'SCAN CONSTANT ROW']
+    raise NotImplementedError(f"Query plan check is not supported for {dialect}")
+
+
+def check_query_plans(engine):
+    """EXPLAIN every hot query; returns {query name: [fully scanned tables]} for offenders"""
+    problems = {}
+    with engine.connect() as connection:
+        for name, (statement, params) in repository.hot_queries().items():
+            tables = full_scans(connection, statement, params)
+            if tables:
+                problems[name] = tables
+    return problems
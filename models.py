@@ -0,0 +1,214 @@
+"""SQLAlchemy models shared by the candidate app (app.py) and the admin app (admin.py).
+
+These definitions follow the live schema written by the candidate app; both
+processes import them so there is a single mapping per table. Indexes declared
+here are created on existing databases by the migrations in migrations.py.
+"""
+from sqlalchemy import Column, Integer, String, Boolean, Float, DateTime, ForeignKey, Text, DECIMAL, Index
+from sqlalchemy.orm import declarative_base
+
+Base = declarative_base()
+
+
+class AdminUser(Base):
+    __tablename__ = 'admin_users'
+    id = Column(Integer, primary_key=True)
+    username = Column(String(50), unique=True, nullable=False)
+    password_hash = Column(String(255), nullable=False)
+
+
+class Candidate(Base):
+    __tablename__ = 'candidates'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    full_name = Column(String(100), nullable=False)
+    email = Column(String(100), nullable=False)
+    email_normalized = Column(String(100))  # lower(trim(email)), so lookups can use an index
+    phone = Column(String(15), nullable=False)
+    area = Column(String(100))
+    city = Column(String(100))
+    pincode = Column(String(10))
+    position = Column(String(100), nullable=False)
+    has_experience = Column(Boolean, default=False)
+    previous_company = Column(String(100))
+    role = Column(String(100))
+    domain = Column(String(100))
+    years_experience = Column(Float)
+    tech_stack = Column(Text)
+    submitted_at = Column(DateTime)
+
+    __table_args__ = (
+        Index('ix_candidates_email_normalized', 'email_normalized', 'submitted_at'),
+        Index('ix_candidates_submitted_at', 'submitted_at', 'id'),
+    )
+
+
+class Question(Base):
+    __tablename__ = 'questions'
+    question_id = Column(Integer, primary_key=True, autoincrement=True)
+    set_number = Column(Integer, nullable=False)
+    category = Column(String(50), nullable=False)
+    question_text = Column(Text, nullable=False)
+    option_a = Column(Text, nullable=False)
+    option_b = Column(Text, nullable=False)
+    option_c = Column(Text, nullable=False)
+    option_d = Column(Text, nullable=False)
+    correct_option = Column(String(1), nullable=False)
+
+    __table_args__ = (
+        Index('ix_questions_set_number', 'set_number', 'question_id'),
+    )
+
+
+class TestHistory(Base):
+    __tablename__ = 'test_history'
+    history_id = Column(Integer, primary_key=True, autoincrement=True)
+    candidate_id = Column(Integer, ForeignKey('candidates.id'))
+    question_id = Column(Integer, ForeignKey('questions.question_id'))
+    attempt_number = Column(Integer)
+    assigned_at = Column(DateTime)
+
+    __table_args__ = (
+        Index('ix_test_history_candidate_question', 'candidate_id', 'question_id'),
+    )
+
+
+class Answer(Base):
+    __tablename__ = 'answers'
+    answer_id = Column(Integer, primary_key=True, autoincrement=True)
+    candidate_id = Column(Integer, ForeignKey('candidates.id'))
+    question_id = Column(Integer, ForeignKey('questions.question_id'))
+    selected_option = Column(String(1))
+    is_correct = Column(Boolean)
+    answered_at = Column(DateTime)
+    score_id = Column(Integer, ForeignKey('scores.score_id'))
+
+    __table_args__ = (
+        Index('ix_answers_candidate_question', 'candidate_id', 'question_id'),
+        Index('ix_answers_score_id', 'score_id'),
+        Index('ix_answers_question', 'question_id', 'answer_id'),
+    )
+
+
+class Score(Base):
+    __tablename__ = 'scores'
+    score_id = Column(Integer, primary_key=True, autoincrement=True)
+    candidate_id = Column(Integer, ForeignKey('candidates.id'))
+    attempt_number = Column(Integer)
+    total_questions = Column(Integer)
+    correct_answers = Column(Integer)
+    score_percent = Column(DECIMAL(5, 2))
+    submitted_at = Column(DateTime)
+    set_number = Column(Integer)  # Question set of this attempt, recorded at submission
+    attempt_fingerprint = Column(String(64))  # sha256 of the set and the selected options (see repository)
+    grade_version = Column(Integer, default=0)  # Bumped by every re-grade that changes one of its answers
+
+    __table_args__ = (
+        Index('ix_scores_candidate_attempt', 'candidate_id', 'attempt_number'),
+        Index('ix_scores_submitted_at', 'submitted_at', 'score_id'),
+        Index('ix_scores_set_submitted_at', 'set_number', 'submitted_at', 'score_id'),
+    )
+
+
+class ScoreCategory(Base):
+    __tablename__ = 'score_categories'  # Per-category sub-scores of an attempt, written with the score
+    score_id = Column(Integer, ForeignKey('scores.score_id'), primary_key=True, autoincrement=False)
+    category = Column(String(50), primary_key=True)
+    correct = Column(Integer, nullable=False)
+    total = Column(Integer, nullable=False)
+    percent = Column(DECIMAL(5, 2), nullable=False)
+
+    __table_args__ = (
+        Index('ix_score_categories_category_percent', 'category', 'percent', 'score_id'),
+    )
+
+
+class TabSwitchEvent(Base):
+    __tablename__ = 'tab_switch_events'
+    event_id = Column(Integer, primary_key=True, autoincrement=True)
+    candidate_id = Column(Integer, ForeignKey('candidates.id'))
+    attempt_number = Column(Integer)
+    event_type = Column(String(50))  # e.g., 'tab_switch_in', 'tab_switch_out'
+    timestamp = Column(DateTime)
+
+    __table_args__ = (
+        Index('ix_tab_switch_events_candidate_attempt', 'candidate_id', 'attempt_number'),
+    )
+
+
+class ProctoringSummary(Base):
+    __tablename__ = 'proctoring_summaries'  # Running totals of tab_switch_events, updated as events are written
+    candidate_id = Column(Integer, ForeignKey('candidates.id'), primary_key=True)
+    attempt_number = Column(Integer, primary_key=True, autoincrement=False)
+    switch_count = Column(Integer, nullable=False, default=0)
+    total_away_seconds = Column(Float, nullable=False, default=0)
+    longest_absence_seconds = Column(Float, nullable=False, default=0)
+    last_out_at = Column(DateTime)  # Start of the absence still open, if any
+    updated_at = Column(DateTime)
+
+class VideoUpload(Base):
+    __tablename__ = 'video_uploads'
+    upload_id = Column(Integer, primary_key=True, autoincrement=True)
+    token = Column(String(32), nullable=False, unique=True)  # Spool file name in VIDEO_SPOOL_DIR
+    candidate_id = Column(Integer, ForeignKey('candidates.id'))
+    attempt_number = Column(Integer)
+    s3_key = Column(String(255))
+    status = Column(String(20), nullable=False)  # recording, pending, uploading, uploaded, empty, failed
+    attempts = Column(Integer, default=0)
+    last_error = Column(Text)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+
+    __table_args__ = (
+        Index('ix_video_uploads_status', 'status', 'updated_at'),
+        Index('ix_video_uploads_candidate', 'candidate_id'),
+    )
+
+
+class ItemStat(Base):
+    __tablename__ = 'item_stats'  # Running sums per question for item analysis, updated as attempts are graded
+    question_id = Column(Integer, ForeignKey('questions.question_id'), primary_key=True, autoincrement=False)
+    set_number = Column(Integer, nullable=False)
+    responses = Column(Integer, nullable=False, default=0)  # Graded attempts that included the question
+    correct = Column(Integer, nullable=False, default=0)
+    total_sum = Column(Integer, nullable=False, default=0)  # Sum of the attempts' correct_answers
+    total_sq_sum = Column(Integer, nullable=False, default=0)  # Sum of correct_answers squared
+    correct_total_sum = Column(Integer, nullable=False, default=0)  # Sum of correct_answers where this one was right
+    option_a_count = Column(Integer, nullable=False, default=0)
+    option_b_count = Column(Integer, nullable=False, default=0)
+    option_c_count = Column(Integer, nullable=False, default=0)
+    option_d_count = Column(Integer, nullable=False, default=0)
+    blank_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime)
+
+    __table_args__ = (
+        Index('ix_item_stats_set', 'set_number', 'question_id'),
+    )
+
+
+class ItemStatDelta(Base):
+    __tablename__ = 'item_stat_deltas'  # Insert-only changes to item_stats, folded in by item_stats.fold
+    delta_id = Column(Integer, primary_key=True, autoincrement=True)
+    question_id = Column(Integer, ForeignKey('questions.question_id'), nullable=False)
+    set_number = Column(Integer, nullable=False)
+    responses = Column(Integer, nullable=False, default=0)
+    correct = Column(Integer, nullable=False, default=0)
+    total_sum = Column(Integer, nullable=False, default=0)
+    total_sq_sum = Column(Integer, nullable=False, default=0)
+    correct_total_sum = Column(Integer, nullable=False, default=0)
+    option_a_count = Column(Integer, nullable=False, default=0)
+    option_b_count = Column(Integer, nullable=False, default=0)
+    option_c_count = Column(Integer, nullable=False, default=0)
+    option_d_count = Column(Integer, nullable=False, default=0)
+    blank_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime)
+
+    __table_args__ = (
+        Index('ix_item_stat_deltas_set', 'set_number', 'delta_id'),
+    )
+
+
+class QuestionSetVersion(Base):
+    __tablename__ = 'question_set_versions'  # Bumped when a set's questions or key change; caches compare it
+    set_number = Column(Integer, primary_key=True, autoincrement=False)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime)
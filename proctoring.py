@@ -0,0 +1,218 @@
+"""Proctoring event ingestion for the candidate app.
+
+The test page reports tab switches in batches. Events are buffered in memory
+per worker process and written to tab_switch_events with one multi-row
+INSERT, either when flush_size events are waiting or every flush_interval_ms,
+whichever comes first. A per-candidate token bucket caps how many events one
+browser can push, so a misbehaving client cannot flood the database.
+
+Each flush also recomputes proctoring_summaries (switch count, time away,
+longest absence per attempt) of the candidates in the batch, in the same
+transaction, so admin pages read one summary row per attempt instead of
+scanning raw events. The summary is refolded from all of the candidate's
+events in timestamp order rather than from the batch alone: the two halves
+of an absence can be flushed in different batches, by different workers,
+or in either order.
+
+Events still buffered when a worker dies are lost; they are advisory data and
+the buffer is flushed on normal interpreter exit.
+"""
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from models import ProctoringSummary, TabSwitchEvent
+
+logger = logging.getLogger(__name__)
+
+EVENT_TYPES = ('tab_switch_out', 'tab_switch_in')
+
+
+def parse_client_timestamp(value):
+    """Local naive datetime from a browser ISO-8601 timestamp (server time if unusable)"""
+    try:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return datetime.now()
+    if parsed.tzinfo is None:
+        return parsed
+    return parsed.astimezone().replace(tzinfo=None)
+
+
+# ---------- SUMMARIES ----------
+def fold_event(summary, event_type, timestamp):
+    """Apply one event to a summary; events must arrive in timestamp order"""
+    if event_type == 'tab_switch_out':
+        summary.switch_count += 1
+        summary.last_out_at = timestamp
+    elif summary.last_out_at is not None and timestamp is not None and timestamp >= summary.last_out_at:
+        away = (timestamp - summary.last_out_at).total_seconds()
+        summary.total_away_seconds += away
+        summary.longest_absence_seconds = max(summary.longest_absence_seconds, away)
+        summary.last_out_at = None
+
+
+def new_summary(candidate_id, attempt_number):
+    return ProctoringSummary(candidate_id=candidate_id, attempt_number=attempt_number, switch_count=0,
+                             total_away_seconds=0.0, longest_absence_seconds=0.0)
+
+
+def _summaries_from_events(db_session, candidate_ids):
+    """{(candidate_id, attempt_number): new ProctoringSummary} folded from tab_switch_events"""
+    events = db_session.query(TabSwitchEvent.candidate_id, TabSwitchEvent.attempt_number,
+                              TabSwitchEvent.event_type, TabSwitchEvent.timestamp).\
+        filter(TabSwitchEvent.candidate_id.in_(candidate_ids)).\
+        order_by(TabSwitchEvent.candidate_id, TabSwitchEvent.attempt_number, TabSwitchEvent.timestamp,
+                 TabSwitchEvent.event_id)
+    summaries = {}
+    now = datetime.now()
+    for candidate_id, attempt_number, event_type, timestamp in events:
+        key = (candidate_id, attempt_number)
+        if key not in summaries:
+            summaries[key] = new_summary(*key)
+        fold_event(summaries[key], event_type, timestamp)
+        summaries[key].updated_at = now
+    return summaries
+
+
+def update_summaries(db_session, rows):
+    """Recompute the summaries of the candidates in rows, in the caller's transaction.
+
+    Call it after the rows are inserted. Summary rows are read FOR UPDATE so
+    two workers flushing events for the same candidate apply them one after
+    the other.
+    """
+    candidate_ids = sorted({row['candidate_id'] for row in rows})
+    summaries = {(summary.candidate_id, summary.attempt_number): summary for summary in
+                 db_session.query(ProctoringSummary).
+                 filter(ProctoringSummary.candidate_id.in_(candidate_ids)).with_for_update()}
+    for key, folded in _summaries_from_events(db_session, candidate_ids).items():
+        summary = summaries.get(key)
+        if summary is None:
+            db_session.add(folded)
+            continue
+        for column in ('switch_count', 'total_away_seconds', 'longest_absence_seconds', 'last_out_at',
+                       'updated_at'):
+            setattr(summary, column, getattr(folded, column))
+
+
+def rebuild_summaries(db_session, candidate_ids):
+    """Recompute the summaries of the given candidates from tab_switch_events"""
+    db_session.query(ProctoringSummary).filter(ProctoringSummary.candidate_id.in_(candidate_ids)).\
+        delete(synchronize_session=False)
+    summaries = _summaries_from_events(db_session, candidate_ids)
+    db_session.add_all(summaries.values())
+    return len(summaries)
+
+
+# ---------- INGESTION ----------
+class RateLimiter:
+    """Token bucket per key: burst tokens, refilled at rate_per_second"""
+
+    def __init__(self, rate_per_second=2.0, burst=60, max_keys=10000):
+        self.rate = rate_per_second
+        self.burst = burst
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = {}  # key -> (tokens, last refill time)
+
+    def take(self, key, count=1):
+        """Consume up to count tokens; returns how many were granted"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            granted = min(count, int(tokens))
+            self._buckets[key] = (tokens - granted, now)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+            return granted
+
+    def _prune(self, now):
+        # A bucket that has refilled completely is the same as no bucket
+        full_after = self.burst / self.rate
+        self._buckets = {key: (tokens, last) for key, (tokens, last) in self._buckets.items()
+                         if now - last < full_after}
+
+
+class EventBuffer:
+    """Per-process buffer of tab switch events flushed with multi-row INSERTs"""
+
+    def __init__(self, session_factory, flush_size=200, flush_interval_ms=1000, max_buffered=10000):
+        self.session_factory = session_factory
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_buffered = max_buffered
+        self._events = []
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self.flushed = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.failures = 0
+        self._thread = threading.Thread(target=self._run, name='proctoring-flush', daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def add(self, rows):
+        """Queue event mappings (candidate_id, attempt_number, event_type, timestamp)"""
+        with self._condition:
+            room = self.max_buffered - len(self._events)
+            if room < len(rows):
+                self.dropped += len(rows) - max(room, 0)
+                rows = rows[:max(room, 0)]
+            self._events.extend(rows)
+            if len(self._events) >= self.flush_size:
+                self._condition.notify()
+        return len(rows)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: len(self._events) >= self.flush_size, timeout=self.flush_interval)
+            failures = self.failures
+            self.flush()
+            if self.failures > failures:
+                time.sleep(self.flush_interval)  # Don't spin against a database that is down
+
+    def flush(self):
+        """Write everything buffered so far; returns the number of rows written"""
+        with self._flush_lock:
+            with self._condition:
+                rows, self._events = self._events, []
+            if not rows:
+                return 0
+            db_session = self.session_factory()
+            try:
+                db_session.execute(insert(TabSwitchEvent), rows)
+                update_summaries(db_session, rows)
+                db_session.commit()
+            except Exception as e:
+                db_session.rollback()
+                logger.error("Error flushing %d tab switch events: %s", len(rows), e)
+                self.failures += 1
+                # Put them back for the next flush, behind anything newer
+                self.add(rows)
+                return 0
+            finally:
+                db_session.close()
+            self.flushed += len(rows)
+            self.flushes += 1
+            return len(rows)
+
+    def stats(self):
+        with self._condition:
+            buffered = len(self._events)
+        return {
+            'buffered': buffered,
+            'flushed': self.flushed,
+            'flushes': self.flushes,
+            'dropped': self.dropped,
+            'failures': self.failures,
+            'flush_size': self.flush_size,
+            'flush_interval_ms': int(self.flush_interval * 1000)
+        }
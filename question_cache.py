@@ -0,0 +1,135 @@
+"""In-process cache of question sets.
+
+Question sets are effectively immutable during a hiring drive, so the
+candidate app keeps each set as a tuple of immutable CachedQuestion
+records instead of re-reading it from MySQL on every /test request.
+Entries expire after a TTL and can be dropped explicitly (per set or all
+at once) when questions are edited.
+
+Explicit invalidation only reaches the process that receives it, so each
+set also has a version number in the question_set_versions table, bumped by
+the admin app and by re-grades. With a version_loader the cache re-reads
+that number (one primary-key lookup) at most every version_check_seconds
+and reloads the set when it has moved, so every worker on every host drops
+a stale set within that interval. If that lookup fails, a set still within
+its TTL keeps being served and the check is retried after the interval.
+"""
+import logging
+import threading
+import time
+from collections import namedtuple
+
+CachedQuestion = namedtuple('CachedQuestion', [
+    'question_id',
+    'category',
+    'question_text',
+    'option_a',
+    'option_b',
+    'option_c',
+    'option_d',
+    'correct_option'
+])
+
+logger = logging.getLogger(__name__)
+
+
+class QuestionCache:
+    """Thread-safe TTL cache of question sets keyed by set number.
+
+    loader(set_number) must return a tuple of CachedQuestion. Empty results
+    are not cached so a set that is being seeded shows up without waiting
+    for the TTL. version_loader(set_number), if given, returns the set's
+    current version number.
+    """
+
+    def __init__(self, loader, ttl_seconds=300, version_loader=None, version_check_seconds=5):
+        self._loader = loader
+        self._ttl = ttl_seconds
+        self._version_loader = version_loader
+        self._version_check = version_check_seconds
+        self._lock = threading.Lock()
+        self._entries = {}  # set_number -> (generation, expires_at, questions, set_version, checked_until)
+        self._generations = {}  # set_number -> bumped on every invalidation of that set
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale_versions = 0  # Reloads caused by a version bump from another process
+        self.version_errors = 0  # Failed version checks
+
+    def get(self, set_number, version=None):
+        """The set's questions.
+
+        A caller that has just read the set's question_set_versions row
+        passes it as version: it replaces the periodic check, and an entry
+        cached under any other version is reloaded.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(set_number)
+            if version is None:
+                fresh = self._version_loader is None or (entry and entry[4] > now)
+            else:
+                fresh = entry and entry[3] == version
+            if entry and entry[1] > now and fresh:
+                self.hits += 1
+                return entry[2]
+            generation = self._generation(set_number)
+        set_version = version
+        if version is None and self._version_loader is not None:
+            try:
+                set_version = self._version_loader(set_number)
+            except Exception:
+                logger.exception("Version check failed for question set %s", set_number)
+                with self._lock:
+                    self.version_errors += 1
+                    if entry and entry[1] > now:
+                        # Serve what we have; the entry still expires with its TTL
+                        if self._entries.get(set_number) is entry:
+                            self._entries[set_number] = entry[:4] + (now + self._version_check,)
+                        self.hits += 1
+                        return entry[2]
+            if entry and entry[1] > now and entry[3] == set_version:
+                with self._lock:
+                    if self._entries.get(set_number) is entry:
+                        self._entries[set_number] = entry[:4] + (now + self._version_check,)
+                    self.hits += 1
+                return entry[2]
+        with self._lock:
+            self.misses += 1
+            if entry and set_version is not None and entry[3] != set_version:
+                self.stale_versions += 1
+        # The version is read before the questions, so an edit in between is caught by the next check
+        questions = self._loader(set_number)
+        if questions:
+            with self._lock:
+                # Don't store a result that was loaded before an invalidation
+                if generation == self._generation(set_number):
+                    self._entries[set_number] = (generation, now + self._ttl, questions, set_version,
+                                                 now + self._version_check)
+        return questions
+
+    def _generation(self, set_number):
+        return (self._version, self._generations.get(set_number, 0))
+
+    def invalidate(self, set_number=None):
+        """Drop one set, or every set when set_number is None"""
+        with self._lock:
+            if set_number is None:
+                self._version += 1
+                self._entries.clear()
+            else:
+                self._generations[set_number] = self._generations.get(set_number, 0) + 1
+                self._entries.pop(set_number, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale_versions': self.stale_versions,
+                'version_errors': self.version_errors,
+                'cached_sets': sorted(self._entries),
+                'version': self._version,
+                'ttl_seconds': self._ttl,
+                'version_check_seconds': self._version_check if self._version_loader else None
+            }
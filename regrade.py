@@ -0,0 +1,206 @@
+"""Re-grade stored answers after an answer-key correction.
+
+    python manage.py regrade --set 3
+    python manage.py regrade --question 42 --correct-option B
+    python manage.py regrade --set 3 --dry-run
+
+Answers to the affected questions are streamed one question and one chunk
+of answer ids at a time (keyset over ix_answers_question) and graded with
+grading.py. Only answers whose is_correct changes are written, with two
+set-based UPDATEs per chunk. The scores of the attempts that changed are
+then recomputed from their answers, with their category sub-scores, one
+chunk of score ids at a time, and the item statistics of the set are
+rebuilt.
+Every chunk is its own short transaction, so no lock is held for longer
+than one chunk.
+
+Unless it is a dry run, the re-grade first writes the new key and bumps the
+question_set_versions of the affected sets, whichever entry point started
+it (this CLI or the admin form). Every question cache then reloads the set
+within its version check interval. Submissions graded with the old key in
+that window are caught by a second pass that starts settle_seconds after
+the bump and reads only answers newer than the first pass.
+"""
+import os
+import time
+from collections import namedtuple
+
+from sqlalchemy import bindparam, case, select, update
+from sqlalchemy.sql import func
+
+import grading
+import item_stats
+import repository
+from models import Answer, Question, Score
+
+REGRADE_CHUNK_SIZE = 5000
+SETTLE_SECONDS = int(os.getenv('QUESTION_VERSION_CHECK_SECONDS', 5))  # Longest a question cache serves an old key
+LARGEST_CHANGES = 10  # Score changes listed in the report
+
+KeyQuestion = namedtuple('KeyQuestion', ['question_id', 'category', 'correct_option'])
+ScoreState = namedtuple('ScoreState', ['correct_answers', 'score_percent', 'total_questions'])
+
+_ANSWER_CHUNK = select(Answer.answer_id, Answer.score_id, Answer.selected_option, Answer.is_correct).\
+    where(Answer.question_id == bindparam('question_id'), Answer.answer_id > bindparam('after_id')).\
+    order_by(Answer.answer_id).limit(bindparam('chunk_size'))
+
+_SCORE_CORRECT_COUNT = select(func.count(Answer.answer_id)).\
+    where(Answer.score_id == Score.score_id, Answer.is_correct == True).\
+    scalar_subquery()
+
+_RECOMPUTE_SCORES = update(Score.__table__).\
+    where(Score.score_id.in_(bindparam('score_ids', expanding=True))).\
+    values(correct_answers=_SCORE_CORRECT_COUNT,
+           score_percent=case((Score.total_questions > 0,
+                               func.round(_SCORE_CORRECT_COUNT * 100.0 / Score.total_questions, 2)), else_=0),
+           grade_version=func.coalesce(Score.grade_version, 0) + 1)
+
+
+def _set_correct(connection, answer_ids, is_correct):
+    if answer_ids:
+        connection.execute(update(Answer.__table__).
+                           where(Answer.answer_id.in_(bindparam('answer_ids', expanding=True))).
+                           values(is_correct=is_correct),
+                           {'answer_ids': answer_ids})
+
+
+def _score_rows(engine, score_ids, chunk_size):
+    rows = {}
+    for start in range(0, len(score_ids), chunk_size):
+        with engine.connect() as connection:
+            for row in connection.execute(
+                    select(Score.score_id, Score.correct_answers, Score.score_percent, Score.total_questions).
+                    where(Score.score_id.in_(score_ids[start:start + chunk_size]))):
+                rows[row.score_id] = ScoreState(row.correct_answers, row.score_percent, row.total_questions)
+    return rows
+
+
+def normalize_option(value):
+    """'b ' -> 'B'; raises ValueError for anything but A-D"""
+    option = str(value).strip().upper()
+    if option not in grading.BASE_CODES:
+        raise ValueError(f"correct_option must be one of {', '.join(grading.BASE_CODES)}, not {value!r}")
+    return option
+
+
+def _regrade_answers(engine, key, last_ids, dry_run, chunk_size, report, score_deltas):
+    """Grade answers newer than last_ids[question_id], advancing last_ids as chunks are read"""
+    for current_question in key.question_ids:
+        while True:
+            with engine.begin() as connection:
+                rows = connection.execute(_ANSWER_CHUNK, {
+                    'question_id': current_question, 'after_id': last_ids[current_question], 'chunk_size': chunk_size
+                }).all()
+                if not rows:
+                    break
+                last_ids[current_question] = rows[-1].answer_id
+                graded = grading.grade_answers(key, [current_question] * len(rows),
+                                               [row.selected_option for row in rows])
+                now_correct, now_incorrect = [], []
+                for row, is_correct in zip(rows, graded.tolist()):
+                    if is_correct == bool(row.is_correct):
+                        continue
+                    (now_correct if is_correct else now_incorrect).append(row.answer_id)
+                    if row.score_id is not None:
+                        score_deltas[row.score_id] = score_deltas.get(row.score_id, 0) + (1 if is_correct else -1)
+                if not dry_run:
+                    _set_correct(connection, now_correct, True)
+                    _set_correct(connection, now_incorrect, False)
+            report['answers_checked'] += len(rows)
+            report['now_correct'] += len(now_correct)
+            report['now_incorrect'] += len(now_incorrect)
+
+
+def regrade(engine, set_number=None, question_id=None, correct_option=None, dry_run=False,
+            chunk_size=REGRADE_CHUNK_SIZE, settle_seconds=SETTLE_SECONDS):
+    """Re-grade one question or a whole set; returns a before/after report dict"""
+    if (set_number is None) == (question_id is None):
+        raise ValueError("Give exactly one of set_number or question_id")
+    if correct_option is not None and question_id is None:
+        raise ValueError("correct_option can only be changed for a single question")
+    if correct_option is not None:
+        correct_option = normalize_option(correct_option)
+
+    with engine.connect() as connection:
+        criteria = Question.set_number == set_number if question_id is None else Question.question_id == question_id
+        rows = connection.execute(select(Question.question_id, Question.category, Question.correct_option,
+                                         Question.set_number).where(criteria).order_by(Question.question_id)).all()
+    questions = [KeyQuestion(*row[:3]) for row in rows]
+    set_numbers = sorted({row.set_number for row in rows})
+    if correct_option is not None:
+        questions = [question._replace(correct_option=correct_option) for question in questions]
+    key = grading.AnswerKey(questions)
+
+    bumped_at = None
+    if not dry_run and questions:
+        with engine.begin() as connection:
+            if correct_option is not None:
+                connection.execute(update(Question.__table__).
+                                   where(Question.question_id == question_id).
+                                   values(correct_option=correct_option))
+            repository.bump_question_set_versions(connection, set_numbers)
+        bumped_at = time.monotonic()
+
+    report = {'questions': len(questions), 'answers_checked': 0, 'now_correct': 0, 'now_incorrect': 0,
+              'dry_run': dry_run}
+    score_deltas = {}
+    last_ids = dict.fromkeys(key.question_ids, 0)
+    _regrade_answers(engine, key, last_ids, dry_run, chunk_size, report, score_deltas)
+    if bumped_at is not None:
+        # Catch submissions graded by caches that had not yet seen the new version
+        time.sleep(max(0.0, bumped_at + settle_seconds - time.monotonic()))
+        _regrade_answers(engine, key, last_ids, dry_run, chunk_size, report, score_deltas)
+
+    # Scores: read before, recompute from the answers, read after
+    score_ids = sorted(score_deltas)
+    before = _score_rows(engine, score_ids, chunk_size)
+    if dry_run:
+        after = {}
+        for score_id, row in before.items():
+            correct = row.correct_answers + score_deltas[score_id]
+            percent = round(correct / row.total_questions * 100, 2) if row.total_questions else 0
+            after[score_id] = row._replace(correct_answers=correct, score_percent=percent)
+    else:
+        for start in range(0, len(score_ids), repository.SCORE_BATCH_SIZE):
+            batch = score_ids[start:start + repository.SCORE_BATCH_SIZE]
+            with engine.begin() as connection:
+                connection.execute(_RECOMPUTE_SCORES, {'score_ids': batch})
+                repository.rebuild_score_categories(connection, batch)
+        after = _score_rows(engine, score_ids, chunk_size)
+        # Totals moved for every question of the changed attempts, so rebuild whole sets
+        if score_ids:
+            with engine.begin() as connection:
+                item_stats.rebuild(connection, set_numbers)
+
+    changes = [(score_id, before[score_id], after[score_id]) for score_id in score_ids
+               if score_id in before and score_id in after
+               and before[score_id].correct_answers != after[score_id].correct_answers]
+    report['scores_changed'] = len(changes)
+    if changes:
+        report['mean_percent_before'] = sum(float(b.score_percent or 0) for _, b, _ in changes) / len(changes)
+        report['mean_percent_after'] = sum(float(a.score_percent or 0) for _, _, a in changes) / len(changes)
+    changes.sort(key=lambda change: abs(change[2].correct_answers - change[1].correct_answers), reverse=True)
+    report['largest_changes'] = [
+        {'score_id': score_id, 'correct_before': b.correct_answers, 'correct_after': a.correct_answers,
+         'percent_before': float(b.score_percent or 0), 'percent_after': float(a.score_percent or 0)}
+        for score_id, b, a in changes[:LARGEST_CHANGES]
+    ]
+    report['changed_score_ids'] = [score_id for score_id, _, _ in changes]
+    return report
+
+
+def format_report(report):
+    lines = [
+        f"{'DRY RUN: ' if report['dry_run'] else ''}Re-graded {report['answers_checked']} answers "
+        f"to {report['questions']} question(s)",
+        f"  answers now correct:   {report['now_correct']}",
+        f"  answers now incorrect: {report['now_incorrect']}",
+        f"  scores changed:        {report['scores_changed']}"
+    ]
+    if report['scores_changed']:
+        lines.append(f"  mean score of changed attempts: {report['mean_percent_before']:.2f}% -> "
+                     f"{report['mean_percent_after']:.2f}%")
+        for change in report['largest_changes']:
+            lines.append(f"    score {change['score_id']}: {change['correct_before']} -> {change['correct_after']} correct "
+                         f"({change['percent_before']:.2f}% -> {change['percent_after']:.2f}%)")
+    return "\n".join(lines)
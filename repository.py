@@ -0,0 +1,388 @@
+"""Reusable queries for the hot paths of the candidate and admin apps.
+
+Statements are built once at import time with bound parameters, so each
+call only binds values; SQLAlchemy's compiled cache does the rest. Every
+function takes the caller's session and leaves commit/close to the caller.
+"""
+import hashlib
+from datetime import datetime
+
+from sqlalchemy import and_, bindparam, case, delete, exists, insert, or_, select, union, update
+from sqlalchemy.sql import func
+
+from models import (Answer, Candidate, ItemStat, ItemStatDelta, ProctoringSummary, Question, QuestionSetVersion, Score, ScoreCategory,
+                    TestHistory)
+from question_cache import CachedQuestion
+
+EVENT_BATCH_SIZE = 500  # Max candidate ids per IN (...) when fetching proctoring data
+SCORE_BATCH_SIZE = 500  # Max score ids per IN (...) when fetching or rebuilding category sub-scores
+
+
+class AttemptLimitReached(Exception):
+    """Raised when an email has already used every allowed attempt"""
+
+# ---------- CANDIDATE APP ----------
+_MOST_RECENT_CANDIDATE_ID = select(Candidate.id).\
+    where(Candidate.email_normalized == bindparam('email')).\
+    order_by(Candidate.submitted_at.desc()).limit(1)
+
+_CANDIDATE_IDS_FOR_EMAIL = select(Candidate.id).\
+    where(Candidate.email_normalized == bindparam('email')).\
+    order_by(Candidate.submitted_at.asc())
+
+_LOCKED_ATTEMPT_COUNT = select(func.count(Candidate.id)).\
+    where(Candidate.email_normalized == bindparam('email')).\
+    with_for_update()
+
+_TAKEN_SETS = union(
+    select(Question.set_number).
+    join(TestHistory, TestHistory.question_id == Question.question_id).
+    where(TestHistory.candidate_id.in_(bindparam('candidate_ids', expanding=True))),
+    select(Question.set_number).
+    join(Answer, Answer.question_id == Question.question_id).
+    where(Answer.candidate_id.in_(bindparam('candidate_ids', expanding=True)))
+).order_by('set_number')
+
+_QUESTION_SET = select(
+    Question.question_id, Question.category, Question.question_text, Question.option_a,
+    Question.option_b, Question.option_c, Question.option_d, Question.correct_option
+).where(Question.set_number == bindparam('set_number')).order_by(Question.question_id)
+
+_ATTEMPT_STARTED_AT = select(func.min(TestHistory.assigned_at)).where(
+    TestHistory.candidate_id == bindparam('candidate_id'),
+    TestHistory.question_id.in_(bindparam('question_ids', expanding=True))
+)
+
+# Start time and submission state of an attempt in one round trip
+_ATTEMPT_STATE = select(
+    _ATTEMPT_STARTED_AT.scalar_subquery(),
+    exists().where(Score.candidate_id == bindparam('candidate_id'), Score.set_number == bindparam('set_number'))
+)
+
+_NEXT_HISTORY_ATTEMPT = select(func.coalesce(func.max(TestHistory.attempt_number), 0) + 1).\
+    where(TestHistory.candidate_id == bindparam('candidate_id'))
+
+_NEXT_SCORE_ATTEMPT = select(func.coalesce(func.max(Score.attempt_number), 0) + 1).\
+    where(Score.candidate_id == bindparam('candidate_id'))
+
+_ANSWERED_IN_SET = select(func.count()).select_from(Answer).\
+    join(Question, Answer.question_id == Question.question_id).where(
+        Answer.candidate_id == bindparam('candidate_id'),
+        Question.set_number == bindparam('set_number'),
+        Answer.selected_option != None,
+        Answer.selected_option != ''
+    )
+
+_SET_QUESTION_COUNT = select(func.count()).select_from(Question).\
+    where(Question.set_number == bindparam('set_number'))
+
+_QUESTION_SET_VERSION = select(QuestionSetVersion.version).\
+    where(QuestionSetVersion.set_number == bindparam('set_number'))
+
+
+def attempt_fingerprint(set_number, selections):
+    """Stable digest of an attempt: its set plus (question_id, selected_option) pairs in any order"""
+    parts = [f"{question_id}={selected or ''}" for question_id, selected in sorted(selections)]
+    return hashlib.sha256(f"{set_number}:{','.join(parts)}".encode('utf-8')).hexdigest()
+
+
+def normalize_email(email):
+    """Value stored in candidates.email_normalized"""
+    return email.strip().lower()
+
+
+def most_recent_candidate_id(db_session, email):
+    return db_session.execute(_MOST_RECENT_CANDIDATE_ID, {'email': normalize_email(email)}).scalar()
+
+
+def candidate_ids_for_email(db_session, email):
+    """All candidate ids for an email, oldest first"""
+    return db_session.execute(_CANDIDATE_IDS_FOR_EMAIL, {'email': normalize_email(email)}).scalars().all()
+
+
+def register_candidate(db_session, candidate, max_attempts):
+    """Check the per-email attempt cap and insert the candidate in the caller's transaction.
+
+    COUNT ... FOR UPDATE takes next-key locks on the email's index range, so
+    a parallel signup for the same email waits for this transaction instead
+    of also passing the cap. Returns the attempt number of the new record.
+    """
+    attempts = db_session.execute(_LOCKED_ATTEMPT_COUNT, {'email': candidate.email_normalized}).scalar()
+    if attempts >= max_attempts:
+        raise AttemptLimitReached(attempts)
+    db_session.add(candidate)
+    db_session.flush()
+    return attempts + 1
+
+
+def taken_sets(db_session, candidate_ids):
+    """Sets assigned to or answered by any of the given candidate ids"""
+    if not candidate_ids:
+        return []
+    return db_session.execute(_TAKEN_SETS, {'candidate_ids': list(candidate_ids)}).scalars().all()
+
+
+def load_question_set(db_session, set_number):
+    """One question set as a tuple of immutable CachedQuestion records"""
+    rows = db_session.execute(_QUESTION_SET, {'set_number': set_number}).all()
+    return tuple(CachedQuestion(*row) for row in rows)
+
+
+def question_set_version(db_session, set_number):
+    """Current version of a question set (0 until it is first bumped)"""
+    return db_session.execute(_QUESTION_SET_VERSION, {'set_number': set_number}).scalar() or 0
+
+
+def bump_question_set_versions(connection, set_numbers=None):
+    """Move the version of these sets (every set when None) so each process's question cache reloads them"""
+    if set_numbers is None:
+        set_numbers = connection.execute(select(Question.set_number).distinct()).scalars().all()
+    now = datetime.now()
+    for set_number in set_numbers:
+        bumped = connection.execute(update(QuestionSetVersion.__table__).
+                                    where(QuestionSetVersion.set_number == set_number).
+                                    values(version=QuestionSetVersion.version + 1, updated_at=now))
+        if not bumped.rowcount:
+            connection.execute(insert(QuestionSetVersion), {'set_number': set_number, 'version': 1, 'updated_at': now})
+    return list(set_numbers)
+
+
+def attempt_started_at(db_session, candidate_id, question_ids):
+    """When the set was first assigned to the candidate (None if it never was)"""
+    return db_session.execute(_ATTEMPT_STARTED_AT, {
+        'candidate_id': candidate_id, 'question_ids': list(question_ids)
+    }).scalar()
+
+
+def attempt_state(db_session, candidate_id, set_number, question_ids):
+    """(started_at or None, submitted) for the candidate's attempt at a set"""
+    started_at, submitted = db_session.execute(_ATTEMPT_STATE, {
+        'candidate_id': candidate_id, 'set_number': set_number, 'question_ids': list(question_ids)
+    }).one()
+    return started_at, bool(submitted)
+
+
+def next_history_attempt(db_session, candidate_id):
+    return db_session.execute(_NEXT_HISTORY_ATTEMPT, {'candidate_id': candidate_id}).scalar() or 1
+
+
+def next_score_attempt(db_session, candidate_id):
+    return db_session.execute(_NEXT_SCORE_ATTEMPT, {'candidate_id': candidate_id}).scalar() or 1
+
+
+def insert_test_history(db_session, rows):
+    """Multi-row INSERT of test_history mappings"""
+    if rows:
+        db_session.execute(insert(TestHistory), rows)
+
+
+def insert_answers(db_session, rows):
+    """Multi-row INSERT of answer mappings"""
+    if rows:
+        db_session.execute(insert(Answer), rows)
+
+
+def delete_set_answers(db_session, candidate_id, question_ids):
+    """Delete a candidate's answers to the given questions; returns the row count"""
+    return db_session.query(Answer).\
+        filter(Answer.candidate_id == candidate_id, Answer.question_id.in_(list(question_ids))).\
+        delete(synchronize_session=False)
+
+
+def answered_count(db_session, candidate_id, set_number):
+    return db_session.execute(_ANSWERED_IN_SET, {
+        'candidate_id': candidate_id, 'set_number': set_number
+    }).scalar() or 0
+
+
+def delete_set_scores(db_session, candidate_id, set_number, total_questions):
+    """Delete a candidate's scores for a set and their category sub-scores.
+
+    Legacy rows without set_number match on size.
+    """
+    criteria = [
+        Score.candidate_id == candidate_id,
+        or_(Score.set_number == set_number,
+            and_(Score.set_number.is_(None), Score.total_questions == total_questions))
+    ]
+    db_session.query(ScoreCategory).\
+        filter(ScoreCategory.score_id.in_(select(Score.score_id).where(*criteria))).\
+        delete(synchronize_session=False)
+    return db_session.query(Score).filter(*criteria).delete(synchronize_session=False)
+
+
+# ---------- CATEGORY SUB-SCORES ----------
+def category_percent(correct, total):
+    return round(correct / total * 100, 2) if total else 0
+
+
+def insert_score_categories(db_session, score_id, categories):
+    """Store {category: (correct, total)} for a score (see grading.category_scores)"""
+    if categories:
+        db_session.execute(insert(ScoreCategory), [
+            {'score_id': score_id, 'category': category, 'correct': correct, 'total': total,
+             'percent': category_percent(correct, total)}
+            for category, (correct, total) in categories.items()
+        ])
+
+
+def score_categories(db_session, score_ids):
+    """{score_id: [ScoreCategory, ...] in category order}, fetched in batches"""
+    score_ids = sorted(set(score_ids))
+    categories = {}
+    for start in range(0, len(score_ids), SCORE_BATCH_SIZE):
+        for row in db_session.query(ScoreCategory).\
+                filter(ScoreCategory.score_id.in_(score_ids[start:start + SCORE_BATCH_SIZE])).\
+                order_by(ScoreCategory.score_id, ScoreCategory.category):
+            categories.setdefault(row.score_id, []).append(row)
+    return categories
+
+
+def rebuild_score_categories(connection, score_ids):
+    """Recompute the sub-scores of these scores from their answers (re-grades, backfills)"""
+    score_ids = list(score_ids)
+    if not score_ids:
+        return 0
+    rows = connection.execute(
+        select(Answer.score_id, Question.category, func.sum(case((Answer.is_correct == True, 1), else_=0)),
+               func.count(Answer.answer_id)).
+        join(Question, Question.question_id == Answer.question_id).
+        where(Answer.score_id.in_(score_ids)).
+        group_by(Answer.score_id, Question.category)
+    ).all()
+    connection.execute(delete(ScoreCategory.__table__).where(ScoreCategory.score_id.in_(score_ids)))
+    if rows:
+        connection.execute(insert(ScoreCategory), [
+            {'score_id': score_id, 'category': category, 'correct': int(correct), 'total': total,
+             'percent': category_percent(int(correct), total)}
+            for score_id, category, correct, total in rows
+        ])
+    return len(rows)
+
+
+def set_question_count(db_session, set_number):
+    return db_session.execute(_SET_QUESTION_COUNT, {'set_number': set_number}).scalar() or 0
+
+
+def hot_queries():
+    """Hot statements with sample parameters, for plan checks (see migrations.check_query_plans)"""
+    return {
+        'most_recent_candidate_id': (_MOST_RECENT_CANDIDATE_ID, {'email': 'someone@example.com'}),
+        'candidate_ids_for_email': (_CANDIDATE_IDS_FOR_EMAIL, {'email': 'someone@example.com'}),
+        'locked_attempt_count': (_LOCKED_ATTEMPT_COUNT, {'email': 'someone@example.com'}),
+        'taken_sets': (_TAKEN_SETS, {'candidate_ids': [1, 2]}),
+        'question_set': (_QUESTION_SET, {'set_number': 1}),
+        'question_set_version': (_QUESTION_SET_VERSION, {'set_number': 1}),
+        'attempt_state': (_ATTEMPT_STATE, {'candidate_id': 1, 'set_number': 1, 'question_ids': [1, 2]}),
+        'next_history_attempt': (_NEXT_HISTORY_ATTEMPT, {'candidate_id': 1}),
+        'next_score_attempt': (_NEXT_SCORE_ATTEMPT, {'candidate_id': 1}),
+        'scores_by_set': (
+            select(Score.score_id).where(Score.set_number == bindparam('set_number')).
+            order_by(Score.submitted_at.desc(), Score.score_id.desc()).limit(50),
+            {'set_number': 1}
+        ),
+        'answers_by_score': (select(Answer.answer_id).where(Answer.score_id == bindparam('score_id')), {'score_id': 1}),
+        'answers_by_question': (
+            select(Answer.answer_id).
+            where(Answer.question_id == bindparam('question_id'), Answer.answer_id > bindparam('after_id')).
+            order_by(Answer.answer_id).limit(5000),
+            {'question_id': 1, 'after_id': 0}
+        ),
+        'scores_by_category': (
+            select(ScoreCategory.score_id).
+            where(ScoreCategory.category == bindparam('category'), ScoreCategory.percent >= bindparam('percent')).
+            order_by(ScoreCategory.percent.desc(), ScoreCategory.score_id.desc()).limit(50),
+            {'category': 'Logical Reasoning', 'percent': 50}
+        ),
+        'item_stat_deltas_by_set': (
+            select(ItemStatDelta.delta_id).where(ItemStatDelta.set_number.in_(bindparam('set_numbers', expanding=True))).
+            order_by(ItemStatDelta.delta_id).limit(5000),
+            {'set_numbers': [1]}
+        ),
+        'item_stats_by_set': (
+            select(ItemStat.correct).where(ItemStat.set_number == bindparam('set_number')),
+            {'set_number': 1}
+        ),
+        'proctoring_by_candidate': (
+            select(ProctoringSummary.switch_count).
+            where(ProctoringSummary.candidate_id.in_(bindparam('candidate_ids', expanding=True))),
+            {'candidate_ids': [1, 2]}
+        ),
+    }
+
+
+# ---------- ADMIN APP ----------
+def score_overview(db_session, emails=None):
+    """Build the per-email attempt view consumed by scores.html.
+
+    Uses a fixed number of queries regardless of table size: one grouped
+    query for the per-email candidate summary, one joined query for the
+    scores and IN-batched fetches of proctoring summaries and category
+    sub-scores. Pass
+    normalized emails to restrict the view to one page of candidates.
+    """
+    # One row per email: first candidate record (id + name) and attempt count
+    email_groups = db_session.query(
+        Candidate.email_normalized.label('email_key'),
+        func.min(Candidate.id).label('first_id'),
+        func.count(Candidate.id).label('total_attempts')
+    )
+    if emails is not None:
+        email_groups = email_groups.filter(Candidate.email_normalized.in_(emails))
+    email_groups = email_groups.group_by(Candidate.email_normalized).subquery()
+    groups = db_session.query(email_groups, Candidate.full_name, Candidate.email).\
+        join(Candidate, Candidate.id == email_groups.c.first_id).\
+        order_by(email_groups.c.first_id).all()
+
+    candidates = {}
+    for group in groups:
+        candidates[group.email_key] = {
+            'candidate_id': group.first_id,
+            'full_name': group.full_name,
+            'email': group.email,
+            'total_attempts': group.total_attempts,
+            'attempts': []
+        }
+
+    scores = db_session.query(Score, Candidate.email_normalized).\
+        join(Candidate, Score.candidate_id == Candidate.id)
+    if emails is not None:
+        scores = scores.filter(Candidate.email_normalized.in_(emails))
+    scores = scores.order_by(Candidate.email_normalized, Score.submitted_at).all()
+
+    # One precomputed proctoring summary per attempt, fetched in batches.
+    # Each registration is its own candidate row, so summaries are matched on
+    # candidate_id (their attempt_number is the per-email attempt, not Score's).
+    summaries = {}
+    candidate_ids = sorted({score.Score.candidate_id for score in scores})
+    for start in range(0, len(candidate_ids), EVENT_BATCH_SIZE):
+        batch = candidate_ids[start:start + EVENT_BATCH_SIZE]
+        for summary in db_session.query(ProctoringSummary).filter(ProctoringSummary.candidate_id.in_(batch)):
+            summaries.setdefault(summary.candidate_id, []).append(summary)
+
+    categories = score_categories(db_session, [score.Score.score_id for score in scores])
+
+    for score, email_key in scores:
+        if email_key not in candidates:
+            continue
+        proctoring = summaries.get(score.candidate_id, [])
+        candidates[email_key]['attempts'].append({
+            'score_id': score.score_id,
+            'attempt_number': score.attempt_number,
+            'total_questions': score.total_questions,
+            'correct_answers': score.correct_answers,
+            'score_percent': score.score_percent,
+            'submitted_at': score.submitted_at,
+            'tab_switch_count': sum(summary.switch_count for summary in proctoring),
+            'time_away_seconds': sum(summary.total_away_seconds for summary in proctoring),
+            'longest_absence_seconds': max((summary.longest_absence_seconds for summary in proctoring), default=0),
+            'categories': categories.get(score.score_id, [])
+        })
+
+    # Renumber attempts per email in submission order
+    for email_key in candidates:
+        attempts = candidates[email_key]['attempts']
+        attempts.sort(key=lambda x: (x['submitted_at'] is None, x['submitted_at'] or datetime.min))
+        for i, attempt in enumerate(attempts, start=1):
+            attempt['attempt_number'] = i
+    return list(candidates.values())
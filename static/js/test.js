@@ -8,7 +8,8 @@ document.addEventListener('DOMContentLoaded', function() {
     const retryWebcam = document.getElementById('retryWebcam');
     const testContainer = document.getElementById('testContainer');
     const videoElement = document.getElementById('test-video');
-    let timeLeft = (window.TEST_DURATION || 30) * 60;
+    // Seconds left on the server's deadline, so a reload does not restart the clock
+    let timeLeft = Number.isInteger(window.TIME_LEFT) ? window.TIME_LEFT : (window.TEST_DURATION || 30) * 60;
     let isSubmitted = false;
     let timerInterval;
     let stream;
@@ -16,68 +17,164 @@ document.addEventListener('DOMContentLoaded', function() {
     let recordedChunks = [];
     let videoUploadPromise = null;
 
+    // Proctoring events are batched: sent every EVENT_FLUSH_MS, when
+    // EVENT_BATCH_SIZE are waiting, or with sendBeacon when the page goes away.
+    const EVENT_FLUSH_MS = 5000;
+    const EVENT_BATCH_SIZE = 20;
     let tabSwitchCount = 0;
+    let pendingEvents = [];
+
+    function flushEvents(useBeacon) {
+        if (pendingEvents.length === 0) return;
+        const body = JSON.stringify({ events: pendingEvents });
+        pendingEvents = [];
+        if (useBeacon && navigator.sendBeacon) {
+            navigator.sendBeacon('/tab-switch', new Blob([body], { type: 'application/json' }));
+            return;
+        }
+        fetch('/tab-switch', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: body,
+            keepalive: true
+        }).catch(error => console.error('Error sending tab switch events:', error));
+    }
+
     document.addEventListener('visibilitychange', function() {
-        if (document.hidden) {
-            tabSwitchCount++;
-            fetch('/tab-switch', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify({ count: tabSwitchCount, timestamp: new Date().toISOString() })
-            });
+        if (document.hidden) tabSwitchCount++;
+        pendingEvents.push({
+            event_type: document.hidden ? 'tab_switch_out' : 'tab_switch_in',
+            timestamp: new Date().toISOString()
+        });
+        if (document.hidden || pendingEvents.length >= EVENT_BATCH_SIZE) {
+            // The tab may never come back, so don't wait for the timer
+            flushEvents(document.hidden);
         }
     });
+    setInterval(() => flushEvents(false), EVENT_FLUSH_MS);
+    window.addEventListener('pagehide', () => flushEvents(true));
+
+    // Chunked video upload: MediaRecorder hands over a slice every
+    // VIDEO_TIMESLICE_MS and each slice is posted in order while the test runs,
+    // so only the last few seconds remain to be sent when the test ends.
+    const VIDEO_TIMESLICE_MS = 5000;
+    const CHUNK_RETRIES = 5;
+    // Longest a submission waits for the last slices; the server seals the
+    // recording on submission and its upload queue finishes it either way
+    const UPLOAD_WAIT_MS = 5000;
+    let uploadToken = null;
+    let nextSequence = 0;
+    let uploadQueue = Promise.resolve();
+
+    function wait(ms) {
+        return new Promise(resolve => setTimeout(resolve, ms));
+    }
+
+    async function sendChunk(blob, sequence) {
+        for (let attempt = 0; attempt <= CHUNK_RETRIES; attempt++) {
+            try {
+                const response = await fetch(`/upload-video/chunk?token=${uploadToken}&sequence=${sequence}`, {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/octet-stream' },
+                    body: blob
+                });
+                if (response.ok) return true;
+                if (response.status === 409) {
+                    // Server is missing an earlier slice; nothing more we can resend
+                    const data = await response.json();
+                    console.error('Video chunk out of order, server expects', data.next_sequence);
+                    return false;
+                }
+            } catch (error) {
+                console.error('Error uploading video chunk:', error);
+            }
+            await wait(Math.min(1000 * 2 ** attempt, 15000));
+        }
+        return false;
+    }
+
+    function enqueue(task) {
+        uploadQueue = uploadQueue.then(task).catch(error => {
+            console.error('Error uploading video to S3:', error);
+            return null;
+        });
+        return uploadQueue;
+    }
+
+    // Fallback for when the chunked endpoints are unavailable: one upload at the end
+    function uploadWholeRecording(chunks) {
+        const blob = new Blob(chunks, { type: 'video/webm' });
+        const formData = new FormData();
+        formData.append('video', blob, `candidate${window.CANDIDATE_ID}attempt${window.ATTEMPT_NUMBER}.webm`);
+        formData.append('candidate_id', window.CANDIDATE_ID);
+        return fetch('/upload-video', {
+            method: 'POST',
+            body: formData
+        }).then(response => response.json()).then(data => {
+            console.log('Video upload response:', data.message);
+            return data;
+        });
+    }
 
     // Start MediaRecorder
-    function startRecording() {
+    async function startRecording() {
         if (MediaRecorder.isTypeSupported('video/webm')) {
+            try {
+                const response = await fetch('/upload-video/start', { method: 'POST' });
+                if (response.ok) {
+                    uploadToken = (await response.json()).upload_token;
+                }
+            } catch (error) {
+                console.error('Error starting chunked video upload:', error);
+            }
             mediaRecorder = new MediaRecorder(stream, { mimeType: 'video/webm' });
             recordedChunks = [];
             mediaRecorder.ondataavailable = (event) => {
-                if (event.data.size > 0) {
+                if (event.data.size === 0) return;
+                if (uploadToken) {
+                    const sequence = nextSequence++;
+                    enqueue(() => sendChunk(event.data, sequence));
+                } else {
                     recordedChunks.push(event.data);
                 }
             };
-            mediaRecorder.onstop = async () => {
-                const blob = new Blob(recordedChunks, { type: 'video/webm' });
-                const formData = new FormData();
-                formData.append('video', blob, `candidate${window.CANDIDATE_ID}attempt${window.ATTEMPT_NUMBER}.webm`);
-                formData.append('candidate_id', window.CANDIDATE_ID);
-                try {
-                    videoUploadPromise = fetch('/upload-video', {
-                        method: 'POST',
-                        body: formData
-                    }).then(response => response.json()).then(data => {
-                        console.log('Video upload response:', data.message);
-                        return data;
-                    }).catch(error => {
-                        console.error('Error uploading video to S3:', error);
-                        return null;
-                    });
-                    await videoUploadPromise;
-                } catch (error) {
-                    console.error('Error uploading video to S3:', error);
-                }
+            mediaRecorder.onstop = () => {
+                // ondataavailable for the final slice fires before onstop
+                enqueue(() => {
+                    if (!uploadToken) return uploadWholeRecording(recordedChunks);
+                    return fetch('/upload-video/complete', { method: 'POST', keepalive: true }).
+                        then(response => response.json()).
+                        then(data => {
+                            console.log('Video upload response:', data.message);
+                            return data;
+                        });
+                });
+                resolveRecordingStopped();
             };
-            mediaRecorder.start();
+            mediaRecorder.start(VIDEO_TIMESLICE_MS);
             console.log('Video recording started');
         } else {
             console.error('MediaRecorder: video/webm not supported');
         }
     }
 
-    // Stop MediaRecorder and webcam
+    let resolveRecordingStopped;
+    const recordingStopped = new Promise(resolve => { resolveRecordingStopped = resolve; });
+
+    // Stop MediaRecorder and webcam; returns a promise for the finished upload
     function stopAll() {
         if (mediaRecorder && mediaRecorder.state !== 'inactive') {
             mediaRecorder.stop();
+            videoUploadPromise = recordingStopped.then(() => uploadQueue);
         }
         if (stream) {
             stream.getTracks().forEach(track => track.stop());
             stream = null;
         }
         videoElement.srcObject = null;
+        return videoUploadPromise;
     }
 
     // Start webcam and recording
@@ -114,8 +211,7 @@ document.addEventListener('DOMContentLoaded', function() {
             form.classList.add('form-disabled');
             submitBtn.disabled = true;
             submittedOverlay.style.display = 'flex';
-            stopAll();
-            setTimeout(() => form.submit(), 3000);
+            Promise.race([stopAll(), wait(UPLOAD_WAIT_MS)]).then(() => form.submit());
         } else if (!isSubmitted) {
             timeLeft--;
             timerInterval = setTimeout(updateTimer, 1000);
@@ -166,16 +262,17 @@ document.addEventListener('DOMContentLoaded', function() {
         input.addEventListener('change', updateAttendedInput);
     });
 
-    // Intercept form submission to wait for video upload
+    // Intercept form submission to give the video upload a bounded head start
     form.addEventListener('submit', async function(e) {
         updateAttendedInput();
+        flushEvents(true);
         if (!isSubmitted) {
             isSubmitted = true;
             submittedOverlay.style.display = 'flex';
             stopAll();
             if (videoUploadPromise) {
                 e.preventDefault();
-                await videoUploadPromise;
+                await Promise.race([videoUploadPromise, wait(UPLOAD_WAIT_MS)]);
                 form.submit();
             }
         }
@@ -0,0 +1,89 @@
+import os
+import sys
+from collections import namedtuple
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models import Answer, Base, Candidate, Question, Score
+
+SeededAttempt = namedtuple('SeededAttempt', ['score_id', 'question_ids', 'candidate_id'])
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """A file-backed SQLite database with every table created from the models"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def Session(engine):
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def seed_attempt(Session):
+    """Factory for one graded attempt: seed_attempt('AB', keys='AC') answers A and B to questions keyed A and C.
+
+    New questions (one per key) are created unless question_ids are given;
+    keys is the answer key the attempt was graded with either way. A new
+    candidate is registered unless candidate_id is given. Blank selections
+    are stored as NULL.
+    """
+    def seed(selected, keys=None, question_ids=None, candidate_id=None, set_number=1, attempt_number=1,
+             category='Logical Reasoning'):
+        keys = keys or 'A' * len(selected)
+        now = datetime.now()
+        with Session() as db_session:
+            if question_ids is None:
+                questions = [Question(set_number=set_number, category=category, question_text=f'Question {i}',
+                                      option_a='a', option_b='b', option_c='c', option_d='d', correct_option=key)
+                             for i, key in enumerate(keys)]
+                db_session.add_all(questions)
+                db_session.flush()
+                question_ids = [question.question_id for question in questions]
+            if candidate_id is None:
+                candidate = Candidate(full_name='Test', email='t@example.com', email_normalized='t@example.com',
+                                      phone='9999999999', position='Engineer', submitted_at=now)
+                db_session.add(candidate)
+                db_session.flush()
+                candidate_id = candidate.id
+            correct = [bool(option) and option == key for option, key in zip(selected, keys)]
+            score = Score(candidate_id=candidate_id, attempt_number=attempt_number, total_questions=len(selected),
+                          correct_answers=sum(correct), score_percent=round(sum(correct) * 100 / len(selected), 2),
+                          submitted_at=now, set_number=set_number, attempt_fingerprint=f'f{attempt_number}')
+            db_session.add(score)
+            db_session.flush()
+            db_session.add_all(Answer(candidate_id=candidate_id, question_id=question_id,
+                                      selected_option=option.strip() or None, is_correct=is_correct,
+                                      answered_at=now, score_id=score.score_id)
+                               for question_id, option, is_correct in zip(question_ids, selected, correct))
+            db_session.commit()
+            return SeededAttempt(score.score_id, list(question_ids), candidate_id)
+    return seed
+
+
+@pytest.fixture(scope='module')
+def candidate_app(tmp_path_factory):
+    """The candidate app (app.py) bound to a fresh SQLite database, imported for this module only"""
+    directory = tmp_path_factory.mktemp('candidate_app')
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv('DATABASE_URL', f"sqlite:///{directory / 'app.db'}")
+        patch.setenv('SCHEMA_CHECK_ON_STARTUP', '0')
+        patch.setenv('VIDEO_SPOOL_DIR', str(directory / 'spool'))
+        patch.setenv('S3_REGION', 'us-east-1')
+        # app binds its engine at import; undoing this drops the module again for later tests
+        patch.delitem(sys.modules, 'app', raising=False)
+        import app
+        app.app.config['TESTING'] = True
+        Base.metadata.create_all(app.engine)
+        yield app
+        app.engine.dispose()
@@ -0,0 +1,50 @@
+"""The admin score listing runs the same number of statements whatever the size of the data."""
+import sys
+
+import pytest
+from sqlalchemy import event
+
+SCALES = (3000, 15000)  # answers rows; both fill more than one listing page
+LISTINGS = ('/view_scores', '/view_scores?city=Pune&min_score=50')
+
+
+@pytest.fixture(scope='module')
+def admin(tmp_path_factory):
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv('DATABASE_URL', f"sqlite:///{tmp_path_factory.mktemp('admin') / 'admin.db'}")
+        # admin binds its engine at import; undoing this drops the module again for later tests
+        patch.delitem(sys.modules, 'admin', raising=False)
+        import admin
+        admin.app.config['TESTING'] = True
+        yield admin
+        admin.engine.dispose()
+
+
+def listing_statements(admin, url):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    client = admin.app.test_client()
+    with client.session_transaction() as session:
+        session['admin_logged_in'] = True
+    event.listen(admin.engine, 'before_cursor_execute', count)
+    try:
+        response = client.get(url)
+        response.get_data()
+    finally:
+        event.remove(admin.engine, 'before_cursor_execute', count)
+    assert response.status_code == 200
+    return len(statements)
+
+
+@pytest.mark.parametrize('url', LISTINGS)
+def test_listing_statement_count_does_not_grow_with_data(admin, url):
+    from benchmarks import synthetic_data
+
+    counts = []
+    for answers in SCALES:
+        synthetic_data.generate(admin.engine, answers)
+        admin.question_cache.invalidate()
+        counts.append(listing_statements(admin, url))
+    assert counts[0] == counts[1], f"{url}: {counts[0]} statements at {SCALES[0]} answers, {counts[1]} at {SCALES[1]}"
@@ -0,0 +1,51 @@
+"""Cached answer reviews after a re-grade that keeps the total unchanged."""
+import regrade
+import repository
+from attempt_details import AttemptDetailCache
+from models import Question
+from question_cache import QuestionCache
+
+
+def test_regrade_that_swaps_flags_is_not_served_from_cache(engine, Session, seed_attempt):
+    # First answer right, second wrong
+    score_id, question_ids, _ = seed_attempt('AA', keys='AB')
+
+    def load(set_number):
+        with Session() as db_session:
+            return repository.load_question_set(db_session, set_number)
+    cache = AttemptDetailCache(QuestionCache(load, ttl_seconds=300))
+    with Session() as db_session:
+        _, answers = cache.get(db_session, score_id)
+    assert [answer.is_correct for answer in answers] == [True, False]
+
+    # Swap the key: the right answer becomes wrong and the wrong one right, same total
+    regrade.regrade(engine, question_id=question_ids[0], correct_option='B', settle_seconds=0)
+    regrade.regrade(engine, question_id=question_ids[1], correct_option='A', settle_seconds=0)
+
+    with Session() as db_session:
+        score, answers = cache.get(db_session, score_id)
+    assert score['correct_answers'] == 1
+    assert [answer.is_correct for answer in answers] == [False, True]
+    assert [answer.correct_option for answer in answers] == ['B', 'A']
+    assert cache.stats()['misses'] == 2
+
+
+def test_question_text_cached_before_an_edit_is_not_served(Session, seed_attempt):
+    score_id, question_ids, _ = seed_attempt('AA', keys='AB')
+
+    def load(set_number):
+        with Session() as db_session:
+            return repository.load_question_set(db_session, set_number)
+    question_cache = QuestionCache(load, ttl_seconds=300)
+    question_cache.get(1)  # Warmed by the test pages before the reviewer opens the attempt
+
+    # Another process edits a question and bumps the set version
+    with Session() as db_session:
+        db_session.get(Question, question_ids[0]).question_text = 'Edited'
+        repository.bump_question_set_versions(db_session, [1])
+        db_session.commit()
+
+    cache = AttemptDetailCache(question_cache)
+    with Session() as db_session:
+        _, answers = cache.get(db_session, score_id)
+    assert [answer.question_text for answer in answers] == ['Edited', 'Question 1']
@@ -0,0 +1,79 @@
+"""The candidate app enforces the test deadline on submission, whatever the browser's timer says."""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from attempt_sessions import AttemptSessionCache
+import models
+from models import Candidate, Question, Score
+
+DURATION = timedelta(minutes=15)
+GRACE = timedelta(seconds=120)
+
+
+@pytest.fixture
+def candidate(candidate_app, monkeypatch):
+    """A registered candidate with set 1 loaded, and a cold attempt cache"""
+    monkeypatch.setattr(candidate_app, 'attempt_sessions',
+                        AttemptSessionCache(DURATION.total_seconds(), grace_seconds=GRACE.total_seconds()))
+    candidate_app.question_cache.invalidate()
+    with candidate_app.Session() as db_session:
+        if not db_session.query(Question).filter(Question.set_number == 1).count():
+            db_session.add_all(Question(set_number=1, category='Logical Reasoning', question_text=f'Question {i}',
+                                        option_a='a', option_b='b', option_c='c', option_d='d', correct_option='A')
+                               for i in range(3))
+        candidate = Candidate(full_name='Test', email='t@example.com', email_normalized='t@example.com',
+                              phone='9999999999', position='Engineer', submitted_at=datetime.now())
+        db_session.add(candidate)
+        db_session.commit()
+        return candidate.id
+
+
+def start_attempt(candidate_app, candidate_id, started_at):
+    """The test_history rows GET /test writes when it serves the set"""
+    with candidate_app.engine.begin() as connection:
+        connection.execute(insert(models.TestHistory), [
+            {'candidate_id': candidate_id, 'question_id': question.question_id, 'attempt_number': 1,
+             'assigned_at': started_at}
+            for question in candidate_app.question_cache.get(1)
+        ])
+
+
+def submit(candidate_app, candidate_id):
+    client = candidate_app.app.test_client()
+    with client.session_transaction() as session:
+        session['candidate_id'] = candidate_id
+        session['attempt_number'] = 1
+    form = {'current_set': 1, **{f'q_{question.question_id}': 'A' for question in candidate_app.question_cache.get(1)}}
+    response = client.post('/test', data=form)
+    with candidate_app.Session() as db_session:
+        graded = db_session.query(Score).filter(Score.candidate_id == candidate_id).count()
+    return response, graded
+
+
+@pytest.mark.parametrize('elapsed', [timedelta(minutes=1), DURATION + GRACE / 2], ids=['on time', 'in grace'])
+def test_submission_before_the_grace_period_ends_is_graded(candidate_app, candidate, elapsed):
+    start_attempt(candidate_app, candidate, datetime.now() - elapsed)
+
+    response, graded = submit(candidate_app, candidate)
+
+    assert response.headers['Location'].endswith('/completed')
+    assert graded == 1
+
+
+def test_submission_after_the_grace_period_is_rejected(candidate_app, candidate):
+    start_attempt(candidate_app, candidate, datetime.now() - DURATION - GRACE - timedelta(minutes=1))
+
+    response, graded = submit(candidate_app, candidate)
+
+    assert response.headers['Location'].endswith('/completed')
+    assert graded == 0
+    assert candidate_app.attempt_sessions.stats()['late_submissions'] == 1
+
+
+def test_submission_without_a_recorded_start_is_rejected(candidate_app, candidate):
+    response, graded = submit(candidate_app, candidate)
+
+    assert response.headers['Location'].endswith('/test')
+    assert graded == 0
@@ -0,0 +1,34 @@
+"""The exam flow load test reads its numbers from the app's Server-Timing header."""
+from flask import Flask
+from sqlalchemy import create_engine, text
+
+from benchmarks import exam_flow
+from instrumentation import RequestMetrics
+
+
+def test_recorder_parses_server_timing_from_request_metrics():
+    app = Flask(__name__)
+    engine = create_engine('sqlite://')
+    RequestMetrics(app, engine)
+
+    @app.route('/')
+    def index():
+        with engine.connect() as connection:
+            connection.execute(text('SELECT 1'))
+            connection.execute(text('SELECT 2'))
+        return 'ok'
+
+    recorder = exam_flow.Recorder()
+    exam_flow.timed(recorder, 'index', app.test_client().get, {200})
+    (elapsed, server, statements, ok), = recorder.samples['index']
+    assert statements == 2 and ok
+    assert server is not None and 0 <= server <= elapsed
+
+
+def test_summarize_reports_percentiles_and_errors():
+    samples = [(i / 1000, None, 3, i != 100) for i in range(1, 101)]
+    summary = exam_flow.summarize(samples)
+    assert summary == {'requests': 100, 'errors': 1, 'p50_ms': 50.5, 'p95_ms': 95.05, 'p99_ms': 99.01,
+                       'max_ms': 100.0, 'server_mean_ms': None, 'statements_per_request': 3}
+    assert exam_flow.percentile([0.25], 0.99) == 0.25
+    assert exam_flow.percentile([], 0.5) is None
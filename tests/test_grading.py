@@ -0,0 +1,81 @@
+"""The vectorized grading engine agrees with the per-answer loop it replaced."""
+import random
+
+import pytest
+
+import grading
+from question_cache import CachedQuestion
+
+CATEGORIES = ['Logical Reasoning', 'Analytical Thinking', 'English Proficiency']
+# Blank, whitespace-only, lowercase and out-of-range values all occur in stored answers
+OPTIONS = ['A', 'B', 'C', 'D', '', ' ', 'a', 'E', 'AB', '?', ' B ']
+
+
+def loop_grade(questions, answers):
+    """The pre-change rule of save_test_results, one question at a time"""
+    correct_answers = 0
+    categories = {}
+    is_correct = []
+    for question in questions:
+        user_answer = answers.get(question.question_id, "").strip()
+        correct = bool(user_answer) and user_answer == question.correct_option
+        is_correct.append(correct)
+        correct_answers += correct
+        right, total = categories.get(question.category, (0, 0))
+        categories[question.category] = (right + correct, total + 1)
+    total = len(questions)
+    return is_correct, correct_answers, (correct_answers / total * 100) if total > 0 else 0, categories
+
+
+@pytest.fixture
+def questions():
+    rng = random.Random(7)
+    return [CachedQuestion(i, CATEGORIES[i % len(CATEGORIES)], f'q{i}', 'a', 'b', 'c', 'd', rng.choice('ABCD'))
+            for i in range(1, 31)]
+
+
+@pytest.fixture
+def submissions(questions):
+    rng = random.Random(11)
+    submissions = []
+    for _ in range(300):
+        answers = {question.question_id: rng.choice(OPTIONS) for question in questions if rng.random() < 0.9}
+        answers[999] = 'A'  # A question outside the set is ignored
+        submissions.append(answers)
+    return submissions
+
+
+def test_grade_matches_the_loop(questions, submissions):
+    key = grading.AnswerKey(questions)
+    # save_test_results strips each answer before encoding
+    stripped = [{question_id: option.strip() for question_id, option in answers.items()} for answers in submissions]
+    result = grading.grade(key, key.selections(stripped))
+
+    for row, answers in enumerate(submissions):
+        is_correct, correct_answers, percent, categories = loop_grade(questions, answers)
+        assert result.is_correct[row].tolist() == is_correct
+        assert int(result.correct_counts[row]) == correct_answers
+        assert float(result.score_percent[row]) == pytest.approx(percent)
+        assert grading.category_scores(key, result, row) == categories
+
+
+def test_column_input_matches_dict_input(questions, submissions):
+    key = grading.AnswerKey(questions)
+    stripped = [{question_id: option.strip() for question_id, option in answers.items()} for answers in submissions]
+    rows = [(row, question_id, option) for row, answers in enumerate(stripped) for question_id, option in answers.items()]
+    attempt_rows, question_ids, options = zip(*rows)
+
+    from_columns = key.selections_from_columns(len(stripped), attempt_rows, question_ids, options)
+
+    assert (from_columns == key.selections(stripped)).all()
+
+
+def test_grade_answers_matches_the_loop(questions):
+    key = grading.AnswerKey(questions)
+    pairs = [(question.question_id, option.strip()) for question in questions for option in OPTIONS]
+
+    graded = grading.grade_answers(key, [question_id for question_id, _ in pairs], [option for _, option in pairs])
+
+    by_id = {question.question_id: question for question in questions}
+    expected = [bool(option) and option == by_id[question_id].correct_option for question_id, option in pairs]
+    assert graded.tolist() == expected
@@ -0,0 +1,84 @@
+"""Request metrics: Server-Timing, per-endpoint totals and the N+1 detector."""
+import logging
+import re
+
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, text
+
+from instrumentation import RequestMetrics, statement_shape
+
+
+def make_app(**options):
+    app = Flask(__name__)
+    engine = create_engine('sqlite://')
+    metrics = RequestMetrics(app, engine, **options)
+
+    @app.route('/queries/<int:count>')
+    def queries(count):
+        with engine.connect() as connection:
+            for i in range(count):
+                connection.execute(text('SELECT :value'), {'value': i})
+        return 'ok'
+
+    @app.route('/fails')
+    def fails():
+        raise RuntimeError('boom')
+    return app, engine, metrics
+
+
+def test_server_timing_reports_statements_of_the_request():
+    app, engine, metrics = make_app()
+    with engine.connect() as connection:
+        connection.execute(text('SELECT 1'))  # Outside a request: not counted
+
+    response = app.test_client().get('/queries/3')
+    timing = response.headers['Server-Timing']
+    assert re.fullmatch(r'app;dur=[\d.]+, db;dur=[\d.]+;desc="3 statements"', timing)
+    totals = metrics.snapshot()['queries']
+    assert (totals['requests'], totals['errors'], totals['statements'], totals['bytes']) == (1, 0, 3, 2)
+
+
+def test_server_timing_can_be_turned_off():
+    app, _, _ = make_app(server_timing=False)
+    assert 'Server-Timing' not in app.test_client().get('/queries/1').headers
+
+
+def test_failed_request_is_counted_as_an_error():
+    app, _, metrics = make_app()
+    app.config['PROPAGATE_EXCEPTIONS'] = False
+    assert app.test_client().get('/fails').status_code == 500
+    assert metrics.snapshot()['fails']['errors'] == 1
+    rendered = metrics.render({'db_pool_size': 5})
+    assert 'assessment_request_errors_total{endpoint="fails"} 1' in rendered
+    assert 'assessment_db_pool_size 5' in rendered
+
+
+def test_n_plus_one_detector_warns_above_threshold(caplog):
+    app, _, metrics = make_app(n_plus_one_threshold=5)
+    client = app.test_client()
+    with caplog.at_level(logging.WARNING, logger='instrumentation'):
+        client.get('/queries/5')
+        assert metrics.n_plus_one_warnings == 0
+        client.get('/queries/6')
+    assert metrics.n_plus_one_warnings == 1
+    assert [record.endpoint for record in caplog.records] == ['queries']
+    assert 'assessment_n_plus_one_warnings_total 1' in metrics.render()
+
+
+@pytest.mark.parametrize('statement', [
+    'SELECT * FROM answers WHERE score_id IN (?, ?, ?)',
+    'SELECT * FROM answers\n WHERE score_id IN (%s,%s)',
+    'SELECT * FROM answers WHERE score_id IN (:id_1, :id_2, :id_3, :id_4)',
+])
+def test_statement_shape_collapses_in_lists(statement):
+    assert statement_shape(statement) == 'SELECT * FROM answers WHERE score_id IN (?)'
+
+
+def test_metrics_endpoint_requires_the_token_when_set(candidate_app, monkeypatch):
+    monkeypatch.setattr(candidate_app, 'METRICS_TOKEN', 'secret')
+    client = candidate_app.app.test_client()
+    assert client.get('/metrics').status_code == 403
+    response = client.get('/metrics', headers={'Authorization': 'Bearer secret'})
+    assert response.status_code == 200
+    assert 'assessment_requests_total' in response.get_data(as_text=True)
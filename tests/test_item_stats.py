@@ -0,0 +1,78 @@
+"""Running item statistics: appended deltas folded into item_stats agree with a rebuild from answers."""
+import pytest
+from sqlalchemy import func, select
+
+import item_stats
+from models import Answer, ItemStat, ItemStatDelta
+
+KEYS = 'ABCD'
+SUBMISSIONS = ['ABCD', 'ABCA', 'A CD', 'BBDD', 'CACD', '    ', 'ABDD', 'DBCC', 'AB D', 'ACCD']
+
+
+def snapshot(Session):
+    with Session() as db_session:
+        stats = db_session.query(ItemStat).order_by(ItemStat.question_id).all()
+        return [({column: getattr(stat, column) for column in item_stats.SUM_COLUMNS},
+                 item_stats.point_biserial(stat)) for stat in stats]
+
+
+def record(Session, question_ids, submission):
+    """What save_test_results does for a graded submission"""
+    selected = [option.strip() or None for option in submission]
+    with Session() as db_session:
+        item_stats.record_attempt(db_session, 1, [
+            (question_id, option, option == key) for question_id, option, key in zip(question_ids, selected, KEYS)
+        ], sum(option == key for option, key in zip(selected, KEYS)))
+        db_session.commit()
+
+
+@pytest.fixture
+def graded_set(Session, seed_attempt):
+    """Ten attempts at a four-question set, each recorded as it is submitted"""
+    question_ids = None
+    for submission in SUBMISSIONS:
+        attempt = seed_attempt(submission, keys=KEYS, question_ids=question_ids)
+        question_ids = attempt.question_ids
+        record(Session, question_ids, submission)
+    return question_ids
+
+
+def test_folded_deltas_match_rebuild(engine, Session, graded_set):
+    with Session() as db_session:
+        assert db_session.query(ItemStat).count() == 0  # Submissions only append deltas
+        assert db_session.query(ItemStatDelta).count() == len(SUBMISSIONS) * len(KEYS)
+
+    assert item_stats.fold(engine, batch_size=7) == len(SUBMISSIONS) * len(KEYS)
+    folded = snapshot(Session)
+    with engine.begin() as connection:
+        item_stats.rebuild(connection, [1])
+    rebuilt = snapshot(Session)
+
+    assert [sums for sums, _ in folded] == [sums for sums, _ in rebuilt]
+    for (_, folded_r), (_, rebuilt_r) in zip(folded, rebuilt):
+        assert folded_r == pytest.approx(rebuilt_r)
+    assert any(r is not None for _, r in rebuilt)
+
+
+def test_replaced_attempt_is_subtracted(engine, Session, graded_set):
+    item_stats.fold(engine)
+    with Session() as db_session:
+        first_candidate = db_session.scalars(select(func.min(Answer.candidate_id))).one()
+        assert item_stats.remove_previous_attempts(db_session, first_candidate, graded_set) == 1
+        db_session.query(Answer).filter(Answer.candidate_id == first_candidate).delete()
+        db_session.commit()
+    item_stats.fold(engine, [1])
+    folded = snapshot(Session)
+    with engine.begin() as connection:
+        item_stats.rebuild(connection, [1])
+
+    assert [sums for sums, _ in folded] == [sums for sums, _ in snapshot(Session)]
+    assert all(sums['responses'] == len(SUBMISSIONS) - 1 for sums, _ in folded)
+
+
+def test_rebuild_discards_pending_deltas(engine, Session, graded_set):
+    with engine.begin() as connection:
+        item_stats.rebuild(connection, [1])
+    with Session() as db_session:
+        assert db_session.query(ItemStatDelta).count() == 0
+    assert item_stats.fold(engine) == 0
@@ -0,0 +1,29 @@
+"""Migrations bring a database created before the hot-path indexes up to the models."""
+from datetime import datetime
+
+from sqlalchemy import inspect, select, text
+
+import migrations
+from models import Candidate
+
+
+def test_upgrade_adds_normalized_email_and_indexes(engine):
+    # The schema as it was before 0001: no email_normalized column and no indexes on it
+    with engine.begin() as connection:
+        connection.execute(text('DROP INDEX ix_candidates_email_normalized'))
+        connection.execute(text('DROP INDEX ix_candidates_submitted_at'))
+        connection.execute(text('ALTER TABLE candidates DROP COLUMN email_normalized'))
+        connection.execute(text("INSERT INTO candidates (full_name, email, phone, position, submitted_at) "
+                                "VALUES ('Test', '  Mixed.Case@Example.COM ', '9999999999', 'Engineer', :now)"),
+                           {'now': datetime.now()})
+    assert 'email_normalized' not in {column['name'] for column in inspect(engine).get_columns('candidates')}
+
+    applied = migrations.upgrade(engine)
+
+    assert applied == sorted(version for version, _ in migrations.MIGRATIONS)
+    with engine.connect() as connection:
+        assert connection.execute(select(Candidate.email_normalized)).scalar() == 'mixed.case@example.com'
+    indexes = {index['name'] for index in inspect(engine).get_indexes('candidates')}
+    assert {'ix_candidates_email_normalized', 'ix_candidates_submitted_at'} <= indexes
+    assert migrations.upgrade(engine) == []
+    assert all(done for _, done in migrations.status(engine))
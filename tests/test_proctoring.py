@@ -0,0 +1,119 @@
+"""Tab switch ingestion: rate limiting, buffered flushes and per-attempt summaries."""
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+import proctoring
+from models import ProctoringSummary, TabSwitchEvent
+from proctoring import EventBuffer, RateLimiter
+
+START = datetime(2026, 1, 5, 10, 0, 0)
+
+
+def event(candidate_id, event_type, seconds, attempt_number=1):
+    return {'candidate_id': candidate_id, 'attempt_number': attempt_number, 'event_type': event_type,
+            'timestamp': START + timedelta(seconds=seconds)}
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(proctoring.time, 'monotonic', clock)
+    return clock
+
+
+def test_token_bucket_allows_a_burst_then_refills(clock):
+    limiter = RateLimiter(rate_per_second=2, burst=10)
+
+    assert limiter.take('a', 25) == 10
+    assert limiter.take('a') == 0
+    assert limiter.take('b', 3) == 3  # Buckets are per key
+
+    clock.now += 1.5
+    assert limiter.take('a', 25) == 3
+    clock.now += 60
+    assert limiter.take('a', 25) == 10  # Never more than the burst
+
+
+@pytest.fixture
+def buffers():
+    created = []
+    yield created
+    for buffer in created:
+        buffer.flush()
+
+
+def test_buffer_flushes_when_flush_size_events_wait(Session, buffers):
+    buffer = EventBuffer(Session, flush_size=3, flush_interval_ms=60000)
+    buffers.append(buffer)
+
+    buffer.add([event(1, 'tab_switch_out', 0), event(1, 'tab_switch_in', 5)])
+    time.sleep(0.1)
+    assert buffer.stats()['flushed'] == 0
+    buffer.add([event(1, 'tab_switch_out', 10)])
+
+    wait_for(lambda: buffer.stats()['flushed'] == 3)
+    assert buffer.stats()['flushes'] == 1
+    with Session() as db_session:
+        assert db_session.query(TabSwitchEvent).count() == 3
+
+
+def test_buffer_flushes_on_the_interval(Session, buffers):
+    buffer = EventBuffer(Session, flush_size=1000, flush_interval_ms=50)
+    buffers.append(buffer)
+
+    buffer.add([event(1, 'tab_switch_out', 0)])
+
+    wait_for(lambda: buffer.stats()['flushed'] == 1)
+    with Session() as db_session:
+        assert db_session.query(ProctoringSummary).one().switch_count == 1
+
+
+def summaries(Session):
+    with Session() as db_session:
+        return {(s.candidate_id, s.attempt_number): (s.switch_count, s.total_away_seconds,
+                                                     s.longest_absence_seconds, s.last_out_at)
+                for s in db_session.query(ProctoringSummary)}
+
+
+def test_interleaved_batches_match_rebuild(Session):
+    # Candidate 1 is away 0-30s and 40-50s; candidate 2 is away 5-25s. The halves
+    # of each absence reach the database in different batches, some "in" first.
+    batches = [
+        [event(1, 'tab_switch_in', 30), event(2, 'tab_switch_out', 5)],
+        [event(1, 'tab_switch_out', 40)],
+        [event(2, 'tab_switch_in', 25), event(1, 'tab_switch_out', 0)],
+        [event(1, 'tab_switch_in', 50)],
+    ]
+    for rows in batches:
+        # What EventBuffer.flush does for each batch
+        with Session() as db_session:
+            db_session.execute(insert(TabSwitchEvent), rows)
+            proctoring.update_summaries(db_session, rows)
+            db_session.commit()
+    flushed = summaries(Session)
+
+    with Session() as db_session:
+        assert proctoring.rebuild_summaries(db_session, [1, 2]) == 2
+        db_session.commit()
+
+    assert flushed == summaries(Session)
+    assert flushed[(1, 1)] == (2, 40.0, 30.0, None)
+    assert flushed[(2, 1)] == (1, 20.0, 20.0, None)
@@ -0,0 +1,24 @@
+"""Every hot query is served by an index on a migrated database."""
+import pytest
+from sqlalchemy import bindparam, create_engine, select
+
+import migrations
+from models import Candidate
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'plans.db'}")
+    migrations.upgrade(engine)
+    return engine
+
+
+def test_hot_queries_have_no_full_table_scans(engine):
+    assert migrations.check_query_plans(engine) == {}
+
+
+def test_full_scan_is_reported(engine):
+    # The check itself: candidates.phone has no index
+    statement = select(Candidate.id).where(Candidate.phone == bindparam('phone'))
+    with engine.connect() as connection:
+        assert migrations.full_scans(connection, statement, {'phone': '9999999999'}) == ['candidates']
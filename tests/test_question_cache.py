@@ -0,0 +1,85 @@
+"""Question cache invalidation across processes through question_set_versions."""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+import repository
+from models import Base, Question
+from question_cache import QuestionCache
+
+
+@pytest.fixture
+def Session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'questions.db'}")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db_session:
+        db_session.add_all(Question(set_number=1, category='Logical Reasoning', question_text=f'Question {i}',
+                                    option_a='a', option_b='b', option_c='c', option_d='d', correct_option='A')
+                           for i in range(3))
+        db_session.commit()
+    return Session
+
+
+def worker_cache(Session, version_check_seconds):
+    """A QuestionCache as one worker process builds it"""
+    def load(set_number):
+        with Session() as db_session:
+            return repository.load_question_set(db_session, set_number)
+
+    def load_version(set_number):
+        with Session() as db_session:
+            return repository.question_set_version(db_session, set_number)
+    return QuestionCache(load, ttl_seconds=300, version_loader=load_version,
+                         version_check_seconds=version_check_seconds)
+
+
+def test_version_bump_reaches_every_worker(Session):
+    workers = [worker_cache(Session, version_check_seconds=0) for _ in range(2)]
+    assert all(cache.get(1)[0].correct_option == 'A' for cache in workers)
+
+    with Session() as db_session:
+        db_session.query(Question).filter(Question.set_number == 1).update({'correct_option': 'B'})
+        repository.bump_question_set_versions(db_session, [1])
+        db_session.commit()
+
+    assert all(cache.get(1)[0].correct_option == 'B' for cache in workers)
+    assert all(cache.stats()['stale_versions'] == 1 for cache in workers)
+
+
+def test_version_is_checked_at_most_once_per_interval(Session):
+    cache = worker_cache(Session, version_check_seconds=60)
+    cache.get(1)
+    with Session() as db_session:
+        repository.bump_question_set_versions(db_session, None)
+        db_session.commit()
+    cache.get(1)
+    assert cache.stats()['misses'] == 1
+
+
+def test_failed_version_check_serves_the_cached_set(Session, caplog):
+    cache = worker_cache(Session, version_check_seconds=0)
+    questions = cache.get(1)
+    failures = []
+
+    def failing_version(set_number):
+        failures.append(set_number)
+        raise OperationalError('SELECT version', {}, Exception('server has gone away'))
+    cache._version_loader = failing_version
+
+    assert cache.get(1) == questions
+    assert failures == [1]
+    assert cache.stats()['version_errors'] == 1
+    assert cache.stats()['misses'] == 1
+    assert 'Version check failed for question set 1' in caplog.text
+
+
+def test_failed_version_check_without_an_entry_loads_the_set(Session):
+    cache = worker_cache(Session, version_check_seconds=0)
+
+    def failing_version(set_number):
+        raise OperationalError('SELECT version', {}, Exception('server has gone away'))
+    cache._version_loader = failing_version
+
+    assert len(cache.get(1)) == 3
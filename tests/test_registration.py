@@ -0,0 +1,79 @@
+"""Per-email attempt cap and deadlock retry of candidate registration."""
+import pytest
+from sqlalchemy.dialects import mysql
+from sqlalchemy.exc import OperationalError
+
+import repository
+from repository import AttemptLimitReached
+
+
+def registration(email):
+    return {
+        "full_name": "Test Candidate",
+        "email": email,
+        "phone": "9999999999",
+        "address": {"area": "Area", "city": "City", "pincode": "560001"},
+        "position": "Engineer",
+        "tech_stack": ["Python"],
+        "experience": {"has_experience": False, "previous_company": "", "role": "", "domain": "",
+                       "years_experience": 0.0}
+    }
+
+
+def test_cap_check_locks_the_email_range():
+    sql = str(repository.hot_queries()['locked_attempt_count'][0].compile(dialect=mysql.dialect()))
+    assert sql.rstrip().endswith('FOR UPDATE')
+
+
+def test_attempt_cap_is_enforced(candidate_app):
+    numbers = [candidate_app.register_candidate(registration('capped@example.com'))[1]
+               for _ in range(candidate_app.MAX_ATTEMPTS)]
+    assert numbers == list(range(1, candidate_app.MAX_ATTEMPTS + 1))
+
+    with pytest.raises(AttemptLimitReached):
+        candidate_app.register_candidate(registration('capped@example.com'))
+
+
+def test_normalized_email_variants_share_the_cap(candidate_app):
+    variants = ['same@example.com', 'Same@Example.com', ' SAME@example.com', 'same@EXAMPLE.COM ', 'sAmE@example.com']
+    for email in variants[:candidate_app.MAX_ATTEMPTS]:
+        candidate_app.register_candidate(registration(email))
+
+    with pytest.raises(AttemptLimitReached):
+        candidate_app.register_candidate(registration('  SAME@EXAMPLE.COM'))
+    with candidate_app.Session() as db_session:
+        assert len(repository.candidate_ids_for_email(db_session, 'same@example.com')) == candidate_app.MAX_ATTEMPTS
+
+
+def deadlock():
+    return OperationalError('SELECT count(candidates.id) ... FOR UPDATE', {},
+                            Exception(1213, 'Deadlock found when trying to get lock'))
+
+
+def test_deadlock_is_retried(candidate_app, monkeypatch):
+    calls = []
+    real_register = repository.register_candidate
+
+    def deadlock_once(db_session, candidate, max_attempts):
+        calls.append(candidate.email_normalized)
+        if len(calls) == 1:
+            raise deadlock()
+        return real_register(db_session, candidate, max_attempts)
+    monkeypatch.setattr(repository, 'register_candidate', deadlock_once)
+
+    candidate_id, attempt_number = candidate_app.register_candidate(registration('retry@example.com'))
+
+    assert candidate_id is not None and attempt_number == 1
+    assert calls == ['retry@example.com', 'retry@example.com']
+
+
+def test_registration_gives_up_after_the_retries(candidate_app, monkeypatch):
+    calls = []
+
+    def always_deadlock(db_session, candidate, max_attempts):
+        calls.append(candidate.email_normalized)
+        raise deadlock()
+    monkeypatch.setattr(repository, 'register_candidate', always_deadlock)
+
+    assert candidate_app.register_candidate(registration('stuck@example.com')) == (None, None)
+    assert len(calls) == candidate_app.REGISTRATION_RETRIES
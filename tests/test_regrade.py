@@ -0,0 +1,61 @@
+"""Answer-key corrections through regrade.regrade, the path shared by manage.py and the admin form."""
+import pytest
+from sqlalchemy import select
+
+import regrade
+import repository
+from models import Answer, Question, Score
+
+
+@pytest.mark.parametrize('option', ['E', '', 'AB', '1', 'Z'])
+def test_invalid_option_is_rejected_before_any_write(engine, Session, seed_attempt, option):
+    question_id = seed_attempt('B').question_ids[0]
+
+    with pytest.raises(ValueError):
+        regrade.regrade(engine, question_id=question_id, correct_option=option, settle_seconds=0)
+
+    with Session() as db_session:
+        assert db_session.get(Question, question_id).correct_option == 'A'
+        assert repository.question_set_version(db_session, 1) == 0
+
+
+def test_key_change_bumps_set_version_and_regrades(engine, Session, seed_attempt):
+    attempt = seed_attempt('B')
+
+    report = regrade.regrade(engine, question_id=attempt.question_ids[0], correct_option=' b ', settle_seconds=0)
+
+    assert report['now_correct'] == 1
+    with Session() as db_session:
+        assert db_session.get(Question, attempt.question_ids[0]).correct_option == 'B'
+        assert db_session.get(Score, attempt.score_id).correct_answers == 1
+        assert repository.question_set_version(db_session, 1) == 1
+
+
+def test_dry_run_writes_nothing(engine, Session, seed_attempt):
+    attempt = seed_attempt('B')
+
+    report = regrade.regrade(engine, question_id=attempt.question_ids[0], correct_option='B', dry_run=True,
+                             settle_seconds=0)
+
+    assert report['scores_changed'] == 1
+    with Session() as db_session:
+        assert db_session.get(Question, attempt.question_ids[0]).correct_option == 'A'
+        assert db_session.get(Score, attempt.score_id).correct_answers == 0
+        assert repository.question_set_version(db_session, 1) == 0
+
+
+def test_answers_graded_with_the_old_key_while_settling_are_regraded(engine, Session, seed_attempt, monkeypatch):
+    attempt = seed_attempt('B')
+
+    def late_submission(seconds):
+        # A worker whose question cache has not seen the new version yet grades with key A
+        seed_attempt('B', keys='A', question_ids=attempt.question_ids, candidate_id=attempt.candidate_id,
+                     attempt_number=2)
+    monkeypatch.setattr(regrade.time, 'sleep', late_submission)
+
+    report = regrade.regrade(engine, question_id=attempt.question_ids[0], correct_option='B', settle_seconds=0)
+
+    assert report['answers_checked'] == 2
+    assert report['scores_changed'] == 2
+    with Session() as db_session:
+        assert db_session.scalars(select(Answer.is_correct).order_by(Answer.answer_id)).all() == [True, True]
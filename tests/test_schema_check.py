@@ -0,0 +1,33 @@
+"""The candidate app refuses to start on a database that does not match the models."""
+import importlib
+import sys
+
+import pytest
+from sqlalchemy import create_engine
+
+from models import Base
+
+
+def import_app(monkeypatch, database_url):
+    monkeypatch.setenv('DATABASE_URL', database_url)
+    monkeypatch.delenv('SCHEMA_CHECK_ON_STARTUP', raising=False)
+    monkeypatch.setenv('S3_REGION', 'us-east-1')
+    monkeypatch.delitem(sys.modules, 'app', raising=False)
+    return importlib.import_module('app')
+
+
+def test_startup_fails_on_a_missing_table(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'drifted.db'}")
+    Base.metadata.create_all(engine, tables=[table for table in Base.metadata.sorted_tables
+                                             if table.name != 'item_stat_deltas'])
+
+    with pytest.raises(RuntimeError, match="missing table 'item_stat_deltas'"):
+        import_app(monkeypatch, str(engine.url))
+
+
+def test_startup_passes_on_a_current_schema(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'current.db'}")
+    Base.metadata.create_all(engine)
+
+    app = import_app(monkeypatch, str(engine.url))
+    app.engine.dispose()
@@ -0,0 +1,62 @@
+"""Per-category sub-scores stored with each submission and kept in step by re-grades."""
+from datetime import datetime
+
+import pytest
+
+import regrade
+import repository
+from models import Candidate, Question, Score, ScoreCategory
+
+KEY = [('Logical Reasoning', 'A'), ('Logical Reasoning', 'B'), ('English Proficiency', 'C'),
+       ('English Proficiency', 'D'), ('English Proficiency', 'A')]
+
+
+@pytest.fixture
+def set_questions(candidate_app):
+    with candidate_app.Session() as db_session:
+        db_session.add_all(Question(set_number=1, category=category, question_text=f'Question {i}',
+                                    option_a='a', option_b='b', option_c='c', option_d='d', correct_option=option)
+                           for i, (category, option) in enumerate(KEY))
+        candidate = Candidate(full_name='Test', email='t@example.com', email_normalized='t@example.com',
+                              phone='9999999999', position='Engineer', submitted_at=datetime.now())
+        db_session.add(candidate)
+        db_session.commit()
+        candidate_id = candidate.id
+    candidate_app.question_cache.invalidate()
+    return candidate_id, candidate_app.get_questions(1)
+
+
+def stored_categories(candidate_app, candidate_id):
+    with candidate_app.Session() as db_session:
+        score = db_session.query(Score).filter(Score.candidate_id == candidate_id).one()
+        return {row.category: (row.correct, row.total, float(row.percent))
+                for row in db_session.query(ScoreCategory).filter(ScoreCategory.score_id == score.score_id)}
+
+
+def submit(candidate_app, candidate_id, questions, options):
+    answers = {question.question_id: option for question, option in zip(questions, options) if option}
+    assert candidate_app.save_test_results(candidate_id, 1, questions, answers)
+
+
+def test_submission_stores_sub_scores_matching_a_rebuild(candidate_app, set_questions):
+    candidate_id, questions = set_questions
+    submit(candidate_app, candidate_id, questions, ['A', 'C', 'C', '', 'A'])
+
+    stored = stored_categories(candidate_app, candidate_id)
+    assert stored == {'English Proficiency': (2, 3, 66.67), 'Logical Reasoning': (1, 2, 50.0)}
+
+    with candidate_app.Session() as db_session:
+        score_id = db_session.query(Score.score_id).filter(Score.candidate_id == candidate_id).scalar()
+    with candidate_app.engine.begin() as connection:
+        repository.rebuild_score_categories(connection, [score_id])
+    assert stored_categories(candidate_app, candidate_id) == stored
+
+    # A resubmission replaces the score and its sub-scores
+    submit(candidate_app, candidate_id, questions, ['A', 'B', 'C', 'D', 'A'])
+    assert stored_categories(candidate_app, candidate_id) == {'English Proficiency': (3, 3, 100.0),
+                                                              'Logical Reasoning': (2, 2, 100.0)}
+
+    # A key correction re-grades the sub-score of the category it belongs to
+    regrade.regrade(candidate_app.engine, question_id=questions[1].question_id, correct_option='C', settle_seconds=0)
+    assert stored_categories(candidate_app, candidate_id) == {'English Proficiency': (3, 3, 100.0),
+                                                              'Logical Reasoning': (1, 2, 50.0)}
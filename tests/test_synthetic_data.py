@@ -0,0 +1,60 @@
+"""Synthetic benchmark data is internally consistent: derived tables match a rebuild from the raw rows."""
+import pytest
+from sqlalchemy import func, select
+
+import proctoring
+import repository
+from benchmarks import synthetic_data
+from models import Answer, Candidate, ProctoringSummary, Question, Score, ScoreCategory
+
+
+def category_rows(connection):
+    return sorted(connection.execute(select(ScoreCategory.score_id, ScoreCategory.category,
+                                            ScoreCategory.correct, ScoreCategory.total)).all())
+
+
+def summary_rows(db_session):
+    return sorted((s.candidate_id, s.attempt_number, s.switch_count, round(s.total_away_seconds, 3),
+                   round(s.longest_absence_seconds, 3)) for s in db_session.query(ProctoringSummary))
+
+
+@pytest.fixture
+def generated(engine):
+    return synthetic_data.generate(engine, 600, sets=2, questions_per_set=10, seed=1)
+
+
+def test_counts_match_the_tables(engine, generated):
+    assert generated['answers'] == 600
+    assert generated['candidates'] == 60
+    with engine.connect() as connection:
+        for table_name, count in generated.items():
+            assert connection.scalar(select(func.count()).select_from(
+                synthetic_data.Base.metadata.tables[table_name])) == count, table_name
+
+
+def test_scores_agree_with_their_answers(engine, generated):
+    with engine.connect() as connection:
+        wrong_grades = connection.scalar(
+            select(func.count()).select_from(Answer).join(Question, Question.question_id == Answer.question_id).
+            where(Answer.is_correct != (func.coalesce(Answer.selected_option, '') == Question.correct_option)))
+        assert wrong_grades == 0
+        totals = select(Answer.score_id, func.count().label('total'),
+                        func.sum(Answer.is_correct).label('correct')).group_by(Answer.score_id).subquery()
+        mismatched = connection.scalar(
+            select(func.count()).select_from(Score).join(totals, totals.c.score_id == Score.score_id).
+            where((Score.total_questions != totals.c.total) | (Score.correct_answers != totals.c.correct)))
+        assert mismatched == 0
+
+
+def test_derived_tables_match_a_rebuild(engine, Session, generated):
+    with engine.begin() as connection:
+        stored = category_rows(connection)
+        score_ids = connection.execute(select(Score.score_id)).scalars().all()
+        repository.rebuild_score_categories(connection, score_ids)
+        assert category_rows(connection) == stored
+
+    with Session() as db_session:
+        stored = summary_rows(db_session)
+        proctoring.rebuild_summaries(db_session, db_session.scalars(select(Candidate.id)).all())
+        db_session.flush()
+        assert summary_rows(db_session) == stored
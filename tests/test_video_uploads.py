@@ -0,0 +1,138 @@
+"""Chunked video uploads against a moto-faked S3."""
+import io
+import os
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from video_uploads import MIN_PART_SIZE, ChunkedVideoUploads, ChunkOutOfOrder, UploadQueue
+
+BUCKET = 'test-videos'
+
+
+class CutOffStream(io.RawIOBase):
+    """A request body that fails partway through, like a client that drops the connection"""
+
+    def __init__(self, data, fail_after):
+        self._data = io.BytesIO(data[:fail_after])
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        read = self._data.readinto(buffer)
+        if not read:
+            raise OSError("client disconnected")
+        return read
+
+
+@pytest.fixture
+def s3():
+    with mock_aws():
+        client = boto3.client('s3', region_name='us-east-1', aws_access_key_id='test',
+                              aws_secret_access_key='test')
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+@pytest.fixture
+def uploads(s3, tmp_path):
+    return ChunkedVideoUploads(s3, BUCKET, str(tmp_path))
+
+
+def stored(s3, key):
+    return s3.get_object(Bucket=BUCKET, Key=key)['Body'].read()
+
+
+def test_multipart_upload_round_trip(s3, uploads):
+    first, second = os.urandom(MIN_PART_SIZE), os.urandom(1000)
+    token = uploads.start('videos/a.webm')
+
+    state = uploads.append(token, 0, io.BytesIO(first))
+    assert state['part_ready']
+    uploads.sync(token)
+    assert not uploads.append(token, 1, io.BytesIO(second))['part_ready']
+    uploads.seal(token)
+
+    assert uploads.finish(token) == 'videos/a.webm'
+    assert stored(s3, 'videos/a.webm') == first + second
+    assert not os.listdir(uploads.spool_dir)
+
+
+def test_duplicate_and_out_of_order_chunks(s3, uploads):
+    chunks = [os.urandom(300) for _ in range(3)]
+    token = uploads.start('videos/b.webm')
+    uploads.append(token, 0, io.BytesIO(chunks[0]))
+
+    with pytest.raises(ChunkOutOfOrder) as error:
+        uploads.append(token, 2, io.BytesIO(chunks[2]))
+    assert error.value.expected == 1
+
+    uploads.append(token, 1, io.BytesIO(chunks[1]))
+    assert uploads.append(token, 1, io.BytesIO(chunks[1]))['duplicate']
+    assert uploads.append(token, 0, io.BytesIO(b'ignored'))['duplicate']
+    uploads.append(token, 2, io.BytesIO(chunks[2]))
+    uploads.seal(token)
+    uploads.finish(token)
+
+    assert stored(s3, 'videos/b.webm') == b''.join(chunks)
+
+
+def test_retry_after_cut_off_body_is_not_doubled(s3, uploads):
+    first, second = os.urandom(500), os.urandom(800)
+    token = uploads.start('videos/c.webm')
+    uploads.append(token, 0, io.BytesIO(first))
+
+    with pytest.raises(OSError):
+        uploads.append(token, 1, CutOffStream(second, fail_after=300))
+    state = uploads.append(token, 1, io.BytesIO(second))
+    assert not state['duplicate']
+    assert state['bytes_received'] == len(first) + len(second)
+    uploads.seal(token)
+    uploads.finish(token)
+
+    assert stored(s3, 'videos/c.webm') == first + second
+
+
+def test_empty_upload_is_aborted(s3, uploads):
+    token = uploads.start('videos/d.webm')
+    uploads.seal(token)
+    assert uploads.finish(token) is None
+    assert 'Contents' not in s3.list_objects_v2(Bucket=BUCKET)
+
+
+@pytest.fixture
+def queue(uploads, Session):
+    queue = UploadQueue(uploads, Session, workers=1, max_retries=1, backoff_seconds=0)
+    yield queue
+    queue._executor.shutdown(wait=True)
+
+
+def sealed_recording(uploads, queue):
+    token = uploads.start('videos/d.webm')
+    queue.track(token, None, 1, 'videos/d.webm', 'recording')
+    uploads.append(token, 0, io.BytesIO(b'video'))
+    uploads.seal(token)
+    return token
+
+
+def test_second_finish_keeps_the_uploaded_status(s3, uploads, queue):
+    token = sealed_recording(uploads, queue)
+
+    # The browser's /complete and the test submission both queue the recording
+    jobs = [queue.finish(token), queue.finish(token)]
+    for job in jobs:
+        job.result()
+
+    assert queue.status(token) == 'uploaded'
+    assert stored(s3, 'videos/d.webm') == b'video'
+
+
+def test_finish_after_upload_queues_nothing(s3, uploads, queue):
+    token = sealed_recording(uploads, queue)
+    queue.finish(token).result()
+
+    assert queue.finish(token) is None
+    assert queue.status(token) == 'uploaded'
+    assert queue.resume_pending() == 0
@@ -0,0 +1,383 @@
+"""Chunked, resumable webcam video uploads to S3.
+
+The browser sends MediaRecorder timeslices while the test is running. Each
+slice is appended to a spool file under VIDEO_SPOOL_DIR; once the spool holds
+at least part_size bytes it is sealed as the next part of a multipart upload
+(S3 requires every part but the last to be at least 5 MiB). Completing the
+upload seals the remainder as the final part.
+
+Request handlers only touch local disk. Talking to S3 (creating the
+multipart upload, sending parts, completing the object) is done by the
+background UploadQueue, so a slow or failing S3 never holds up a candidate.
+
+Upload state is kept in a JSON file next to the spool and guarded by a file
+lock, so any worker that shares the spool directory can accept the next
+chunk. Chunks carry a sequence number: a repeated sequence is acknowledged
+without being appended again, and a retry of a chunk whose body was cut
+off replaces the partial bytes, which makes client retries safe.
+"""
+import fcntl
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+from models import VideoUpload
+
+logger = logging.getLogger(__name__)
+
+MIN_PART_SIZE = 5 * 1024 * 1024
+COPY_BUFFER_SIZE = 64 * 1024
+S3_ERRORS = (BotoCoreError, ClientError)
+
+
+class UploadError(Exception):
+    """Unknown upload token or a chunk that cannot be accepted"""
+
+
+class ChunkOutOfOrder(UploadError):
+    """A chunk arrived ahead of the next expected sequence number"""
+
+    def __init__(self, expected):
+        super().__init__(f"Expected chunk {expected}")
+        self.expected = expected
+
+
+class ChunkedVideoUploads:
+    def __init__(self, s3_client, bucket, spool_dir, part_size=MIN_PART_SIZE):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.spool_dir = spool_dir
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        os.makedirs(spool_dir, exist_ok=True)
+
+    # ---------- PATHS AND STATE ----------
+    def _path(self, token, suffix):
+        if not token or not all(c in '0123456789abcdef' for c in token):
+            raise UploadError("Invalid upload token")
+        return os.path.join(self.spool_dir, f"{token}.{suffix}")
+
+    @contextmanager
+    def _lock(self, token, name):
+        with open(self._path(token, name), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _locked_state(self, token):
+        """Yield the upload state under an exclusive lock and persist changes on exit"""
+        state_path = self._path(token, 'json')
+        if not os.path.exists(state_path):
+            raise UploadError("Unknown upload token")
+        with self._lock(token, 'lock'):
+            try:
+                with open(state_path) as f:
+                    state = json.load(f)
+            except FileNotFoundError:
+                # Finished while we waited for the lock
+                raise UploadError("Unknown upload token")
+            yield state
+            self._write_state(token, state)
+
+    def _write_state(self, token, state):
+        state_path = self._path(token, 'json')
+        tmp_path = f"{state_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, state_path)
+
+    def _cleanup(self, token, state):
+        suffixes = ['json', 'spool', 'video', 'lock', 'upload-lock']
+        suffixes += [f"part{part['PartNumber']}" for part in state.get('parts', [])]
+        for suffix in suffixes:
+            try:
+                os.remove(self._path(token, suffix))
+            except FileNotFoundError:
+                pass
+
+    def _seal_spool(self, token, state):
+        """Turn the current spool file into the next part, to be sent by the upload queue"""
+        part_number = len(state['parts']) + 1
+        os.replace(self._path(token, 'spool'), self._path(token, f"part{part_number}"))
+        open(self._path(token, 'spool'), 'wb').close()
+        state['parts'].append({'PartNumber': part_number, 'ETag': None})
+        state['spool_size'] = 0
+
+    # ---------- REQUEST PATH (local disk only) ----------
+    def start(self, key):
+        """Open a chunked upload for key; returns the upload token"""
+        token = uuid.uuid4().hex
+        open(self._path(token, 'spool'), 'wb').close()
+        self._write_state(token, {
+            'key': key,
+            'upload_id': None,
+            'parts': [],
+            'next_sequence': 0,
+            'bytes_received': 0,
+            'spool_size': 0,
+            'sealed': False
+        })
+        return token
+
+    def append(self, token, sequence, stream):
+        """Append one chunk read from a file-like stream.
+
+        Returns the upload state plus 'duplicate' (the sequence was already
+        received) and 'part_ready' (a part was sealed and should be synced).
+        """
+        with self._locked_state(token) as state:
+            if sequence < state['next_sequence']:
+                return dict(state, duplicate=True, part_ready=False)
+            if state['sealed']:
+                raise UploadError("Upload already completed")
+            if sequence > state['next_sequence']:
+                raise ChunkOutOfOrder(state['next_sequence'])
+            with open(self._path(token, 'spool'), 'r+b') as spool:
+                # Drop bytes left by an earlier try of this sequence whose body was cut off
+                spool.seek(state['spool_size'])
+                spool.truncate()
+                shutil.copyfileobj(stream, spool, COPY_BUFFER_SIZE)
+                spool_size = spool.tell()
+            state['bytes_received'] += spool_size - state['spool_size']
+            state['spool_size'] = spool_size
+            state['next_sequence'] += 1
+            part_ready = spool_size >= self.part_size
+            if part_ready:
+                self._seal_spool(token, state)
+            return dict(state, duplicate=False, part_ready=part_ready)
+
+    def seal(self, token):
+        """Stop accepting chunks and seal whatever is spooled as the final part"""
+        with self._locked_state(token) as state:
+            if not state['sealed'] and state['spool_size'] > 0:
+                self._seal_spool(token, state)
+            state['sealed'] = True
+            return dict(state)
+
+    def save_file(self, key, stream):
+        """Spool a whole recording (legacy single-request upload); returns the upload token"""
+        token = uuid.uuid4().hex
+        with open(self._path(token, 'video'), 'wb') as f:
+            shutil.copyfileobj(stream, f, COPY_BUFFER_SIZE)
+            size = f.tell()
+        self._write_state(token, {'key': key, 'file': True, 'bytes_received': size, 'sealed': True})
+        return token
+
+    # ---------- UPLOAD QUEUE SIDE (S3) ----------
+    def sync(self, token):
+        """Send every sealed part that S3 has not acknowledged yet"""
+        with self._lock(token, 'upload-lock'):
+            self._sync_parts(token)
+
+    def _sync_parts(self, token):
+        with self._locked_state(token) as state:
+            snapshot = json.loads(json.dumps(state))
+        if snapshot['upload_id'] is None:
+            response = self.s3_client.create_multipart_upload(Bucket=self.bucket, Key=snapshot['key'],
+                                                              ContentType='video/webm')
+            with self._locked_state(token) as state:
+                state['upload_id'] = response['UploadId']
+            snapshot['upload_id'] = response['UploadId']
+        for part in snapshot['parts']:
+            if part['ETag'] is not None:
+                continue
+            part_path = self._path(token, f"part{part['PartNumber']}")
+            with open(part_path, 'rb') as body:
+                response = self.s3_client.upload_part(
+                    Bucket=self.bucket,
+                    Key=snapshot['key'],
+                    UploadId=snapshot['upload_id'],
+                    PartNumber=part['PartNumber'],
+                    Body=body
+                )
+            part['ETag'] = response['ETag']
+            with self._locked_state(token) as state:
+                state['parts'][part['PartNumber'] - 1]['ETag'] = response['ETag']
+            os.remove(part_path)
+        return snapshot
+
+    def finish(self, token):
+        """Upload everything still spooled and complete the object.
+
+        Returns the S3 key, or None when no data was received (the multipart
+        upload is aborted rather than leaving an empty object).
+        """
+        with self._lock(token, 'upload-lock'):
+            with self._locked_state(token) as state:
+                snapshot = dict(state)
+            if not snapshot['sealed']:
+                raise UploadError("Upload is still recording")
+            key = snapshot['key']
+            if snapshot.get('file'):
+                self.s3_client.upload_file(self._path(token, 'video'), self.bucket, key,
+                                           ExtraArgs={'ContentType': 'video/webm'})
+            elif not snapshot['bytes_received']:
+                if snapshot['upload_id']:
+                    self.s3_client.abort_multipart_upload(Bucket=self.bucket, Key=key,
+                                                          UploadId=snapshot['upload_id'])
+                key = None
+            else:
+                snapshot = self._sync_parts(token)
+                self.s3_client.complete_multipart_upload(
+                    Bucket=self.bucket,
+                    Key=key,
+                    UploadId=snapshot['upload_id'],
+                    MultipartUpload={'Parts': snapshot['parts']}
+                )
+            self._cleanup(token, snapshot)
+        return key
+
+
+class UploadQueue:
+    """Bounded pool of background threads that moves spooled video to S3.
+
+    S3 errors are retried with exponential backoff. Each recording has a row
+    in video_uploads (recording -> pending -> uploading -> uploaded/failed),
+    so what is still waiting can be seen and resumed after a restart.
+    Status changes only move forward, so a recording finished twice (by the
+    browser and by the test submission) keeps its final status.
+    """
+
+    FINISHED = ('uploaded', 'empty')
+    UNFINISHED = ('pending', 'uploading', 'failed')
+
+    def __init__(self, uploads, session_factory, workers=4, max_retries=5, backoff_seconds=2.0):
+        self.uploads = uploads
+        self.session_factory = session_factory
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='video-upload')
+        self._lock = threading.Lock()
+        self._queued = 0
+
+    # ---------- STATUS TABLE ----------
+    def track(self, token, candidate_id, attempt_number, s3_key, status):
+        db_session = self.session_factory()
+        try:
+            now = datetime.now()
+            db_session.add(VideoUpload(token=token, candidate_id=candidate_id, attempt_number=attempt_number,
+                                       s3_key=s3_key, status=status, attempts=0,
+                                       created_at=now, updated_at=now))
+            db_session.commit()
+        finally:
+            db_session.close()
+
+    def _set_status(self, token, only_from=None, **values):
+        """Update the row, only if its status is in only_from when given"""
+        db_session = self.session_factory()
+        try:
+            values['updated_at'] = datetime.now()
+            query = db_session.query(VideoUpload).filter(VideoUpload.token == token)
+            if only_from:
+                query = query.filter(VideoUpload.status.in_(only_from))
+            query.update(values, synchronize_session=False)
+            db_session.commit()
+        except Exception:
+            db_session.rollback()
+            logger.exception("Error updating video upload status for %s", token)
+        finally:
+            db_session.close()
+
+    def status(self, token):
+        db_session = self.session_factory()
+        try:
+            return db_session.query(VideoUpload.status).filter(VideoUpload.token == token).scalar()
+        finally:
+            db_session.close()
+
+    # ---------- JOBS ----------
+    def _submit(self, fn, token):
+        with self._lock:
+            self._queued += 1
+        return self._executor.submit(self._run, fn, token)
+
+    def sync(self, token):
+        """Send sealed parts in the background"""
+        return self._submit(self._sync_job, token)
+
+    def finish(self, token):
+        """Complete the recording in the background; the caller has already sealed it.
+
+        Returns None without queueing anything if the upload is already complete.
+        """
+        self._set_status(token, only_from=('recording',), status='pending')
+        if self.status(token) in self.FINISHED:
+            return None
+        return self._submit(self._finish_job, token)
+
+    def _run(self, fn, token):
+        with self._lock:
+            self._queued -= 1
+        try:
+            fn(token)
+        except Exception:
+            logger.exception("Unexpected error in video upload job for %s", token)
+
+    def _with_retries(self, token, action, on_attempt=None):
+        """Run action(token), retrying S3 errors; returns (succeeded, result or last error)"""
+        last_error = None
+        for attempt in range(1, self.max_retries + 1):
+            if on_attempt:
+                on_attempt(attempt)
+            try:
+                return True, action(token)
+            except S3_ERRORS as e:
+                last_error = e
+                logger.warning("Video upload %s attempt %d/%d failed: %s", token, attempt, self.max_retries, e)
+                if attempt < self.max_retries:
+                    time.sleep(self.backoff_seconds * 2 ** (attempt - 1))
+        return False, last_error
+
+    def _sync_job(self, token):
+        try:
+            # A failed part stays on disk and is sent again by the next sync or by finish
+            self._with_retries(token, self.uploads.sync)
+        except UploadError:
+            pass  # Already finished
+
+    def _finish_job(self, token):
+        try:
+            succeeded, result = self._with_retries(
+                token, self.uploads.finish,
+                on_attempt=lambda attempt: self._set_status(token, only_from=self.UNFINISHED,
+                                                            status='uploading', attempts=attempt)
+            )
+        except UploadError as e:
+            logger.info("Video upload %s skipped: %s", token, e)
+            return
+        if succeeded and result is None:
+            self._set_status(token, status='empty', last_error=None)
+        elif succeeded:
+            self._set_status(token, status='uploaded', last_error=None)
+            logger.info("Video uploaded to S3: %s", result)
+        else:
+            self._set_status(token, status='failed', last_error=str(result)[:1000])
+            logger.error("Video upload %s failed after %d attempts: %s", token, self.max_retries, result)
+
+    def resume_pending(self):
+        """Queue every upload a previous process left unfinished or gave up on"""
+        db_session = self.session_factory()
+        try:
+            tokens = [row.token for row in db_session.query(VideoUpload.token).
+                      filter(VideoUpload.status.in_(self.UNFINISHED))]
+        finally:
+            db_session.close()
+        for token in tokens:
+            self.finish(token)
+        return len(tokens)
+
+    def stats(self):
+        with self._lock:
+            return {'workers': self.workers, 'queued': self._queued}